@@ -0,0 +1,144 @@
+# app/core/cache.py
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+def approx_size(obj: Any, _depth: int = 0) -> int:
+    """
+    Estimare ieftină (bytes) pentru structurile pe care le ținem în cache:
+    dict / list / tuple / str / numere / array-uri NumPy. Nu urmărește referințe partajate.
+    """
+    size = sys.getsizeof(obj)
+    nbytes = getattr(obj, "nbytes", None)
+    if isinstance(nbytes, int):
+        # ndarray: `getsizeof` unui view numără doar antetul, nu datele
+        return max(size, nbytes)
+    if _depth > 6:
+        return size
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            size += approx_size(k, _depth + 1) + approx_size(v, _depth + 1)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for v in obj:
+            size += approx_size(v, _depth + 1)
+    return size
+
+
+class LRUCache:
+    """
+    Cache LRU cu TTL, limitat atât ca număr de intrări cât și ca memorie estimată.
+
+    - thread-safe (rutele sync FastAPI rulează în threadpool);
+    - `negative=True` la `set()` marchează un rezultat gol, păstrat cu un TTL mai scurt;
+    - `stats()` expune contoarele (hits, misses, evictions, bytes) pentru dimensionare.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl: float = 600.0,
+        negative_ttl: Optional[float] = None,
+        sizeof: Callable[[Any], int] = approx_size,
+    ):
+        self.max_entries = max(1, int(max_entries))
+        self.max_bytes = max(1, int(max_bytes))
+        self.ttl = float(ttl)
+        self.negative_ttl = float(negative_ttl if negative_ttl is not None else ttl)
+        self._sizeof = sizeof
+        self._lock = threading.Lock()
+        # key -> (expires_at, size, negative, value)
+        self._data: "OrderedDict[Hashable, Tuple[float, int, bool, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._negative_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    # ------- API -------
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._misses += 1
+                return default
+            expires_at, size, negative, value = entry
+            if expires_at <= now:
+                self._drop(key, size)
+                self._expirations += 1
+                self._misses += 1
+                return default
+            self._data.move_to_end(key)
+            self._hits += 1
+            if negative:
+                self._negative_hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, negative: bool = False) -> None:
+        if ttl is None:
+            ttl = self.negative_ttl if negative else self.ttl
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            return  # nu merită să golim tot cache-ul pentru o singură intrare
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._data[key] = (expires_at, size, negative, value)
+            self._bytes += size
+            self._evict()
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._drop(key, entry[1])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        """Instantaneu (cheie, valoare) al intrărilor încă valide, de la cea mai veche la cea mai recentă."""
+        now = time.monotonic()
+        with self._lock:
+            return [(k, e[3]) for k, e in self._data.items() if e[0] > now]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "negative_hits": self._negative_hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+            }
+
+    # ------- internals (apelate cu lock-ul luat) -------
+    def _drop(self, key: Hashable, size: int) -> None:
+        del self._data[key]
+        self._bytes -= size
+
+    def _evict(self) -> None:
+        while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+            _, (_, size, _, _) = self._data.popitem(last=False)
+            self._bytes -= size
+            self._evictions += 1
@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 from functools import lru_cache
+from typing import Optional
 from urllib.parse import quote_plus
 
 from pydantic_settings import BaseSettings
@@ -28,6 +29,67 @@ class Settings(BaseSettings):
     # === RAG / ChromaDB ===
     CHROMA_DIR: str = Field("./chroma_store", description="ChromaDB persistence directory")
     COLLECTION_NAME: str = Field("books", description="Default Chroma collection name")
+    VECTOR_BACKEND: str = Field("chroma", description="Backend vector store: 'chroma' sau 'flat' (NumPy memory-mapped)")
+    FLAT_INDEX_DIR: Optional[str] = Field(None, description="Directorul indexului 'flat' (implicit CHROMA_DIR/flat)")
+    FLAT_INDEX_DTYPE: str = Field("float32", description="Forma de scanare a indexului 'flat': float32 | int8 (int8: un sfert din memoria scanată, latență cel mult cea float32; float16 nu este oferit: fără GEMM float16 în NumPy, scanarea era de ~5x mai lentă)")
+    FLAT_RESCORE_FACTOR: int = Field(4, description="Shortlist = n_results * factor, rescorat exact în float32")
+    RAG_SHARD_BY: str = Field("", description="Sharding pe colecții: '' (o singură colecție) | 'lang' | 'genre'; la schimbare e nevoie de re-ingest")
+    RAG_SHARD_WORKERS: int = Field(8, description="Thread-uri pentru interogările trimise în paralel la toate shard-urile")
+
+    # === RAG / cache rezultate retriever ===
+    RAG_CACHE_MAX_ENTRIES: int = Field(2048, description="Numărul maxim de interogări păstrate în cache")
+    RAG_CACHE_MAX_BYTES: int = Field(32 * 1024 * 1024, description="Memoria maximă (estimată) a cache-ului, în bytes")
+    RAG_CACHE_TTL_SECONDS: int = Field(6 * 3600, description="TTL pentru rezultatele din cache (invalidarea se face prin generația colecției)")
+    RAG_CACHE_NEGATIVE_TTL_SECONDS: int = Field(60, description="TTL pentru rezultatele goale (negative cache)")
+    RAG_SEMANTIC_CACHE_SIZE: int = Field(512, description="Câte interogări recente păstrează cache-ul semantic (0 = dezactivat)")
+    RAG_SEMANTIC_CACHE_THRESHOLD: float = Field(0.95, description="Similaritatea cosinus minimă pentru a refolosi un rezultat")
+
+    # === RAG / retrieval ierarhic (cărți -> chunk-uri) ===
+    RAG_BOOK_LEVEL: bool = Field(True, description="Întâi top cărți (fișe de carte), apoi cele mai bune chunk-uri din ele; rezultate unice pe titlu")
+    RAG_BOOK_CANDIDATES: int = Field(12, description="Câte cărți alege prima etapă (cel puțin k)")
+    RAG_AUTO_LANG: bool = Field(True, description="Chat: pre-filtrează pe limba detectată a întrebării (dacă există în corpus)")
+
+    # === RAG / contextul trimis la LLM ===
+    RAG_CONTEXT_MAX_TOKENS: int = Field(1024, description="Bugetul de tokeni pentru contextul din bibliotecă inclus în prompt")
+    RAG_CONTEXT_TOKENIZER: str = Field("cl100k_base", description="Encoding tiktoken pentru numărare (fallback: tokenizer-ul modelului de embeddings)")
+
+    # === Cache embeddings (openai_client.embed) ===
+    EMBED_CACHE_MAX_ENTRIES: int = Field(50_000, description="Numărul maxim de vectori păstrați în memorie")
+    EMBED_CACHE_MAX_BYTES: int = Field(128 * 1024 * 1024, description="Memoria maximă (estimată) a cache-ului de embeddings")
+    EMBED_CACHE_PATH: Optional[str] = Field(None, description="Fișier local pentru persistarea cache-ului între reporniri (opțional)")
+
+    # === Micro-batching embeddings (un thread deține modelul) ===
+    EMBED_BATCHING: bool = Field(True, description="Adună apelurile concurente embed() într-un singur encode")
+    EMBED_BATCH_MAX: int = Field(64, description="Numărul maxim de texte codate într-un batch")
+    EMBED_BATCH_WAIT_MS: float = Field(3.0, description="Cât așteaptă worker-ul alte cereri înainte de encode (ms)")
+    EMBED_TORCH_THREADS: int = Field(0, description="Thread-uri intra-op (torch / onnxruntime) pentru worker (0 = auto: min(4, nuclee/2))")
+
+    # === Backend embeddings ===
+    EMBED_BACKEND: str = Field("torch", description="torch (sentence-transformers) | onnx (onnxruntime pe CPU, fără PyTorch; necesită requirements-onnx.txt)")
+    EMBED_ONNX_DIR: str = Field("./models/all-MiniLM-L6-v2-onnx", description="Exportul ONNX (python -m app.core.onnx_embedder)")
+    EMBED_ONNX_QUANTIZED: bool = Field(True, description="Folosește varianta cuantizată dinamic int8 a modelului ONNX")
+
+    # === Ingest ===
+    INGEST_BATCH_SIZE: int = Field(256, description="Chunk-uri per lot (embed + upsert); memoria ingest-ului nu crește cu catalogul")
+    INGEST_PROGRESS_SECONDS: float = Field(5.0, description="Intervalul mesajelor de progres la ingest")
+    INGEST_WORKERS: int = Field(1, description="Procese de embedding la ingest (>1 = pool de procese, fiecare cu modelul lui)")
+    INGEST_EMBED_STORE: Optional[str] = Field("./embed_store/embeddings.sqlite3", description="Cache persistent (model, sha256 text) -> vector pentru ingest, în afara CHROMA_DIR ('' = dezactivat)")
+
+    # === Auto-ingest (app.rag.watcher) ===
+    INGEST_WATCH: bool = Field(True, description="Rulează ingest-ul automat la modificarea fișierului sursă din data/")
+    INGEST_WATCH_BACKEND: str = Field("auto", description="auto (inotify prin watchfiles, altfel polling) | inotify | polling")
+    INGEST_DEBOUNCE_MS: int = Field(2000, description="Liniștea (ms) după ultima scriere înainte de ingest; o rafală = o rulare")
+    INGEST_SETTLE_SECONDS: float = Field(1.0, description="Fișierul trebuie să aibă aceeași mărime / mtime atâta timp înainte de citire")
+    INGEST_POLL_SECONDS: float = Field(5.0, description="Intervalul verificărilor stat() în modul polling")
+    INGEST_LEADER_RETRY_SECONDS: float = Field(30.0, description="Cât de des un worker non-lider reîncearcă să devină lider de ingest")
+
+    # === Warm-up (app.core.readiness) ===
+    WARMUP_RETRY_SECONDS: float = Field(2.0, description="Pauza înainte de reîncercarea unei etape de warm-up eșuate, dublată la fiecare eșec (0 = fără reîncercări)")
+    WARMUP_RETRY_MAX_SECONDS: float = Field(60.0, description="Pauza maximă între reîncercările warm-up-ului")
+
+    # === Server multi-worker (gunicorn.conf.py) ===
+    SERVER_WORKERS: int = Field(4, description="Numărul de worker-i gunicorn (UvicornWorker)")
+    SERVER_PRELOAD_MODEL: bool = Field(True, description="Încarcă modelul de embeddings în master, înainte de fork (copy-on-write)")
 
     # === Models (names kept in env for flexibility) ===
     EMBED_MODEL: str = Field("text-embedding-3-small", description="Embedding model name")
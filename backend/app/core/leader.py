@@ -0,0 +1,111 @@
+# app/core/leader.py
+"""
+Alegerea unui singur "lider de ingest" între worker-ii de pe același host.
+
+Cu mai mulți worker-i (gunicorn / uvicorn --workers N) fiecare proces pornește
+watcher-ul de auto-ingest (`app.rag.watcher`), dar doar cel care obține lock-ul
+exclusiv pe fișierul `CHROMA_DIR/.ingest.leader` rulează efectiv `ingest()`. Lock-ul (`flock`) este
+ținut cât trăiește procesul și eliberat de kernel la ieșire, deci un alt worker
+preia rolul la următoarea încercare. Ceilalți worker-i doar citesc: văd datele
+noi prin generația publicată de lider (`app.rag.generation`).
+
+Separat de rolul de lider, `run_lock()` serializează rulările de ingest între
+procese (watcher-ul liderului, `python -m app.rag.ingest` pornit manual): lock-ul
+`CHROMA_DIR/.ingest.lock` este ținut doar cât durează o rulare.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: un singur proces de dezvoltare, fără alegere
+    fcntl = None
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+LOCK_FILE = Path(settings.CHROMA_DIR) / ".ingest.leader"
+RUN_LOCK_FILE = Path(settings.CHROMA_DIR) / ".ingest.lock"
+
+_lock = threading.Lock()
+_fd: Optional[int] = None
+_pid: Optional[int] = None
+
+
+def try_acquire() -> bool:
+    """True dacă procesul curent este (sau tocmai a devenit) liderul. Nu blochează."""
+    global _fd, _pid
+    with _lock:
+        if _fd is not None and _pid == os.getpid():
+            return True
+        if _fd is not None and _fd >= 0:
+            # descriptor moștenit prin fork: nu face copilul lider, încercăm din nou
+            os.close(_fd)
+        _fd = _pid = None
+        if fcntl is None:
+            _pid = os.getpid()
+            _fd = -1
+            return True
+        LOCK_FILE.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        _fd, _pid = fd, os.getpid()
+        print(f"[INFO] Worker {_pid} este liderul de ingest ({LOCK_FILE}).")
+        return True
+
+
+def is_leader() -> bool:
+    return _fd is not None and _pid == os.getpid()
+
+
+def leader_pid() -> Optional[int]:
+    """PID-ul scris de liderul curent (informativ; poate fi învechit dacă liderul a murit)."""
+    try:
+        return int(LOCK_FILE.read_text(encoding="utf-8").strip() or 0) or None
+    except (OSError, ValueError):
+        return None
+
+
+@contextmanager
+def run_lock(timeout: Optional[float] = None, poll: float = 0.5) -> Iterator[bool]:
+    """
+    Lock exclusiv între procese pentru o rulare de ingest. Produce True dacă a fost
+    obținut; cu `timeout` (secunde) renunță și produce False. None = așteaptă oricât.
+    """
+    if fcntl is None:
+        yield True
+        return
+    RUN_LOCK_FILE.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(RUN_LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except OSError:
+                if deadline is not None and time.monotonic() >= deadline:
+                    yield False
+                    return
+                time.sleep(poll)
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        try:
+            yield True
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
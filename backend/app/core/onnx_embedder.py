@@ -0,0 +1,173 @@
+# app/core/onnx_embedder.py
+"""
+Backend ONNX Runtime (CPU) pentru `embed()`, alternativ la sentence-transformers.
+
+Același model (`all-MiniLM-L6-v2`) este exportat o singură dată în ONNX și
+cuantizat dinamic în int8. La rulare avem nevoie doar de `onnxruntime` și
+`tokenizers`, fără PyTorch; ambele sunt dependențe opționale:
+
+    pip install -r requirements-onnx.txt
+
+Pipeline-ul este identic cu cel din sentence-transformers:
+tokenizare (max 256 tokeni) -> transformer -> mean pooling pe attention mask -> normalizare L2.
+
+Export + verificare de echivalență (cosinus față de backend-ul torch):
+
+    python -m app.core.onnx_embedder --out ./models/all-MiniLM-L6-v2-onnx
+
+Exportul folosește torch / transformers (deja instalate pentru backend-ul implicit);
+serviciul, cu EMBED_BACKEND=onnx, nu le mai importă.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from pathlib import Path
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+FP32_FILE = "model.onnx"
+INT8_FILE = "model.int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+MAX_SEQ_LENGTH = 256  # ca în configurația sentence-transformers a modelului
+
+
+class OnnxEmbedder:
+    """Interfață compatibilă cu `SentenceTransformer.encode` (subsetul folosit de `embed()`)."""
+
+    def __init__(self, model_dir: str, quantized: bool = True, threads: int = 0):
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError(
+                f"EMBED_BACKEND=onnx necesită {e.name}; rulează `pip install -r requirements-onnx.txt`"
+            ) from e
+
+        path = Path(model_dir)
+        model_file = path / (INT8_FILE if quantized else FP32_FILE)
+        if not model_file.exists():
+            raise FileNotFoundError(
+                f"Lipsește {model_file}; rulează `python -m app.core.onnx_embedder --out {model_dir}`"
+            )
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = threads or max(1, min(4, (os.cpu_count() or 2) // 2))
+        opts.inter_op_num_threads = 1
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(str(model_file), opts, providers=["CPUExecutionProvider"])
+        self._inputs = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(str(path / TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding()
+        self._counter = Tokenizer.from_file(str(path / TOKENIZER_FILE))  # fără trunchiere / padding
+        self.name = f"{path.name}:{'int8' if quantized else 'fp32'}"
+
+    def token_count(self, text: str) -> int:
+        return len(self._counter.encode(text, add_special_tokens=False).ids)
+
+    def _forward(self, texts: Sequence[str]) -> np.ndarray:
+        enc = self.tokenizer.encode_batch(list(texts))
+        ids = np.asarray([e.ids for e in enc], dtype=np.int64)
+        mask = np.asarray([e.attention_mask for e in enc], dtype=np.int64)
+        feed = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self._inputs:
+            feed["token_type_ids"] = np.asarray([e.type_ids for e in enc], dtype=np.int64)
+        hidden = self.session.run(None, feed)[0]  # (batch, seq, dim)
+        m = mask[:, :, None].astype(np.float32)
+        pooled = (hidden * m).sum(axis=1) / np.maximum(m.sum(axis=1), 1e-9)
+        return pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+
+    def encode(self, sentences, batch_size: int = 32, **_) -> np.ndarray:
+        texts = [sentences] if isinstance(sentences, str) else list(sentences)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        # sortare după lungime (ca în sentence-transformers): padding minim per batch
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        out = np.zeros((len(texts), 0), dtype=np.float32)
+        for start in range(0, len(texts), max(1, batch_size)):
+            idx = order[start:start + batch_size]
+            vecs = self._forward([texts[i] for i in idx]).astype(np.float32)
+            if not out.shape[1]:
+                out = np.zeros((len(texts), vecs.shape[1]), dtype=np.float32)
+            out[idx] = vecs
+        return out[0] if isinstance(sentences, str) else out
+
+
+# ---------------- export + echivalență ----------------
+def export(model_name: str, out_dir: str, opset: int = 14) -> Tuple[Path, Path]:
+    """Exportă transformer-ul din sentence-transformers în ONNX (fp32) + varianta int8 dinamică."""
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    st = SentenceTransformer(model_name, device="cpu")
+    hf = st[0].auto_model.eval()
+    st.tokenizer.save_pretrained(str(out))  # scrie tokenizer.json (tokenizer "fast")
+
+    sample = st.tokenizer(["export onnx"], return_tensors="pt")
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    axes = {n: {0: "batch", 1: "seq"} for n in names}
+    axes["last_hidden_state"] = {0: "batch", 1: "seq"}
+    fp32 = out / FP32_FILE
+    with torch.no_grad():
+        torch.onnx.export(
+            hf,
+            tuple(sample[n] for n in names),
+            str(fp32),
+            input_names=names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=axes,
+            opset_version=opset,
+        )
+    int8 = out / INT8_FILE
+    quantize_dynamic(str(fp32), str(int8), weight_type=QuantType.QInt8)
+    return fp32, int8
+
+
+def cosine_agreement(reference: np.ndarray, candidate: np.ndarray) -> Tuple[float, float]:
+    """(minim, medie) cosinus rând cu rând între două matrice de embeddings."""
+    a = reference / np.maximum(np.linalg.norm(reference, axis=1, keepdims=True), 1e-12)
+    b = candidate / np.maximum(np.linalg.norm(candidate, axis=1, keepdims=True), 1e-12)
+    cos = np.sum(a * b, axis=1)
+    return float(cos.min()), float(cos.mean())
+
+
+def check_equivalence(model_name: str, model_dir: str, texts: List[str], min_cos: float = 0.99) -> bool:
+    from sentence_transformers import SentenceTransformer
+
+    ref = np.asarray(SentenceTransformer(model_name, device="cpu").encode(texts), dtype=np.float32)
+    ok = True
+    for quantized in (False, True):
+        got = OnnxEmbedder(model_dir, quantized=quantized).encode(texts)
+        lo, mean = cosine_agreement(ref, got)
+        status = "OK" if lo >= min_cos else "SUB PRAG"
+        print(f"[INFO] {'int8' if quantized else 'fp32'}: cosinus min={lo:.5f} medie={mean:.5f} ({status})")
+        ok = ok and lo >= min_cos
+    return ok
+
+
+def sample_texts(limit: int = 256) -> List[str]:
+    """Texte reale pentru comparații: rezumatele din data/summaries.json + câteva interogări."""
+    data = Path(__file__).resolve().parents[2] / "data" / "summaries.json"
+    items = json.loads(data.read_text(encoding="utf-8")) if data.exists() else []
+    docs = [f"{it.get('title', '')}\n\n{it.get('summary', '')}" for it in items[:limit]]
+    return docs + ["o carte despre prietenie", "distopie și supraveghere", "a fantasy adventure with dragons"]
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Export all-MiniLM-L6-v2 -> ONNX (fp32 + int8) și verificare de echivalență")
+    p.add_argument("--model", default="all-MiniLM-L6-v2")
+    p.add_argument("--out", default="./models/all-MiniLM-L6-v2-onnx")
+    p.add_argument("--min-cos", type=float, default=0.99, help="Cosinusul minim acceptat față de torch")
+    p.add_argument("--skip-export", action="store_true", help="Doar verificarea, pe un export existent")
+    args = p.parse_args()
+    if not args.skip_export:
+        fp32_path, int8_path = export(args.model, args.out)
+        print(f"[INFO] Exportat {fp32_path} ({fp32_path.stat().st_size / 2**20:.1f} MB), "
+              f"{int8_path} ({int8_path.stat().st_size / 2**20:.1f} MB)")
+    raise SystemExit(0 if check_equivalence(args.model, args.out, sample_texts(), args.min_cos) else 1)
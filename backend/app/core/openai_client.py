@@ -1,36 +1,378 @@
 # app/core/openai_client.py
 from __future__ import annotations
-from typing import Iterable, List, Optional, Dict, Generator
+from typing import Iterable, List, Optional, Dict, Generator, Sequence, Tuple
+from concurrent.futures import Future
+import atexit
+import json
+import os
+import queue
+import threading
 import time
-from openai import OpenAI
-from sentence_transformers import SentenceTransformer # Pentru embeddings moca
+import unicodedata
+
+import numpy as np
+from app.core.cache import LRUCache
 from app.core.config import get_settings
 
 settings = get_settings()
 
+# Clientul Groq și modelul de embeddings sunt create la primul folosit (sau în
+# warm-up-ul din lifespan), nu la import: CLI-urile și scripturile care nu fac RAG
+# nu mai plătesc încărcarea modelului.
+_init_lock = threading.Lock()
+
 # 🚀 Clientul Groq (Folosește cheia ta din .env)
-_groq_client = OpenAI(
-    api_key=settings.GROQ_API_KEY, 
-    base_url="https://api.groq.com/openai/v1"
-)
+_groq_client = None
+
+
+def _groq():
+    global _groq_client
+    if _groq_client is None:
+        with _init_lock:
+            if _groq_client is None:
+                from openai import OpenAI
+
+                _groq_client = OpenAI(
+                    api_key=settings.GROQ_API_KEY,
+                    base_url="https://api.groq.com/openai/v1"
+                )
+    return _groq_client
+
 
 # 🧠 Model local gratuit pentru Embeddings (înlocuiește OpenAI text-embedding-3-small)
 # Se descarcă automat la prima rulare (aprox 100MB)
-_embed_model = SentenceTransformer('all-MiniLM-L6-v2')
+_EMBED_MODEL_NAME = 'all-MiniLM-L6-v2'
+_EMBED_BACKEND = settings.EMBED_BACKEND.strip().lower()
+# identitatea vectorilor în cache: int8 / ONNX dă vectori (foarte puțin) diferiți de torch
+_EMBED_MODEL_ID = _EMBED_MODEL_NAME if _EMBED_BACKEND == "torch" else \
+    f"{_EMBED_MODEL_NAME}+onnx-{'int8' if settings.EMBED_ONNX_QUANTIZED else 'fp32'}"
+
+
+def _load_embed_model():
+    """sentence-transformers (PyTorch) sau, cu EMBED_BACKEND=onnx, onnxruntime fără torch."""
+    if _EMBED_BACKEND == "onnx":
+        from app.core.onnx_embedder import OnnxEmbedder
+
+        return OnnxEmbedder(settings.EMBED_ONNX_DIR, quantized=settings.EMBED_ONNX_QUANTIZED,
+                            threads=settings.EMBED_TORCH_THREADS)
+    if _EMBED_BACKEND != "torch":
+        raise ValueError(f"EMBED_BACKEND necunoscut: {_EMBED_BACKEND!r} (torch | onnx)")
+    from sentence_transformers import SentenceTransformer  # Pentru embeddings moca
+
+    return SentenceTransformer(_EMBED_MODEL_NAME)
+
+
+_embed_model = None
+
+
+def get_embed_model():
+    """Modelul de embeddings, încărcat o singură dată (thread-safe)."""
+    global _embed_model
+    if _embed_model is None:
+        with _init_lock:
+            if _embed_model is None:
+                _embed_model = _load_embed_model()
+    return _embed_model
+
+
+def embed_model_id() -> str:
+    """Identitatea vectorilor produși de `embed()` (model + backend), pentru cache-uri persistente."""
+    return _EMBED_MODEL_ID
+
+
+def preload_for_fork() -> bool:
+    """
+    Pentru serverul cu pre-fork (gunicorn `preload_app`): încarcă greutățile în master,
+    iar worker-ii le moștenesc prin copy-on-write în loc să încarce câte o copie.
+    Doar încărcare, fără forward pass: pool-urile de thread-uri ale torch se creează
+    abia în worker. ONNX Runtime își pornește thread-urile la crearea sesiunii, care
+    nu supraviețuiesc fork-ului, deci backend-ul "onnx" se încarcă în fiecare worker.
+    """
+    if _EMBED_BACKEND != "torch":
+        print(f"[INFO] EMBED_BACKEND={_EMBED_BACKEND}: modelul se încarcă în fiecare worker.")
+        return False
+    get_embed_model()
+    return True
+
+# -------- cache embeddings (model, text normalizat) -> vector float32 --------
+# Separat de cache-ul de rezultate al retriever-ului: aceeași întrebare cu alt `k`
+# sau alt `where` nu mai plătește încă un forward pass. Vectorii sunt deterministici,
+# deci nu expiră; sunt doar limitați ca număr și memorie.
+_EMBED_CACHE = LRUCache(
+    max_entries=settings.EMBED_CACHE_MAX_ENTRIES,
+    max_bytes=settings.EMBED_CACHE_MAX_BYTES,
+    ttl=float("inf"),
+)
+_embed_cache_loaded = False
+_embed_cache_lock = threading.Lock()
+
+
+def _normalize(text: str) -> str:
+    # tokenizer-ul separă oricum pe whitespace, deci vectorul rezultat este identic
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def _load_embed_cache() -> None:
+    """
+    Încarcă (o singură dată) snapshot-ul persistat în EMBED_CACHE_PATH, dacă există.
+    Formatul este un `.npz` citit cu `allow_pickle=False` (vezi `save_embed_cache`):
+    un fișier străin sau un snapshot pickle vechi este ignorat, nu executat.
+    """
+    global _embed_cache_loaded
+    if _embed_cache_loaded:
+        return
+    with _embed_cache_lock:
+        if _embed_cache_loaded:
+            return
+        _embed_cache_loaded = True
+        path = settings.EMBED_CACHE_PATH
+        if not path or not os.path.exists(path):
+            return
+        try:
+            with open(path, "rb") as fh, np.load(fh, allow_pickle=False) as snapshot:
+                header = json.loads(snapshot["keys"].tobytes().decode("utf-8"))
+                vectors = snapshot["vectors"]
+            if header.get("model") == _EMBED_MODEL_ID and len(header["texts"]) == len(vectors):
+                for text, vec in zip(header["texts"], vectors):
+                    _EMBED_CACHE.set((_EMBED_MODEL_ID, text), np.array(vec, copy=True))
+            print(f"[INFO] Embedding cache: {len(_EMBED_CACHE)} vectori încărcați din {path}")
+        except Exception as e:
+            print(f"[WARN] Embedding cache ignorat ({path}): {e}")
+
+
+def save_embed_cache() -> None:
+    """
+    Scrie cache-ul de embeddings în EMBED_CACHE_PATH (atomic: tmp + rename), ca `.npz`
+    fără obiecte Python: `vectors` (float32, n x dim) și `keys`, JSON-ul UTF-8
+    `{"model": ..., "texts": [...]}` cu textele normalizate în aceeași ordine
+    (de la cea mai veche la cea mai recentă intrare).
+    """
+    path = settings.EMBED_CACHE_PATH
+    if not path:
+        return
+    try:
+        items = [(key[1], vec) for key, vec in _EMBED_CACHE.items() if key[0] == _EMBED_MODEL_ID]
+        header = json.dumps({"model": _EMBED_MODEL_ID, "texts": [text for text, _ in items]}, ensure_ascii=False)
+        vectors = np.asarray([vec for _, vec in items], dtype=np.float32)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as fh:
+            np.savez(fh, keys=np.frombuffer(header.encode("utf-8"), dtype=np.uint8), vectors=vectors)
+        os.replace(tmp, path)
+    except Exception as e:
+        print(f"[WARN] Nu am putut salva embedding cache în {path}: {e}")
+
+
+def embed_cache_stats() -> Dict:
+    return _EMBED_CACHE.stats()
+
+
+if settings.EMBED_CACHE_PATH:
+    atexit.register(save_embed_cache)
+
+
+# -------- micro-batching: un singur thread deține modelul --------
+class _EmbedBatcher:
+    """
+    Apelurile concurente `embed()` (câte o interogare din fiecare thread al
+    threadpool-ului) sunt adunate până la `max_batch` texte, apoi codate într-un
+    singur `encode` pe thread-ul worker. Fiecare apelant primește un `Future` cu
+    vectorii lui. Cererile sosite cât timp modelul lucrează formează batch-ul
+    următor; fereastra de `max_wait` secunde se aplică doar sub încărcare (batch-ul
+    precedent a avut mai multe cereri), ca o cerere izolată să nu aștepte degeaba.
+
+    Thread-ul pornește la primul apel și este repornit după un fork (pid diferit).
+    """
+
+    def __init__(self, max_batch: int, max_wait: float, torch_threads: int):
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait))
+        self.torch_threads = int(torch_threads)
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._queue: "queue.Queue[Tuple[List[str], Future]]" = queue.Queue()
+        self._batches = 0
+        self._texts = 0
+        self._requests = 0
+
+    def submit(self, texts: List[str]) -> Future:
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue()
+                    threading.Thread(target=self._run, name="embed-batcher", daemon=True).start()
+                    self._pid = os.getpid()
+        fut: Future = Future()
+        self._queue.put((texts, fut))
+        return fut
+
+    def _pin_threads(self) -> None:
+        # un singur forward la un moment dat: thread-urile intra-op ale torch nu trebuie
+        # să concureze cu worker-ii uvicorn pentru toate nucleele (ONNX: în SessionOptions)
+        if _EMBED_BACKEND != "torch":
+            return
+        n = self.torch_threads or max(1, min(4, (os.cpu_count() or 2) // 2))
+        try:
+            import torch
+
+            torch.set_num_threads(n)
+            try:
+                torch.set_num_interop_threads(1)
+            except RuntimeError:
+                pass  # se poate seta doar înainte de primul forward
+        except ImportError:
+            pass
+
+    def _run(self) -> None:
+        self._pin_threads()
+        q = self._queue
+        busy = False
+        while True:
+            batch = [q.get()]
+            size = len(batch[0][0])
+            deadline = time.monotonic() + (self.max_wait if busy else 0.0)
+            while size < self.max_batch:
+                left = deadline - time.monotonic()
+                try:
+                    item = q.get(timeout=left) if left > 0 else q.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+                size += len(item[0])
+            busy = len(batch) > 1
+
+            flat = [t for texts, _ in batch for t in texts]
+            try:
+                encoded = get_embed_model().encode(flat, batch_size=max(len(flat), 1))
+            except Exception as e:
+                for _, fut in batch:
+                    fut.set_exception(e)
+                continue
+            self._batches += 1
+            self._texts += len(flat)
+            self._requests += len(batch)
+            start = 0
+            for texts, fut in batch:
+                fut.set_result(encoded[start:start + len(texts)])
+                start += len(texts)
+
+    def encode(self, texts: List[str]) -> List[np.ndarray]:
+        """Cererile mari (ingest) sunt trimise pe bucăți de `max_batch`, ca interogările să nu aștepte după ele."""
+        out: List[np.ndarray] = []
+        for start in range(0, len(texts), self.max_batch):
+            out.extend(self.submit(texts[start:start + self.max_batch]).result())
+        return out
+
+    def stats(self) -> Dict:
+        return {
+            "batches": self._batches,
+            "requests": self._requests,
+            "texts": self._texts,
+            "mean_batch": round(self._texts / self._batches, 2) if self._batches else 0.0,
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000.0,
+        }
+
+
+_BATCHER = _EmbedBatcher(
+    max_batch=settings.EMBED_BATCH_MAX,
+    max_wait=settings.EMBED_BATCH_WAIT_MS / 1000.0,
+    torch_threads=settings.EMBED_TORCH_THREADS,
+) if settings.EMBED_BATCHING else None
+
+
+def embed_batch_stats() -> Dict:
+    return _BATCHER.stats() if _BATCHER is not None else {"enabled": False}
+
+
+def _encode(texts: List[str]):
+    if _BATCHER is not None:
+        return _BATCHER.encode(texts)
+    return get_embed_model().encode(texts)
+
 
 # -------- embeddings (MOCA & LOCAL) --------
 def embed(texts: Iterable[str]) -> List[List[float]]:
     """
     Generează vectori local, fără a apela un API extern.
     Acest lucru face ca retriever.similar din chat_service să funcționeze.
+    Textele deja văzute sunt servite din cache; restul sunt codate într-un singur batch,
+    împreună cu cele ale apelurilor concurente (vezi `_EmbedBatcher`).
     """
     texts = [t if isinstance(t, str) else str(t) for t in texts]
     if not texts:
         return []
-    
-    # Generăm embeddings folosind procesorul local
-    embeddings = _embed_model.encode(texts)
-    return embeddings.tolist()
+    _load_embed_cache()
+
+    keys = [(_EMBED_MODEL_ID, _normalize(t)) for t in texts]
+    vectors: List[Optional[np.ndarray]] = [_EMBED_CACHE.get(k) for k in keys]
+
+    # deduplicăm textele lipsă, ca să nu codăm de două ori același text din batch
+    missing: Dict[tuple, List[int]] = {}
+    for i, v in enumerate(vectors):
+        if v is None:
+            missing.setdefault(keys[i], []).append(i)
+
+    if missing:
+        # Generăm embeddings folosind procesorul local
+        encoded = _encode([k[1] for k in missing])
+        for key, vec in zip(missing, encoded):
+            # copie proprie: un view ar ține în viață tot lotul și ar fi subestimat de cache
+            vec = np.array(vec, dtype=np.float32, copy=True)
+            _EMBED_CACHE.set(key, vec)
+            for i in missing[key]:
+                vectors[i] = vec
+
+    return [v.tolist() for v in vectors]
+
+
+def embed_documents(texts: Sequence[str]) -> np.ndarray:
+    """
+    Vectorii pentru documente la ingest, ca matrice float32 (n, dim): fără cache-ul de
+    interogări (textele nu se repetă și ar evacua interogările reale) și fără
+    conversia la liste Python.
+    """
+    texts = [t if isinstance(t, str) else str(t) for t in texts]
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+    return np.asarray(_encode([_normalize(t) for t in texts]), dtype=np.float32)
+
+
+# -------- numărare tokeni (bugetul de context pentru chat) --------
+_token_counter = None
+_token_counter_lock = threading.Lock()
+
+
+def _load_token_counter():
+    """
+    tiktoken (BPE apropiat de tokenizer-ul Llama 3 folosit pe Groq) dacă este instalat
+    și encoding-ul e disponibil local; altfel tokenizer-ul modelului de embeddings,
+    care e deja în memorie. Ultima variantă: număr de cuvinte.
+    """
+    try:
+        import tiktoken
+        enc = tiktoken.get_encoding(settings.RAG_CONTEXT_TOKENIZER)
+        return lambda text: len(enc.encode(text, disallowed_special=()))
+    except Exception:
+        pass
+    model = get_embed_model()
+    counter = getattr(model, "token_count", None)  # backend ONNX
+    if counter is not None:
+        return counter
+    tok = getattr(model, "tokenizer", None)
+    if tok is not None:
+        return lambda text: len(tok.encode(text, add_special_tokens=False, verbose=False))
+    print("[WARN] Niciun tokenizer disponibil; tokenii sunt estimați după numărul de cuvinte")
+    return lambda text: len(text.split())
+
+
+def count_tokens(text: str) -> int:
+    global _token_counter
+    if _token_counter is None:
+        with _token_counter_lock:
+            if _token_counter is None:
+                _token_counter = _load_token_counter()
+    return _token_counter(text or "")
 
 # -------- chat (GROQ ONLY) --------
 def chat_complete(messages: List[Dict], temperature: float = 0.2) -> Dict:
@@ -40,7 +382,7 @@ def chat_complete(messages: List[Dict], temperature: float = 0.2) -> Dict:
     t0 = time.time()
     
     # Groq folosește formatul standard Chat Completions
-    resp = _groq_client.chat.completions.create(
+    resp = _groq().chat.completions.create(
         model="llama-3.3-70b-versatile", # Cel mai capabil model gratuit de pe Groq
         messages=messages,
         temperature=temperature,
@@ -62,7 +404,7 @@ def chat_complete(messages: List[Dict], temperature: float = 0.2) -> Dict:
 # -------- chat streaming (SSE) --------
 def chat_complete_stream(messages: List[Dict], temperature: float = 0.2) -> Generator[str, None, None]:
     """Generator pentru streaming compatibil cu Groq."""
-    stream = _groq_client.chat.completions.create(
+    stream = _groq().chat.completions.create(
         model="llama-3.3-70b-versatile",
         messages=messages,
         temperature=temperature,
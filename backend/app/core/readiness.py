@@ -0,0 +1,93 @@
+# app/core/readiness.py
+"""
+Warm-up-ul serviciului, pornit din lifespan-ul FastAPI (`main.lifespan`).
+
+Importurile nu mai încarcă nimic greu: modelul de embeddings, store-ul vectorial,
+indexul BM25 și profilele langdetect sunt inițializate aici, pe un thread de
+fundal, iar /health/ready răspunde 503 până când toate etapele s-au terminat.
+O etapă eșuată (ex. store-ul încă indisponibil) este reîncercată cu backoff
+exponențial, fără a relua etapele reușite; procesul devine ready la prima reușită.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+_lock = threading.Lock()
+_ready = threading.Event()
+_state: Dict[str, Any] = {"stage": "pending", "error": None, "attempt": 0, "seconds": None, "steps_ms": {}}
+
+
+def _steps() -> List[Tuple[str, Callable[[], Any]]]:
+    # importuri întârziate: modulul rămâne ieftin de importat
+    from app.core import openai_client
+    from app.rag import retriever
+    from app.rag import lang
+
+    return [
+        ("embed_model", lambda: openai_client.embed(["warm-up"])),
+        ("vector_store", lambda: (retriever._collection().count(), retriever._books().count())),
+        ("bm25_index", retriever._sparse),
+        ("langdetect", lang.preload),
+        ("tokenizer", lambda: openai_client.count_tokens("warm-up")),
+    ]
+
+
+def warm_up() -> bool:
+    """
+    Rulează etapele în ordine. O etapă eșuată este reluată după WARMUP_RETRY_SECONDS,
+    pauză dublată la fiecare eșec până la WARMUP_RETRY_MAX_SECONDS; între timp
+    /health/ready arată etapa, eroarea și încercarea. Cu WARMUP_RETRY_SECONDS=0
+    primul eșec oprește warm-up-ul (False).
+    """
+    from app.core.config import get_settings
+
+    settings = get_settings()
+    t0 = time.perf_counter()
+    for name, step in _steps():
+        delay = settings.WARMUP_RETRY_SECONDS
+        attempt = 0
+        while True:
+            attempt += 1
+            with _lock:
+                _state["stage"] = name
+                _state["attempt"] = attempt
+            t = time.perf_counter()
+            try:
+                step()
+                break
+            except Exception as e:
+                with _lock:
+                    _state["error"] = f"{name}: {e}"
+                if delay <= 0:
+                    print(f"[ERROR] Warm-up eșuat la etapa '{name}': {e}")
+                    return False
+                print(f"[WARN] Warm-up eșuat la etapa '{name}' (încercarea {attempt}): {e}; "
+                      f"reîncerc în {delay:.1f}s")
+                time.sleep(delay)
+                delay = min(delay * 2, settings.WARMUP_RETRY_MAX_SECONDS)
+        with _lock:
+            _state["steps_ms"][name] = round((time.perf_counter() - t) * 1000.0, 1)
+    with _lock:
+        _state["stage"] = "done"
+        _state["error"] = None
+        _state["seconds"] = round(time.perf_counter() - t0, 3)
+    _ready.set()
+    print(f"[INFO] Warm-up complet în {_state['seconds']}s: {_state['steps_ms']}")
+    return True
+
+
+def start_warm_up() -> threading.Thread:
+    thread = threading.Thread(target=warm_up, name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+
+def status() -> Dict[str, Any]:
+    with _lock:
+        return {"ready": _ready.is_set(), **_state, "steps_ms": dict(_state["steps_ms"])}
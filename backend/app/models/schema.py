@@ -7,6 +7,8 @@ from uuid import UUID
 
 from pydantic import BaseModel, EmailStr, Field, field_validator
 
+from app.rag.filters import validate as validate_filter
+
 
 # =========================
 # AUTH
@@ -89,6 +91,12 @@ class ChatRequest(BaseModel):
     metadata: Optional[Dict] = None
     where: Optional[Dict] = None
 
+    @field_validator("metadata", "where")
+    @classmethod
+    def _check_filter(cls, v):
+        # filtre RAG în sintaxa Chroma; câmpuri / operatori necunoscuți -> 422
+        return validate_filter(v)
+
     # @field_validator("conversation_id")
     # @classmethod
     # def _coerce_uuid(cls, v):
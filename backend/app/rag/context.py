@@ -0,0 +1,144 @@
+# app/rag/context.py
+"""
+Asamblarea contextului din bibliotecă pentru prompt-ul de chat.
+
+Chunk-urile returnate de retriever sunt ferestre de 1200 de caractere cu suprapunere
+de 120 (vezi `ingest._chunks`), fiecare prefixată cu titlul. Înainte de a le trimite
+la LLM:
+  1. grupăm chunk-urile pe titlu și lipim indicii consecutivi (j, j+1), eliminând
+     textul suprapus și titlul repetat;
+  2. eliminăm pasajele duplicate sau incluse în altele;
+  3. împachetăm pasajele, în ordinea relevanței, într-un buget de tokeni
+     (RAG_CONTEXT_MAX_TOKENS), numărați cu tokenizer-ul real (`count_tokens`).
+     Ultimul pasaj care nu încape întreg este tăiat la o limită de cuvânt.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import get_settings
+from app.core.openai_client import count_tokens
+
+settings = get_settings()
+
+SEPARATOR = "\n---\n"
+EMPTY_CONTEXT = "Fără context suplimentar."
+
+_CHUNK_OVERLAP = 120   # suprapunerea folosită de `ingest._chunks`
+_MAX_OVERLAP = 400     # caractere căutate dacă chunk-urile vin din alt chunking
+_MIN_TAIL_TOKENS = 48  # sub atât, un pasaj tăiat nu mai aduce informație utilă
+
+
+def _column(rag_result: Dict[str, Any], field: str) -> List[Any]:
+    col = rag_result.get(field) or []
+    return list(col[0] or []) if col else []
+
+
+def _body(doc: str, title: str) -> str:
+    prefix = f"{title}\n\n"
+    return doc[len(prefix):] if title and doc.startswith(prefix) else doc
+
+
+def _join_overlapping(left: str, right: str) -> str:
+    """Lipește `right` după `left`, fără sufixul lui `left` care este și prefixul lui `right`."""
+    if len(right) >= _CHUNK_OVERLAP and left.endswith(right[:_CHUNK_OVERLAP]):
+        return left + right[_CHUNK_OVERLAP:]
+    for k in range(min(len(left), len(right), _MAX_OVERLAP), 0, -1):
+        if left.endswith(right[:k]):
+            return left + right[k:]
+    return f"{left}\n{right}"
+
+
+def _passages(rag_result: Dict[str, Any]) -> List[Tuple[int, str]]:
+    """(cel mai bun rang, text) per pasaj: chunk-uri ale aceluiași titlu, consecutive, lipite."""
+    docs = _column(rag_result, "documents")
+    metas = _column(rag_result, "metadatas")
+
+    groups: Dict[str, Dict[int, Tuple[int, str]]] = {}
+    loose: List[Tuple[int, str]] = []
+    for rank, doc in enumerate(docs):
+        if not doc:
+            continue
+        meta = (metas[rank] if rank < len(metas) else None) or {}
+        title = str(meta.get("title") or "")
+        chunk = meta.get("chunk")
+        if not title or not isinstance(chunk, int):
+            loose.append((rank, doc))
+            continue
+        chunks = groups.setdefault(title, {})
+        if chunk not in chunks:
+            chunks[chunk] = (rank, _body(doc, title))
+
+    out = list(loose)
+    for title, chunks in groups.items():
+        run_rank, run_text, prev = None, "", None
+        for j in sorted(chunks):
+            rank, body = chunks[j]
+            if prev is not None and j == prev + 1:
+                run_text = _join_overlapping(run_text, body)
+                run_rank = min(run_rank, rank)
+            else:
+                if run_rank is not None:
+                    out.append((run_rank, f"{title}\n\n{run_text}"))
+                run_rank, run_text = rank, body
+            prev = j
+        if run_rank is not None:
+            out.append((run_rank, f"{title}\n\n{run_text}"))
+
+    out.sort(key=lambda p: p[0])
+    unique: List[Tuple[int, str]] = []
+    for rank, text in out:
+        if any(text in kept for _, kept in unique):
+            continue
+        unique = [(r, kept) for r, kept in unique if kept not in text]
+        unique.append((rank, text))
+    unique.sort(key=lambda p: p[0])
+    return unique
+
+
+def _truncate(text: str, budget: int) -> str:
+    """Cel mai lung prefix (tăiat la spațiu) care are cel mult `budget` tokeni."""
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count_tokens(text[:mid]) <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    cut = text[:lo]
+    space = cut.rfind(" ")
+    return (cut[:space] if space > 0 and lo < len(text) else cut).rstrip() + " …"
+
+
+def build_context(rag_result: Dict[str, Any], max_tokens: Optional[int] = None) -> Tuple[str, Dict[str, int]]:
+    """
+    Contextul de trimis în prompt + statistici:
+    {chunks, passages, tokens_raw (join-ul naiv), tokens, tokens_saved, budget}.
+    """
+    budget = int(max_tokens if max_tokens is not None else settings.RAG_CONTEXT_MAX_TOKENS)
+    raw_docs = [d for d in _column(rag_result, "documents") if d]
+    stats = {"chunks": len(raw_docs), "passages": 0, "tokens_raw": 0, "tokens": 0, "tokens_saved": 0, "budget": budget}
+    if not raw_docs:
+        return EMPTY_CONTEXT, stats
+
+    stats["tokens_raw"] = count_tokens(SEPARATOR.join(raw_docs))
+    sep_tokens = count_tokens(SEPARATOR)
+
+    packed: List[str] = []
+    left = budget
+    for _, text in _passages(rag_result):
+        cost = count_tokens(text) + (sep_tokens if packed else 0)
+        if cost <= left:
+            packed.append(text)
+            left -= cost
+            continue
+        room = left - (sep_tokens if packed else 0)
+        if room >= _MIN_TAIL_TOKENS:
+            packed.append(_truncate(text, room - 1))
+        break
+
+    context = SEPARATOR.join(packed) if packed else EMPTY_CONTEXT
+    stats["passages"] = len(packed)
+    stats["tokens"] = count_tokens(context) if packed else 0
+    stats["tokens_saved"] = max(0, stats["tokens_raw"] - stats["tokens"])
+    return context, stats
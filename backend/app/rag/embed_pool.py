@@ -0,0 +1,75 @@
+# app/rag/embed_pool.py
+"""
+Embedding paralel pe procese, pentru ingest (`Settings.INGEST_WORKERS`).
+
+Un singur proces folosește doar nucleele pe care le dă torch unui forward; la un
+rebuild complet, loturile de chunk-uri sunt trimise la un pool de procese, fiecare
+cu propriul model, încărcat o singură dată (în `initializer`). Procesul de ingest
+rămâne singurul care scrie în store: primește vectorii lotului ca `Future` și
+face upsert-urile în ordinea loturilor.
+
+Procesele pornesc cu "spawn": părintele poate avea deja thread-uri torch / Chroma,
+care nu supraviețuiesc unui fork. Importurile aplicației sunt ieftine (modelul se
+încarcă leneș), deci un worker nou costă doar încărcarea modelului.
+"""
+from __future__ import annotations
+
+import multiprocessing as mp
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+
+
+def _worker_init(model_factory: Optional[Callable[[], object]], threads: int) -> None:
+    from app.core import openai_client
+
+    # un singur apelant per proces: fără thread-ul de micro-batching
+    openai_client._BATCHER = None
+    try:
+        import torch
+
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    if model_factory is not None:
+        openai_client._embed_model = model_factory()
+    openai_client.get_embed_model()
+
+
+def _worker_encode(texts: List[str]) -> np.ndarray:
+    from app.core.openai_client import embed_documents
+
+    return embed_documents(texts)
+
+
+class EmbedPool:
+    """
+    `submit(texts) -> Future[np.ndarray]`, executat într-unul din `workers` procese.
+    Thread-urile intra-op sunt împărțite între procese (nuclee / workers).
+    `model_factory` (funcție sau clasă la nivel de modul, ca să poată fi trimisă
+    procesului) înlocuiește modelul din setări, de ex. în benchmark-uri.
+    """
+
+    def __init__(self, workers: int, model_factory: Optional[Callable[[], object]] = None):
+        self.workers = max(1, int(workers))
+        threads = max(1, (os.cpu_count() or 1) // self.workers)
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=_worker_init,
+            initargs=(model_factory, threads),
+        )
+
+    def submit(self, texts: Sequence[str]) -> Future:
+        return self._pool.submit(_worker_encode, list(texts))
+
+    def close(self, cancel: bool = False) -> None:
+        self._pool.shutdown(wait=True, cancel_futures=cancel)
+
+    def __enter__(self) -> "EmbedPool":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close(cancel=exc_type is not None)
@@ -0,0 +1,82 @@
+# app/rag/embed_store.py
+"""
+Cache persistent de embeddings pentru ingest, adresat după conținut.
+
+Cheia este (modelul, sha256 al textului chunk-ului), deci nu depinde de id-uri,
+colecție sau CHROMA_DIR: o reconstrucție de la zero (nod nou, `chroma_store` șters,
+colecție redenumită) citește vectorii de pe disc în loc să îi recalculeze, iar
+embed-ul rămâne doar pentru textele niciodată văzute de modelul curent.
+
+Stocat în SQLite (`INGEST_EMBED_STORE`, implicit în afara CHROMA_DIR): hash-ul ca
+32 de octeți, vectorul ca float32 brut. Vectorii sunt deterministici per model,
+deci intrările nu expiră; un model diferit (sau varianta ONNX) are alte chei.
+"""
+from __future__ import annotations
+
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+_BATCH = 500  # parametri per instrucțiune (limita SQLite e 999 pe versiunile vechi)
+
+
+class EmbeddingStore:
+    """Tabela `vectors(model, hash, vec)`: sha256 hex -> vector float32, per model."""
+
+    def __init__(self, path: Path, model: str):
+        self.path = Path(path)
+        self.model = model
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        con = sqlite3.connect(self.path)
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute(
+            "CREATE TABLE IF NOT EXISTS vectors ("
+            " model TEXT NOT NULL, hash BLOB NOT NULL, vec BLOB NOT NULL,"
+            " PRIMARY KEY (model, hash)"
+            ") WITHOUT ROWID"
+        )
+        return con
+
+    def get(self, hashes: Sequence[str]) -> Dict[str, np.ndarray]:
+        """Vectorii cunoscuți pentru `hashes` (sha256 hex); cei lipsă nu apar în rezultat."""
+        out: Dict[str, np.ndarray] = {}
+        if not hashes or not self.path.exists():
+            return out
+        keys = list(dict.fromkeys(hashes))
+        with closing(self._connect()) as con:
+            for start in range(0, len(keys), _BATCH):
+                part = [bytes.fromhex(h) for h in keys[start:start + _BATCH]]
+                marks = ",".join("?" * len(part))
+                for h, vec in con.execute(
+                    f"SELECT hash, vec FROM vectors WHERE model = ? AND hash IN ({marks})", [self.model, *part]
+                ):
+                    out[h.hex()] = np.frombuffer(vec, dtype=np.float32)
+        return out
+
+    def put(self, rows: Iterable[Tuple[str, np.ndarray]]) -> None:
+        data = [(self.model, bytes.fromhex(h), np.asarray(v, dtype=np.float32).tobytes()) for h, v in rows]
+        if not data:
+            return
+        with closing(self._connect()) as con, con:
+            con.executemany("INSERT OR IGNORE INTO vectors (model, hash, vec) VALUES (?, ?, ?)", data)
+
+    def __len__(self) -> int:
+        if not self.path.exists():
+            return 0
+        with closing(self._connect()) as con:
+            return con.execute("SELECT COUNT(*) FROM vectors WHERE model = ?", (self.model,)).fetchone()[0]
+
+
+def open_store(model: str) -> Optional[EmbeddingStore]:
+    """Store-ul din `INGEST_EMBED_STORE` pentru `model`, sau None dacă este dezactivat."""
+    path = settings.INGEST_EMBED_STORE
+    return EmbeddingStore(Path(path), model) if path else None
@@ -0,0 +1,149 @@
+# app/rag/filters.py
+"""
+Evaluare locală a filtrelor `where` în sintaxa Chroma, pentru indexurile care
+nu trec prin Chroma (ex. indexul BM25). Suportă:
+  {"lang": "ro"}, {"genre": {"$eq": "fantasy"}}, $ne, $in, $nin, $gt, $gte, $lt, $lte,
+  {"$and": [...]}, {"$or": [...]}.
+
+`validate()` verifică / normalizează filtrele venite din API (ChatRequest.where /
+metadata) înainte să ajungă la Chroma.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Mapping, Optional
+
+# câmpurile din metadatele chunk-urilor (vezi `ingest._build_docs`)
+FILTER_FIELDS = ("title", "genre", "themes", "lang", "chunk")
+# câmpurile copiate și pe fișele de carte (`ingest._sync_book_cards`)
+BOOK_FIELDS = ("title", "genre", "themes", "lang")
+_OPS = ("$eq", "$ne", "$in", "$nin", "$gt", "$gte", "$lt", "$lte")
+_LOWERCASE = ("genre", "lang")  # normalizate la ingest
+_MAX_DEPTH = 4
+_MAX_VALUES = 100
+
+
+def _cmp(value: Any, op: str, arg: Any) -> bool:
+    if op == "$eq":
+        return value == arg
+    if op == "$ne":
+        return value != arg
+    if op == "$in":
+        return value in (arg or [])
+    if op == "$nin":
+        return value not in (arg or [])
+    if value is None:
+        return False
+    try:
+        if op == "$gt":
+            return value > arg
+        if op == "$gte":
+            return value >= arg
+        if op == "$lt":
+            return value < arg
+        if op == "$lte":
+            return value <= arg
+    except TypeError:
+        return False
+    raise ValueError(f"Operator where necunoscut: {op}")
+
+
+def matches(meta: Optional[Mapping[str, Any]], where: Optional[Dict[str, Any]]) -> bool:
+    """True dacă metadatele respectă filtrul (un filtru gol acceptă tot)."""
+    if not where:
+        return True
+    meta = meta or {}
+    for key, cond in where.items():
+        if key == "$and":
+            if not all(matches(meta, c) for c in cond):
+                return False
+        elif key == "$or":
+            if not any(matches(meta, c) for c in cond):
+                return False
+        elif isinstance(cond, dict):
+            if not all(_cmp(meta.get(key), op, arg) for op, arg in cond.items()):
+                return False
+        elif meta.get(key) != cond:
+            return False
+    return True
+
+
+def _scalar(field: str, value: Any) -> Any:
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise ValueError(f"Valoare invalidă pentru '{field}': {value!r}")
+    if isinstance(value, str) and field in _LOWERCASE:
+        return value.strip().lower()
+    return value
+
+
+def _clause(field: str, cond: Any) -> Dict[str, Any]:
+    if field not in FILTER_FIELDS:
+        raise ValueError(f"Câmp de filtrare necunoscut: '{field}' (permise: {', '.join(FILTER_FIELDS)})")
+    if not isinstance(cond, dict):
+        return {field: _scalar(field, cond)}
+    if len(cond) != 1:
+        raise ValueError(f"Filtrul pentru '{field}' trebuie să aibă exact un operator")
+    op, arg = next(iter(cond.items()))
+    if op not in _OPS:
+        raise ValueError(f"Operator necunoscut pentru '{field}': {op}")
+    if op in ("$in", "$nin"):
+        if not isinstance(arg, list) or not arg or len(arg) > _MAX_VALUES:
+            raise ValueError(f"'{op}' pentru '{field}' cere o listă cu 1-{_MAX_VALUES} valori")
+        return {field: {op: [_scalar(field, v) for v in arg]}}
+    return {field: {op: _scalar(field, arg)}}
+
+
+def validate(where: Optional[Dict[str, Any]], _depth: int = 0) -> Optional[Dict[str, Any]]:
+    """
+    Filtrul normalizat (None dacă e gol) sau ValueError cu motivul. Normalizări:
+    valori lowercase pentru genre / lang, un dict cu mai multe câmpuri devine $and
+    (Chroma acceptă un singur operator pe nivel), $and / $or cu un element se despachetează.
+    """
+    if not where:
+        return None
+    if not isinstance(where, dict):
+        raise ValueError("Filtrul trebuie să fie un obiect JSON")
+    if _depth > _MAX_DEPTH:
+        raise ValueError("Filtrul este prea adânc")
+    clauses: List[Dict[str, Any]] = []
+    for key, cond in where.items():
+        if key in ("$and", "$or"):
+            if not isinstance(cond, list) or not cond:
+                raise ValueError(f"'{key}' cere o listă nevidă de filtre")
+            parts = [p for p in (validate(c, _depth + 1) for c in cond) if p]
+            if len(parts) == 1:
+                clauses.append(parts[0])
+            elif parts:
+                clauses.append({key: parts})
+        else:
+            clauses.append(_clause(key, cond))
+    return combine(*clauses)
+
+
+def combine(*wheres: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Conjuncția filtrelor nevide (None dacă nu rămâne niciunul)."""
+    parts = [w for w in wheres if w]
+    if not parts:
+        return None
+    return parts[0] if len(parts) == 1 else {"$and": parts}
+
+
+def book_where(where: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Partea din `where` evaluabilă pe fișele de carte (doar `BOOK_FIELDS`), ca filtru
+    mai larg: o clauză pe câmpuri de chunk (ex. `chunk`) este scoasă din $and, iar un
+    $or cu o astfel de ramură nu mai restrânge nimic. Filtrul complet se aplică apoi
+    chunk-urilor cărților găsite.
+    """
+    if not where:
+        return None
+    clauses: List[Dict[str, Any]] = []
+    for key, cond in where.items():
+        if key == "$and":
+            clauses.extend(p for p in (book_where(c) for c in cond) if p)
+        elif key == "$or":
+            parts = [book_where(c) for c in cond]
+            if parts and all(parts):
+                clauses.append(parts[0] if len(parts) == 1 else {"$or": parts})
+        elif key in BOOK_FIELDS:
+            clauses.append({key: cond})
+    return combine(*clauses)
@@ -0,0 +1,55 @@
+# app/rag/generation.py
+"""
+Ștampila de "generație" a colecției.
+
+`ingest()` o incrementează după fiecare upsert reușit, iar retriever-ul o include
+în cheia de cache. Ștampila stă într-un fișier din CHROMA_DIR, deci toate
+procesele (worker-ii uvicorn) de pe același host văd aceeași valoare.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+GENERATION_FILE = Path(settings.CHROMA_DIR) / ".generation"
+
+_lock = threading.Lock()
+# (st_mtime_ns, st_size) -> valoarea citită ultima dată
+_seen: Optional[Tuple[Tuple[int, int], int]] = None
+
+
+def current() -> int:
+    """Generația curentă; 0 dacă nu a avut loc încă niciun ingest. Costă un stat()."""
+    global _seen
+    try:
+        st = os.stat(GENERATION_FILE)
+    except FileNotFoundError:
+        return 0
+    sig = (st.st_mtime_ns, st.st_size)
+    seen = _seen
+    if seen is not None and seen[0] == sig:
+        return seen[1]
+    try:
+        value = int(GENERATION_FILE.read_text(encoding="utf-8").strip() or 0)
+    except (OSError, ValueError):
+        return seen[1] if seen else 0
+    _seen = (sig, value)
+    return value
+
+
+def bump() -> int:
+    """Publică o generație nouă (scriere atomică: tmp + rename)."""
+    with _lock:
+        value = max(time.time_ns(), current() + 1)
+        GENERATION_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp = GENERATION_FILE.with_name(f"{GENERATION_FILE.name}.{os.getpid()}.tmp")
+        tmp.write_text(str(value), encoding="utf-8")
+        os.replace(tmp, GENERATION_FILE)
+        return value
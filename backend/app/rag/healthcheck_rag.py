@@ -3,10 +3,9 @@ import argparse
 import json
 from typing import List, Dict, Any
 
-import chromadb
-
 from app.core.config import get_settings
-from app.rag.retriever import similar
+from app.rag.retriever import similar_many
+from app.rag.vector_store import VectorStore, get_store
 
 
 def hr(title: str) -> None:
@@ -14,8 +13,7 @@ def hr(title: str) -> None:
     print("-" * len(title))
 
 
-def list_titles(client: chromadb.api.client.ClientAPI, name: str, limit: int = 50) -> List[Dict[str, Any]]:
-    col = client.get_or_create_collection(name=name)
+def list_titles(col: VectorStore, limit: int = 50) -> List[Dict[str, Any]]:
     total = col.count()
     items = []
     offset, page = 0, min(1000, limit)
@@ -47,14 +45,13 @@ def list_titles(client: chromadb.api.client.ClientAPI, name: str, limit: int = 5
 
 def run_healthcheck(list_limit: int, queries: List[str], k: int, where_json: str | None) -> int:
     settings = get_settings()
-    client = chromadb.PersistentClient(path=str(settings.CHROMA_DIR))
-
     hr("Chroma settings")
+    print("VECTOR_BACKEND    :", settings.VECTOR_BACKEND)
     print("CHROMA_DIR        :", settings.CHROMA_DIR)
     print("COLLECTION_NAME   :", settings.COLLECTION_NAME)
     print("EMBED_MODEL       :", settings.EMBED_MODEL)
 
-    col = client.get_or_create_collection(settings.COLLECTION_NAME)
+    col = get_store(settings.COLLECTION_NAME)
     total = col.count()
     print("COLLECTION COUNT  :", total)
 
@@ -64,7 +61,7 @@ def run_healthcheck(list_limit: int, queries: List[str], k: int, where_json: str
 
     # --- Listare titluri ---
     hr(f"Primele {min(list_limit, total)} iteme (titluri unice)")
-    res = list_titles(client, settings.COLLECTION_NAME, limit=min(list_limit, max(total, list_limit)))
+    res = list_titles(col, limit=min(list_limit, max(total, list_limit)))
     seen = set()
     idx = 1
     for it in res["items"]:
@@ -87,8 +84,7 @@ def run_healthcheck(list_limit: int, queries: List[str], k: int, where_json: str
 
     failed = 0
     hr("Interogări de test (RAG)")
-    for q in queries:
-        hits = similar(q, k=k, where=where)
+    for q, hits in zip(queries, similar_many(queries, k=k, where=where)):
         docs = (hits.get("documents") or [[]])[0]
         metas = (hits.get("metadatas") or [[]])[0]
         titles = [ (m or {}).get("title") for m in metas ]
@@ -3,14 +3,25 @@ from __future__ import annotations
 import json
 import os
 import re
+import sys
+import time
+from collections import deque
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
+import numpy as np
 from slugify import slugify  # pip install python-slugify
-import chromadb
 
 from app.core.config import get_settings
-from app.core.openai_client import embed
+from app.core.db import SessionLocal
+from app.core.openai_client import embed_documents, embed_model_id
+from app.rag import generation
+from app.rag.embed_pool import EmbedPool
+from app.rag.embed_store import EmbeddingStore, open_store
+from app.rag.manifest import Manifest, diff, meta_hash, text_hash
+from app.rag.sparse_index import INDEX_FILE, SparseIndex, term_stats
+from app.rag.vector_store import get_store
+from app.utils.logger import log_event
 
 settings = get_settings()
 
@@ -20,27 +31,85 @@ DATA_JSON = (DATA_DIR / SUMMARY_FILE)
 
 CHROMA_DIR = str(getattr(settings, "CHROMA_DIR", Path(__file__).resolve().parents[2] / "chroma_store"))
 COLLECTION_NAME = getattr(settings, "COLLECTION_NAME", "books")
+# o "fișă de carte" (un vector) per titlu + limbă, pentru prima etapă a retrieval-ului
+BOOKS_COLLECTION = f"{COLLECTION_NAME}_books"
 
 
 # ---------------- utils ----------------
-def _load_items() -> List[Dict[str, Any]]:
-    """Load JSON with books. Expect a list of {title, summary, ...}"""
+def _source_file() -> Path:
+    """Fișierul sursă: DATA_JSON sau, ca fallback, primul *.json / *.jsonl din data/."""
     if DATA_JSON.exists():
-        raw = DATA_JSON.read_text(encoding="utf-8")
-        data = json.loads(raw)
-        if not isinstance(data, list):
-            raise ValueError("Root must be a list of objects")
-        return data
-
-    # fallback: first *.json in data/
-    candidates = sorted(DATA_DIR.glob("*.json"))
+        return DATA_JSON
+    candidates = sorted([*DATA_DIR.glob("*.json"), *DATA_DIR.glob("*.jsonl")])
     if not candidates:
         raise FileNotFoundError(f"Missing {DATA_JSON} and no *.json in {DATA_DIR}")
-    raw = candidates[0].read_text(encoding="utf-8")
-    data = json.loads(raw)
-    if not isinstance(data, list):
-        raise ValueError("Root must be a list of objects")
-    return data
+    return candidates[0]
+
+
+def _iter_json_array(path: Path, read_size: int = 1 << 16) -> Iterator[Any]:
+    """
+    Elementele unei liste JSON, parsate incremental: în memorie stă doar bucata
+    citită curent + elementul în curs, nu tot fișierul.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as fh:
+        buf, pos, eof = "", 0, False
+
+        def fill() -> bool:
+            nonlocal buf, pos, eof
+            more = fh.read(read_size)
+            buf, pos, eof = buf[pos:] + more, 0, not more
+            return bool(more)
+
+        def skip(chars: str) -> None:
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in chars:
+                    pos += 1
+                if pos < len(buf) or not fill():
+                    return
+
+        skip(" \t\r\n\ufeff")
+        if pos >= len(buf) or buf[pos] != "[":
+            raise ValueError("Root must be a list of objects")
+        pos += 1
+        while True:
+            skip(" \t\r\n,")
+            if pos >= len(buf):
+                raise ValueError(f"JSON trunchiat: {path}")
+            if buf[pos] == "]":
+                return
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()  # elementul continuă în bucata următoare
+                continue
+            pos = end
+            yield obj
+
+
+def _iter_jsonl(path: Path) -> Iterator[Any]:
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def _iter_items(path: Optional[Path] = None) -> Iterator[Dict[str, Any]]:
+    """Cărțile din sursă, una câte una (listă JSON sau JSON Lines după extensie)."""
+    path = path or _source_file()
+    rows = _iter_jsonl(path) if path.suffix.lower() in (".jsonl", ".ndjson") else _iter_json_array(path)
+    for it in rows:
+        if isinstance(it, dict):
+            yield it
+
+
+def _load_items() -> List[Dict[str, Any]]:
+    """Load JSON with books. Expect a list of {title, summary, ...}"""
+    return list(_iter_items())
 
 
 # app/rag/ingest.py
@@ -61,53 +130,251 @@ def _chunks(text: Any, max_chars: int = 1200, overlap: int = 120):
 # app/rag/ingest.py
 # ... importuri ...
 
-def _build_docs(items: List[Dict[str, Any]]) -> Tuple[List[str], List[Dict[str, Any]], List[str]]:
-    docs, metas, ids = [], [], []
+# parametrii care schimbă chunk-urile fără ca elementul din sursă să se schimbe
+_CHUNKING = {"max_chars": 1200, "overlap": 120, "doc": "title+chunk"}
+
+
+def _item_fields(it: Dict[str, Any]) -> Optional[Tuple[str, str, str, str, str]]:
+    """(titlu, rezumat, gen, teme, limbă) normalizate sau None dacă elementul nu se indexează."""
+    # Folosim str() explicit pentru a evita orice eroare de tip 'unicode'
+    title = str(it.get("title") or "").strip() 
+    summary = str(it.get("summary") or "").strip()
+    
+    if not title or not summary:
+        return None
+
+    genre = str(it.get("genre") or "").strip().lower()
+    themes = it.get("themes") or []
+    
+    # Conversie sigură la string
+    themes_str = ", ".join(themes) if isinstance(themes, list) else str(themes)
+
+    lang = str(it.get("lang") or "").strip().lower()
+    if not lang:
+        # fără langdetect la ingest: doar verificăm caracterele (vezi și app.rag.lang)
+        lang = "ro" if re.search(r"[ăâîșşțţ]", summary.lower()) else "en"
+    return title, summary, genre, themes_str, lang
+
+
+def _item_key(fields: Tuple[str, str, str, str, str]) -> Tuple[str, str]:
+    """(book id `slug::lang`, hash-ul câmpurilor care ajung în chunk-uri)."""
+    title, _, _, _, lang = fields
+    raw = json.dumps([fields, _CHUNKING], ensure_ascii=False, separators=(",", ":"))
+    # Slugify transformă titlul în ID sigur pentru URL/DB
+    return f"{slugify(title)}::{lang}", text_hash(raw)
+
+
+def _iter_docs(items: Iterable[Dict[str, Any]]) -> Iterator[Tuple[str, Dict[str, Any], str, Dict[str, int]]]:
+    """
+    Chunk-urile de ingestat, câte unul: (document, metadate, id, statistici de termeni).
+    Statisticile (frecvențe per termen) se calculează aici o singură dată per chunk
+    și ajung în indexul BM25, ca rerank-ul să nu mai tokenizeze textul la interogare.
+    Chunk-urile unei cărți ies consecutiv.
+    """
     for it in items:
-        # Folosim str() explicit pentru a evita orice eroare de tip 'unicode'
-        title = str(it.get("title") or "").strip() 
-        summary = str(it.get("summary") or "").strip()
-        
-        if not title or not summary:
+        fields = _item_fields(it)
+        if fields is None:
             continue
-
-        genre = str(it.get("genre") or "").strip().lower()
-        themes = it.get("themes") or []
-        
-        # Conversie sigură la string
-        themes_str = ", ".join(themes) if isinstance(themes, list) else str(themes)
-
-        lang = str(it.get("lang") or "").strip().lower()
-        if not lang:
-            # langdetect este pre-loaded in main.py, aici doar verificăm caracterele
-            lang = "ro" if re.search(r"[ăâîșşțţ]", summary.lower()) else "en"
-
-        for j, ch in enumerate(_chunks(summary)):
-            docs.append(f"{title}\n\n{ch}")
-            metas.append({
+        title, summary, genre, themes_str, lang = fields
+        slug = slugify(title)
+        for j, ch in enumerate(_chunks(summary, _CHUNKING["max_chars"], _CHUNKING["overlap"])):
+            doc = f"{title}\n\n{ch}"
+            meta = {
                 "title": title,
                 "genre": genre,
                 "themes": themes_str,
                 "lang": lang,
                 "chunk": j,
-            })
-            # Slugify transformă titlul în ID sigur pentru URL/DB
-            ids.append(f"{slugify(title)}::{lang}::{j}")
-    return docs, metas, ids
-
-def _existing_ids(collection) -> set[str]:
-    """Page through the collection to get all ids."""
-    out = set()
+            }
+            yield doc, meta, f"{slug}::{lang}::{j}", term_stats(doc)
+
+
+def _changed_items(
+    manifest: Manifest,
+    items: Iterable[Dict[str, Any]],
+    stats: Dict[str, int],
+    pending: Dict[str, str],
+    batch: int = 512,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Doar elementele noi sau schimbate față de tabela `books` a manifestului; celelalte
+    sunt marcate ca văzute și numărate în `stats`, fără chunking, BM25 sau embed.
+    `pending` primește book id -> hash pentru elementele trimise mai departe (scrise
+    în manifest după upsert-ul lotului lor).
+    """
+    def flush(buf: List[Tuple[str, str, Dict[str, Any]]]) -> Iterator[Dict[str, Any]]:
+        known = manifest.book_lookup([key for key, _, _ in buf])
+        manifest.mark_books_seen(key for key, _, _ in buf)
+        for key, h, it in buf:
+            have = known.get(key)
+            if have is not None and have[0] == h:
+                stats["unchanged_chunks"] += have[1]
+                continue
+            pending[key] = h
+            yield it
+
+    buf: List[Tuple[str, str, Dict[str, Any]]] = []
+    for it in items:
+        stats["items"] += 1
+        fields = _item_fields(it)
+        if fields is None:
+            continue
+        stats["books"] += 1
+        key, h = _item_key(fields)
+        buf.append((key, h, it))
+        if len(buf) >= batch:
+            yield from flush(buf)
+            buf = []
+    if buf:
+        yield from flush(buf)
+
+
+def _build_docs(
+    items: List[Dict[str, Any]],
+) -> Tuple[List[str], List[Dict[str, Any]], List[str], List[Dict[str, int]]]:
+    """Toate chunk-urile, materializate: (documente, metadate, id-uri, statistici de termeni)."""
+    docs, metas, ids, terms = [], [], [], []
+    for doc, meta, doc_id, t in _iter_docs(items):
+        docs.append(doc); metas.append(meta); ids.append(doc_id); terms.append(t)
+    return docs, metas, ids, terms
+
+
+def _batches(
+    rows: Iterable[Tuple[str, Dict[str, Any], str, Dict[str, int]]], size: int
+) -> Iterator[Tuple[List[str], List[Dict[str, Any]], List[str], List[Dict[str, int]]]]:
+    """
+    Loturi de ~`size` chunk-uri, tăiate doar între cărți: fișa de carte și orfanele
+    unei cărți (chunk-uri dispărute după scurtarea rezumatului) se rezolvă în lotul ei.
+    """
+    docs, metas, ids, terms = [], [], [], []
+    for doc, meta, doc_id, t in rows:
+        if len(ids) >= size and book_id(doc_id) != book_id(ids[-1]):
+            yield docs, metas, ids, terms
+            docs, metas, ids, terms = [], [], [], []
+        docs.append(doc); metas.append(meta); ids.append(doc_id); terms.append(t)
+    if ids:
+        yield docs, metas, ids, terms
+
+def _reconcile(collection, manifest: Manifest, page: int = 1000) -> None:
+    """
+    Aliniază manifestul cu starea reală a colecției, pagină cu pagină: id-urile fără
+    intrare (colecții ingestate înainte de manifest) sunt hash-uite din documentele /
+    metadatele stocate, iar intrările pentru id-uri care nu mai există sunt eliminate.
+    """
+    manifest.start_scan()
+    hashed = dropped = 0
     offset = 0
-    page = 1000
     while True:
-        res = collection.get(limit=page, offset=offset)
+        res = collection.get(limit=page, offset=offset, include=[])
         ids = res.get("ids") or []
         if not ids:
             break
-        out.update(ids)
         offset += len(ids)
-    return out
+        known = manifest.lookup(ids)
+        unknown = [i for i in ids if i not in known]
+        if unknown:
+            got = collection.get(ids=unknown, include=["documents", "metadatas"])
+            manifest.put(
+                (i, text_hash(d or ""), meta_hash(m))
+                for i, d, m in zip(got.get("ids") or [], got.get("documents") or [], got.get("metadatas") or [])
+            )
+            hashed += len(unknown)
+        manifest.mark_seen(ids)
+    for stale in manifest.unseen():
+        manifest.delete(stale)
+        dropped += len(stale)
+    if hashed or dropped:
+        print(f"[INFO] Manifest reconciliat cu colecția: {hashed} intrări noi, {dropped} eliminate.")
+
+
+def _sync_sparse_index(
+    index: SparseIndex,
+    terms: List[Dict[str, int]],
+    metas: List[Dict[str, Any]],
+    ids: List[str],
+    replace: Optional[set] = None,
+    removed: Sequence[str] = (),
+) -> int:
+    """
+    Aduce indexul BM25 la zi pentru un lot: adaugă chunk-urile care lipsesc, re-indexează
+    pe cele din `replace` (text sau metadate schimbate) și scoate id-urile `removed`.
+    Întoarce câte chunk-uri au fost (re)indexate sau scoase; salvarea e la final.
+    """
+    replace = replace or set()
+    touched = 0
+    for i in removed:
+        if i in index:
+            index.remove(i)
+            touched += 1
+    for t, m, i in zip(terms, metas, ids):
+        if i not in index or i in replace:
+            index.add(i, t, m)
+            touched += 1
+    return touched
+
+
+def book_id(chunk_id: str) -> str:
+    """`slug::lang::j` -> `slug::lang` (id-ul fișei de carte)."""
+    return chunk_id.rsplit("::", 1)[0]
+
+
+def _sync_book_cards(
+    col,
+    ids: List[str],
+    metas: List[Dict[str, Any]],
+    fresh: Dict[str, Any],
+    touched: Iterable[str] = (),
+    removed: Sequence[str] = (),
+) -> int:
+    """
+    Vectorul fișei de carte = media normalizată a embeddings-urilor chunk-urilor ei.
+    Se (re)calculează doar pentru cărțile cu chunk-uri noi sau schimbate (`fresh`:
+    id -> vector), cu chunk-uri șterse (`touched`) sau fără fișă; restul vectorilor
+    necesari sunt citiți din colecție. Fișele cărților fără niciun chunk rămas
+    (`removed`: id-urile de chunk șterse) sunt șterse. Întoarce câte fișe s-au schimbat.
+    """
+    cards = get_store(BOOKS_COLLECTION)
+    by_book: Dict[str, List[int]] = {}
+    for pos, chunk_id in enumerate(ids):
+        by_book.setdefault(book_id(chunk_id), []).append(pos)
+
+    gone = sorted({book_id(i) for i in removed} - set(by_book))
+    if gone:
+        cards.delete(gone)
+
+    if not by_book:
+        return len(gone)
+    touched = set(touched)
+    have = set(cards.get(ids=list(by_book), include=[]).get("ids") or [])
+    todo = [b for b, rows in by_book.items()
+            if b not in have or b in touched or any(ids[p] in fresh for p in rows)]
+    if not todo:
+        return len(gone)
+
+    vectors = dict(fresh)
+    need = [ids[p] for b in todo for p in by_book[b] if ids[p] not in vectors]
+    for start in range(0, len(need), 1000):
+        got = col.get(ids=need[start:start + 1000], include=["embeddings"])
+        embs = got.get("embeddings")
+        vectors.update(zip(got.get("ids") or [], embs if embs is not None else []))
+
+    card_ids, card_vecs, card_docs, card_metas = [], [], [], []
+    for b in todo:
+        rows = [vectors[ids[p]] for p in by_book[b] if ids[p] in vectors]
+        if not rows:
+            continue
+        v = np.asarray(rows, dtype=np.float32).mean(axis=0)
+        v /= max(float(np.linalg.norm(v)), 1e-12)
+        first = metas[by_book[b][0]]
+        meta = {k: first[k] for k in ("title", "genre", "themes", "lang") if k in first}
+        meta["chunks"] = len(by_book[b])
+        card_ids.append(b)
+        card_vecs.append(v)
+        card_docs.append(meta.get("title", b))
+        card_metas.append(meta)
+    if card_ids:
+        cards.upsert(ids=card_ids, embeddings=np.vstack(card_vecs), documents=card_docs, metadatas=card_metas)
+    return len(card_ids) + len(gone)
 
 
 # def ingest() -> None:
@@ -150,45 +417,283 @@ def _existing_ids(collection) -> set[str]:
 
 
 
-def ingest() -> None:
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2**20 if sys.platform == "darwin" else 2**10)
+
+
+def _plan_batch(
+    manifest: Manifest,
+    docs: List[str],
+    metas: List[Dict[str, Any]],
+    ids: List[str],
+    terms: List[Dict[str, int]],
+) -> Dict[str, Any]:
+    """Diff-ul unui lot (cărți întregi) față de manifest: ce se scrie, ce se codează, ce se șterge."""
+    desired = {i: (text_hash(d), meta_hash(m)) for i, d, m in zip(ids, docs, metas)}
+    current = manifest.lookup(ids)
+    added, changed, retagged, _, unchanged = diff(desired, current)
+    pos = {i: p for p, i in enumerate(ids)}
+    # chunk-urile cărților din lot care nu mai există (rezumat scurtat)
+    orphans = [i for i in manifest.with_prefix(sorted({f"{book_id(i)}::" for i in ids})) if i not in pos]
+    manifest.mark_seen(ids)
+    return {
+        "docs": docs, "metas": metas, "ids": ids, "terms": terms, "pos": pos,
+        "desired": desired, "current": current, "orphans": orphans,
+        "added": added, "changed": changed, "retagged": retagged, "unchanged": unchanged,
+        "to_embed": added + changed, "need": added + changed, "hits": {},
+    }
+
+
+def _lookup_vectors(store: Optional[EmbeddingStore], plan: Dict[str, Any]) -> List[str]:
+    """Caută `plan["to_embed"]` în cache-ul persistent (-> plan["hits"]); întoarce id-urile de codat."""
+    todo, desired = plan["to_embed"], plan["desired"]
+    if store is not None and todo:
+        known = store.get([desired[i][0] for i in todo])
+        plan["hits"] = {i: known[desired[i][0]] for i in todo if desired[i][0] in known}
+        plan["need"] = [i for i in todo if i not in plan["hits"]]
+    return plan["need"]
+
+
+def _merge_vectors(store: Optional[EmbeddingStore], plan: Dict[str, Any], vectors) -> Optional[np.ndarray]:
+    """Vectorii pentru `plan["to_embed"]`: cei din cache + cei tocmai codați (adăugați în cache)."""
+    fresh: Dict[str, Any] = dict(plan["hits"])
+    if plan["need"]:
+        computed = list(zip(plan["need"], vectors))
+        fresh.update(computed)
+        if store is not None:
+            store.put((plan["desired"][i][0], v) for i, v in computed)
+    if not fresh:
+        return None
+    return np.vstack([fresh[i] for i in plan["to_embed"]])
+
+
+def _write_batch(col, manifest: Manifest, index: SparseIndex, plan: Dict[str, Any], vectors) -> Dict[str, int]:
+    """
+    Scrie un lot planificat de `_plan_batch`, cu `vectors` = embeddings-urile pentru
+    `plan["to_embed"]`: delete orfane, upsert, manifest, BM25, fișe de carte.
+    """
+    docs, metas, ids, pos = plan["docs"], plan["metas"], plan["ids"], plan["pos"]
+    desired, current, orphans = plan["desired"], plan["current"], plan["orphans"]
+    changed, retagged = plan["changed"], plan["retagged"]
+    out = {"added": len(plan["added"]), "updated": len(changed) + len(retagged), "deleted": len(orphans),
+           "unchanged": len(plan["unchanged"]), "embedded": len(plan["need"]), "cached": len(plan["hits"])}
+
+    writes = plan["to_embed"] + retagged
+    fresh: Dict[str, Any] = dict(zip(plan["to_embed"], vectors if vectors is not None else []))
+    if retagged:
+        # doar metadatele s-au schimbat: păstrăm vectorul existent
+        got = col.get(ids=retagged, include=["embeddings"])
+        embs = got.get("embeddings")
+        fresh.update(zip(got.get("ids") or [], embs if embs is not None else []))
+        missing = [i for i in retagged if i not in fresh]
+        if missing:
+            fresh.update(zip(missing, embed_documents([docs[pos[i]] for i in missing])))
+            out["embedded"] += len(missing)
+
+    moved = [i for i in changed + retagged if current[i][1] != desired[i][1]]
+    if settings.RAG_SHARD_BY and moved:
+        # câmpul de sharding poate fi schimbat: vechea copie ar rămâne în alt shard
+        col.delete(moved)
+        # la fel fișa cărții: upsert-ul din `_sync_book_cards` o scrie în shard-ul nou
+        get_store(BOOKS_COLLECTION).delete(sorted({book_id(i) for i in moved}))
+    if orphans:
+        col.delete(orphans)
+    if writes:
+        col.upsert(ids=writes, embeddings=np.vstack([fresh[i] for i in writes]),
+                   documents=[docs[pos[i]] for i in writes], metadatas=[metas[pos[i]] for i in writes])
+    manifest.delete(orphans)
+    manifest.put((i, *desired[i]) for i in writes)
+
+    out["indexed"] = _sync_sparse_index(index, plan["terms"], metas, ids, replace=set(changed) | set(retagged),
+                                        removed=orphans)
+    # fișele cărților schimbate + cele lipsă (colecții ingestate înainte de retrieval-ul ierarhic)
+    out["carded"] = _sync_book_cards(col, ids, metas, fresh, touched={book_id(i) for i in orphans})
+    return out
+
+
+def ingest(
+    workers: Optional[int] = None,
+    model_factory: Optional[Callable[[], Any]] = None,
+    allow_empty: bool = False,
+) -> Dict[str, int]:
+    """
+    Ingest incremental și în flux: sursa e parsată element cu element, chunk-urile
+    sunt procesate în loturi de `INGEST_BATCH_SIZE` (memoria nu crește cu mărimea
+    catalogului), iar manifestul (`app.rag.manifest`) decide per chunk: embed doar
+    pentru textul nou sau schimbat, upsert fără embed pentru metadate schimbate,
+    delete pentru id-urile dispărute. Întoarce contoarele
+    added / updated / deleted / unchanged / embedded / cached; o eroare este logată
+    (INGEST_ERROR) și propagată.
+
+    Înainte de embed, textele sunt căutate în cache-ul persistent
+    (`app.rag.embed_store`, cheie = model + sha256 al textului): o reconstrucție de la
+    zero a colecției recitește vectorii de pe disc; doar textele noi trec prin model.
+
+    Verificarea fără schimbări costă O(1) când amprenta sursei și numărul de vectori
+    coincid cu cele de la ultimul ingest reușit; altfel elementele cu hash-ul neschimbat
+    (tabela `books`) sunt sărite fără chunking. Colecția este parcursă (`_reconcile`)
+    doar dacă manifestul nu mai corespunde cu ea (ingest întrerupt, număr diferit).
+
+    Cu `workers` > 1 (implicit `INGEST_WORKERS`) loturile sunt codate în paralel de un
+    pool de procese (`app.rag.embed_pool`), iar scrierile rămân în acest proces, în
+    ordinea loturilor. `model_factory` înlocuiește modelul în procesele pool-ului
+    (și are cheile lui în cache).
+
+    O sursă fără nicio carte validă (goală, sau fără titluri) este de obicei un fișier
+    scris pe jumătate: colecția rămâne neatinsă și ingest-ul se oprește cu un avertisment
+    (INGEST_EMPTY). Cu `allow_empty` cărțile dispărute sunt șterse ca de obicei, deci
+    colecția și indexul BM25 se golesc.
+
+    Memorie: sursa, chunk-urile și vectorii sunt ținuți câte un lot, dar indexul BM25
+    (`SparseIndex`: statisticile de termeni și metadatele fiecărui chunk) este încărcat
+    întreg și salvat la final, iar backend-ul "flat" ține documentele colecției în proces.
+    RSS-ul maxim crește deci liniar cu catalogul (coloanele "RSS MB" / "BM25 RAM" din
+    `benchmarks.bench_ingest`).
+    """
+    report = {"added": 0, "updated": 0, "deleted": 0, "unchanged": 0, "embedded": 0, "cached": 0}
+    index: Optional[SparseIndex] = None
+    indexed = 0
+    workers = settings.INGEST_WORKERS if workers is None else workers
+    model_id = embed_model_id() if model_factory is None else f"{model_factory.__module__}.{model_factory.__qualname__}"
+    store = open_store(model_id)
+    pool = EmbedPool(workers, model_factory) if workers > 1 else None
+    # loturi trimise la pool și încă nescrise: destule cât să țină toate procesele ocupate
+    inflight: Deque[Tuple[Dict[str, Any], Any]] = deque()
+    max_inflight = 2 * workers
     # Inițializăm o sesiune DB pentru logare
     db = SessionLocal()
     try:
-        client = chromadb.PersistentClient(path=CHROMA_DIR)
-        col = client.get_or_create_collection(COLLECTION_NAME)
-
-        items = _load_items()
-        if not items:
-            print("[INFO] No items found.")
-            log_event(db, None, "INGEST_EMPTY", "system/ingest", "Nu s-au găsit cărți pentru ingestie.")
-            return
-
-        docs, metas, ids = _build_docs(items)
-        if not docs:
-            print("[INFO] Nothing to ingest.")
-            return
-
-        existed = _existing_ids(col)
-        new_docs, new_metas, new_ids = [], [], []
-        for d, m, i in zip(docs, metas, ids):
-            if i not in existed:
-                new_docs.append(d); new_metas.append(m); new_ids.append(i)
-
-        if not new_docs:
-            print("[INFO] Nimic nou de ingestat (idempotent).")
+        col = get_store(COLLECTION_NAME)
+        manifest = Manifest(COLLECTION_NAME)
+        source = _source_file()
+        st = source.stat()
+        fingerprint = f"{source.resolve()}|{st.st_size}|{st.st_mtime_ns}"
+
+        # manifestul reflectă colecția dacă ultimul ingest s-a terminat și numărul de
+        # vectori nu s-a schimbat de atunci; altfel reconciliem (trecere O(colecție))
+        count = col.count()
+        clean = (manifest.get_state("dirty") == "0" and manifest.get_state("count") == str(count)
+                 and INDEX_FILE.exists())
+        if clean and manifest.get_state("source") == fingerprint:
+            report["unchanged"] = count
+            print(f"[INFO] Nimic nou de ingestat (sursa și colecția neschimbate, {count} chunk-uri).")
+            log_event(db, None, "INGEST_CHECK", "system/ingest", "Verificare efectuată: baza de date este deja la zi.")
+            return report
+        if not clean:
+            _reconcile(col, manifest)
+            manifest.clear_books()
+        index = SparseIndex.load() or SparseIndex()
+        manifest.start_scan()
+        stats = {"items": 0, "books": 0, "unchanged_chunks": 0}
+        pending: Dict[str, str] = {}
+        n_chunks = carded = 0
+
+        t0 = last = time.perf_counter()
+
+        is_dirty = False
+
+        def dirty() -> None:
+            # un ingest întrerupt după acest punct forțează reconcilierea la următorul
+            nonlocal is_dirty
+            if not is_dirty:
+                manifest.set_state(dirty=1)
+                is_dirty = True
+
+        def write(plan: Dict[str, Any], vectors) -> None:
+            nonlocal indexed, carded, n_chunks, last
+            dirty()
+            done = _write_batch(col, manifest, index, plan, _merge_vectors(store, plan, vectors))
+            indexed += done.pop("indexed")  # salvat în `finally`, în pas cu manifestul
+            carded += done.pop("carded")
+            for key, value in done.items():
+                report[key] += value
+            per_book: Dict[str, int] = {}
+            for i in plan["ids"]:
+                per_book[book_id(i)] = per_book.get(book_id(i), 0) + 1
+            manifest.put_books((b, pending.pop(b), n) for b, n in per_book.items() if b in pending)
+            n_chunks += len(plan["ids"])
+            now = time.perf_counter()
+            if now - last >= settings.INGEST_PROGRESS_SECONDS:
+                last = now
+                print(f"[INFO] Ingest: {stats['items']} cărți citite, {n_chunks} chunk-uri "
+                      f"({n_chunks / (now - t0):.0f}/s), {report['embedded']} embeddings…")
+
+        items = _changed_items(manifest, _iter_items(source), stats, pending)
+        for docs, metas, ids, terms in _batches(_iter_docs(items), settings.INGEST_BATCH_SIZE):
+            plan = _plan_batch(manifest, docs, metas, ids, terms)
+            texts = [docs[plan["pos"][i]] for i in _lookup_vectors(store, plan)]
+            if pool is None:
+                write(plan, embed_documents(texts) if texts else None)
+                continue
+            inflight.append((plan, pool.submit(texts) if texts else None))
+            while len(inflight) > max_inflight:
+                plan, fut = inflight.popleft()
+                write(plan, fut.result() if fut is not None else None)
+        while inflight:
+            plan, fut = inflight.popleft()
+            write(plan, fut.result() if fut is not None else None)
+        report["unchanged"] += stats["unchanged_chunks"]
+        n_items = stats["items"]
+
+        if not stats["books"] and not allow_empty:
+            # fără `allow_empty`, o sursă goală nu șterge catalogul existent
+            msg = (f"Sursa nu conține nicio carte validă ({n_items} elemente); cele {len(manifest)} "
+                   f"chunk-uri existente rămân în colecție (allow_empty / --allow-empty pentru a o goli).")
+            print(f"[WARN] {msg}")
+            log_event(db, None, "INGEST_EMPTY", "system/ingest", msg)
+            return report
+
+        # cărțile care au dispărut complet din sursă
+        def drop(chunk_ids: List[str]) -> None:
+            nonlocal indexed, carded
+            dirty()
+            col.delete(chunk_ids)
+            manifest.delete(chunk_ids)
+            indexed += _sync_sparse_index(index, [], [], [], removed=chunk_ids)
+            carded += _sync_book_cards(col, [], [], {}, removed=chunk_ids)
+            report["deleted"] += len(chunk_ids)
+
+        for gone in manifest.unseen_books():
+            chunk_ids = manifest.with_prefix(f"{b}::" for b in gone)
+            if chunk_ids:
+                drop(chunk_ids)
+            manifest.delete_books(gone)
+        if not clean:
+            # trecere completă: toate chunk-urile din sursă au fost marcate
+            for gone in manifest.unseen():
+                drop(gone)
+
+        if indexed:
+            print(f"[INFO] BM25 index: {indexed} chunk-uri (re)indexate sau scoase.")
+        if carded:
+            print(f"[INFO] Fișe de carte: {carded} actualizate în '{BOOKS_COLLECTION}'.")
+
+        manifest.set_state(source=fingerprint, count=col.count(), dirty=0)
+
+        elapsed = time.perf_counter() - t0
+        rss = _peak_rss_mb()
+        summary = ", ".join(f"{k}={v}" for k, v in report.items())
+        print(f"[INFO] {n_items} cărți citite, {n_chunks} chunk-uri procesate în {elapsed:.1f}s "
+              f"({n_chunks / max(elapsed, 1e-9):.0f} chunk-uri/s)" + (f", RSS maxim {rss:.0f} MB." if rss else "."))
+
+        if not (report["added"] or report["updated"] or report["deleted"]):
+            if indexed or carded:
+                generation.bump()
+            print(f"[INFO] Nimic nou de ingestat (idempotent): {summary}.")
             # Logăm faptul că s-a verificat, dar nu a fost nevoie de update
             log_event(db, None, "INGEST_CHECK", "system/ingest", "Verificare efectuată: baza de date este deja la zi.")
-            return
-
-        print(f"[INFO] Generating embeddings for {len(new_docs)} chunks…")
-        vectors = embed(new_docs)
-        
-        print(f"[INFO] Upserting {len(new_docs)} docs into '{COLLECTION_NAME}'…")
-        col.upsert(ids=new_ids, embeddings=vectors, documents=new_docs, metadatas=new_metas)
-        
-        success_msg = f"Ingestie reușită: {len(new_docs)} chunk-uri noi din {len(items)} cărți."
+            return report
+
+        # invalidează cache-ul retriever-ului în toți worker-ii de pe host
+        generation.bump()
+
+        success_msg = f"Ingestie reușită din {n_items} cărți: {summary}."
         print(f"[DONE] {success_msg}")
-        
+
         # Logăm succesul procesului
         log_event(db, None, "INGEST_SUCCESS", "system/ingest", success_msg)
 
@@ -197,11 +702,36 @@ def ingest() -> None:
         print(f"[ERROR] {error_msg}")
         # Logăm eroarea în MySQL pentru a o vedea în panoul de control
         log_event(db, None, "INGEST_ERROR", "system/ingest", error_msg, status="ERROR")
+        # apelantul (watcher-ul, CLI-ul) trebuie să vadă eșecul, nu un raport parțial
+        raise
     finally:
+        if pool is not None:
+            pool.close(cancel=bool(inflight))
+        try:
+            # backend-ul "flat" ține scrierile loturilor în jurnal: o singură compactare la final
+            get_store(COLLECTION_NAME).flush()
+            get_store(BOOKS_COLLECTION).flush()
+        except Exception as e:
+            print(f"[WARN] Compactarea vector store-ului a eșuat: {e}")
+        if index is not None and indexed:
+            # și după o eroare: loturile scrise sunt deja în manifest
+            index.save()
         db.close()
+    return report
 
 def main():
-    ingest()
+    import argparse
+
+    p = argparse.ArgumentParser(description="Ingest incremental al rezumatelor în vector store")
+    p.add_argument("--workers", type=int, default=None, help="Procese de embedding (implicit INGEST_WORKERS)")
+    p.add_argument("--allow-empty", action="store_true",
+                   help="O sursă fără cărți golește colecția (implicit ingest-ul se oprește)")
+    args = p.parse_args()
+    from app.core.leader import run_lock
+
+    # serverul poate rula chiar acum un ingest (watcher-ul liderului): așteptăm să termine
+    with run_lock():
+        ingest(workers=args.workers, allow_empty=args.allow_empty)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,65 @@
+# app/rag/lang.py
+"""
+Detecția ieftină a limbii unei interogări, pentru pre-filtrarea pe `lang`.
+
+1. diacritice românești -> "ro" (aceeași euristică ca în `ingest._build_docs`);
+2. cuvinte de legătură frecvente ro / en, numărate pe ambele liste;
+3. altfel langdetect (memorat per text), doar pentru texte de câteva cuvinte.
+
+None = nesigur: apelantul nu filtrează.
+"""
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Optional
+
+RO_DIACRITICS = re.compile(r"[ăâîșşțţ]")
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+_RO_WORDS = frozenset("""
+    si sau despre carte carti cartea cartile este sunt cu pentru din care ce cum vreau caut
+    recomanda recomandati imi mi ceva asemanator asemanatoare mai ar fi poti puteti unde cine
+    roman romane poveste despre niste una unei unui sa nu
+""".split())
+_EN_WORDS = frozenset("""
+    the and or about book books novel novels is are with for from which what how want looking
+    recommend something similar like more would could can where who story some that this any
+""".split())
+
+_MIN_WORDS_LANGDETECT = 4
+
+
+@lru_cache(maxsize=4096)
+def _langdetect(text: str) -> Optional[str]:
+    try:
+        from langdetect import DetectorFactory, detect
+
+        DetectorFactory.seed = 0  # rezultat determinist pentru același text
+        return detect(text)
+    except Exception:
+        return None
+
+
+def preload() -> None:
+    """Încarcă profilele langdetect (durează la primul apel); rulat din warm-up."""
+    _langdetect("aceasta este o propozitie de test pentru profile")
+
+
+def detect_lang(text: Optional[str]) -> Optional[str]:
+    """Codul limbii ("ro", "en", ...) sau None dacă textul e prea scurt / ambiguu."""
+    text = (text or "").strip().lower()
+    if not text:
+        return None
+    if RO_DIACRITICS.search(text):
+        return "ro"
+    words = _WORD_RE.findall(text)
+    ro = sum(w in _RO_WORDS for w in words)
+    en = sum(w in _EN_WORDS for w in words)
+    if ro > en:
+        return "ro"
+    if en > ro:
+        return "en"
+    if len(words) < _MIN_WORDS_LANGDETECT:
+        return None
+    return _langdetect(" ".join(words))
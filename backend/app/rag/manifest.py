@@ -0,0 +1,225 @@
+# app/rag/manifest.py
+"""
+Manifestul de ingest: ce a fost scris în colecție, per chunk.
+
+Pentru fiecare id de chunk (`slug::lang::j`) păstrăm hash-ul textului indexat și
+hash-ul metadatelor. La următorul ingest, diferența față de chunk-urile construite
+din fișierul sursă spune exact ce trebuie făcut:
+  - text nou / schimbat   -> embed + upsert;
+  - doar metadate schimbate -> upsert cu vectorul existent (fără embed);
+  - id dispărut            -> delete (inclusiv chunk-urile de la coada unui rezumat scurtat);
+  - restul                 -> nimic.
+
+Stocat în SQLite (CHROMA_DIR/manifests/<colecție>.sqlite3): o tabelă cu cheie
+primară pe id, deci căutările și actualizările nu încarcă tot manifestul în memorie.
+Ingest-ul în flux marchează id-urile întâlnite într-o tabelă `seen`; cele nemarcate
+la final sunt orfanele de șters, fără a ține mulțimea id-urilor în memorie.
+
+La nivel de carte (`slug::lang`) tabela `books` ține hash-ul elementului din sursă și
+numărul de chunk-uri: o carte neschimbată nu mai este nici măcar împărțită în
+chunk-uri. Tabela `state` ține amprenta sursei și numărul de vectori din colecție
+de la ultimul ingest reușit: dacă ambele coincid, verificarea este O(1).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+MANIFEST_DIR = Path(settings.CHROMA_DIR) / "manifests"
+
+# id -> (hash text, hash metadate)
+Entry = Tuple[str, str]
+
+_BATCH = 500  # parametri per instrucțiune (limita SQLite e 999 pe versiunile vechi)
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def meta_hash(meta: Optional[Dict[str, Any]]) -> str:
+    raw = json.dumps(meta or {}, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+class Manifest:
+    """Tabela `chunks(id, text_hash, meta_hash)` pentru o colecție."""
+
+    def __init__(self, name: str, path: Optional[Path] = None):
+        self.name = name
+        self.path = Path(path) if path is not None else MANIFEST_DIR / f"{name}.sqlite3"
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        con = sqlite3.connect(self.path)
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            " id TEXT PRIMARY KEY, text_hash TEXT NOT NULL, meta_hash TEXT NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        con.execute("CREATE TABLE IF NOT EXISTS seen (id TEXT PRIMARY KEY) WITHOUT ROWID")
+        con.execute(
+            "CREATE TABLE IF NOT EXISTS books ("
+            " id TEXT PRIMARY KEY, item_hash TEXT NOT NULL, chunks INTEGER NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        con.execute("CREATE TABLE IF NOT EXISTS books_seen (id TEXT PRIMARY KEY) WITHOUT ROWID")
+        con.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID")
+        return con
+
+    def __len__(self) -> int:
+        if not self.exists():
+            return 0
+        with closing(self._connect()) as con:
+            return con.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def lookup(self, ids: Sequence[str]) -> Dict[str, Entry]:
+        """Intrările existente pentru `ids` (id-urile necunoscute lipsesc din rezultat)."""
+        out: Dict[str, Entry] = {}
+        if not ids or not self.exists():
+            return out
+        with closing(self._connect()) as con:
+            for start in range(0, len(ids), _BATCH):
+                part = list(ids[start:start + _BATCH])
+                marks = ",".join("?" * len(part))
+                for doc_id, th, mh in con.execute(
+                    f"SELECT id, text_hash, meta_hash FROM chunks WHERE id IN ({marks})", part
+                ):
+                    out[doc_id] = (th, mh)
+        return out
+
+    def put(self, rows: Iterable[Tuple[str, str, str]]) -> None:
+        with closing(self._connect()) as con, con:
+            con.executemany("INSERT OR REPLACE INTO chunks (id, text_hash, meta_hash) VALUES (?, ?, ?)", rows)
+
+    def delete(self, ids: Iterable[str]) -> None:
+        ids = list(ids)
+        if not ids or not self.exists():
+            return
+        with closing(self._connect()) as con, con:
+            con.executemany("DELETE FROM chunks WHERE id = ?", ((i,) for i in ids))
+
+    def with_prefix(self, prefixes: Iterable[str]) -> List[str]:
+        """Id-urile care încep cu unul din `prefixes` (ex. `slug::lang::` = chunk-urile unei cărți)."""
+        if not self.exists():
+            return []
+        out: List[str] = []
+        with closing(self._connect()) as con:
+            for prefix in prefixes:
+                # interval pe cheia primară: [prefix, prefix + U+10FFFF)
+                out.extend(r[0] for r in con.execute(
+                    "SELECT id FROM chunks WHERE id >= ? AND id < ?", (prefix, prefix + "\U0010ffff")
+                ))
+        return out
+
+    # ------- starea ultimului ingest -------
+    def get_state(self, key: str) -> Optional[str]:
+        if not self.exists():
+            return None
+        with closing(self._connect()) as con:
+            row = con.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_state(self, **values: Any) -> None:
+        with closing(self._connect()) as con, con:
+            con.executemany("INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)",
+                            [(k, None if v is None else str(v)) for k, v in values.items()])
+
+    # ------- cărți (elementele din sursă) -------
+    def book_lookup(self, ids: Sequence[str]) -> Dict[str, Tuple[str, int]]:
+        """book id -> (hash element, număr de chunk-uri), pentru cărțile cunoscute."""
+        out: Dict[str, Tuple[str, int]] = {}
+        if not ids or not self.exists():
+            return out
+        with closing(self._connect()) as con:
+            for start in range(0, len(ids), _BATCH):
+                part = list(ids[start:start + _BATCH])
+                marks = ",".join("?" * len(part))
+                for book, h, n in con.execute(
+                    f"SELECT id, item_hash, chunks FROM books WHERE id IN ({marks})", part
+                ):
+                    out[book] = (h, n)
+        return out
+
+    def put_books(self, rows: Iterable[Tuple[str, str, int]]) -> None:
+        with closing(self._connect()) as con, con:
+            con.executemany("INSERT OR REPLACE INTO books (id, item_hash, chunks) VALUES (?, ?, ?)", rows)
+
+    def delete_books(self, ids: Iterable[str]) -> None:
+        ids = list(ids)
+        if not ids or not self.exists():
+            return
+        with closing(self._connect()) as con, con:
+            con.executemany("DELETE FROM books WHERE id = ?", ((i,) for i in ids))
+
+    def clear_books(self) -> None:
+        """Uită hash-urile cărților: următoarea trecere le verifică pe toate la nivel de chunk."""
+        with closing(self._connect()) as con, con:
+            con.execute("DELETE FROM books")
+
+    def mark_books_seen(self, ids: Iterable[str]) -> None:
+        with closing(self._connect()) as con, con:
+            con.executemany("INSERT OR IGNORE INTO books_seen (id) VALUES (?)", ((i,) for i in ids))
+
+    def unseen_books(self, batch: int = 1000) -> Iterator[List[str]]:
+        """Cărțile din manifest nemarcate de la `start_scan()`, în loturi de `batch`."""
+        yield from self._unmarked("books", "books_seen", batch)
+
+    # ------- marcarea id-urilor întâlnite într-o trecere -------
+    def start_scan(self) -> None:
+        with closing(self._connect()) as con, con:
+            con.execute("DELETE FROM seen")
+            con.execute("DELETE FROM books_seen")
+
+    def mark_seen(self, ids: Iterable[str]) -> None:
+        with closing(self._connect()) as con, con:
+            con.executemany("INSERT OR IGNORE INTO seen (id) VALUES (?)", ((i,) for i in ids))
+
+    def unseen(self, batch: int = 1000) -> Iterator[List[str]]:
+        """Id-urile din manifest nemarcate de la `start_scan()`, în loturi de `batch`."""
+        yield from self._unmarked("chunks", "seen", batch)
+
+    def _unmarked(self, table: str, marks: str, batch: int) -> Iterator[List[str]]:
+        if not self.exists():
+            return
+        with closing(self._connect()) as con:
+            cur = con.execute(f"SELECT id FROM {table} WHERE id NOT IN (SELECT id FROM {marks}) ORDER BY id")
+            while True:
+                rows = cur.fetchmany(batch)
+                if not rows:
+                    return
+                yield [r[0] for r in rows]
+
+
+def diff(
+    desired: Dict[str, Entry], current: Dict[str, Entry]
+) -> Tuple[List[str], List[str], List[str], List[str], List[str]]:
+    """
+    (adăugate, text schimbat, doar metadate schimbate, șterse, neschimbate),
+    comparând chunk-urile dorite cu cele din manifest.
+    """
+    added, changed, retagged, unchanged = [], [], [], []
+    for doc_id, (th, mh) in desired.items():
+        have = current.get(doc_id)
+        if have is None:
+            added.append(doc_id)
+        elif have[0] != th:
+            changed.append(doc_id)
+        elif have[1] != mh:
+            retagged.append(doc_id)
+        else:
+            unchanged.append(doc_id)
+    deleted = [doc_id for doc_id in current if doc_id not in desired]
+    return added, changed, retagged, deleted, unchanged
@@ -0,0 +1,45 @@
+# app/rag/rerank.py
+"""
+Etape de rerank fără dependențe de Chroma / model, ca să poată fi folosite
+și din benchmark-uri fără să încărcăm tot stack-ul RAG.
+"""
+from __future__ import annotations
+
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+
+def mmr(embeddings: Optional[np.ndarray], scores: Sequence[float], k: int = 6, lam: float = 0.3) -> List[int]:
+    """
+    Maximal Marginal Relevance pe embeddings: la fiecare pas alege candidatul cu
+    `lam * relevanță - (1 - lam) * max cos(candidat, deja selectați)`.
+
+    Matricea de similaritate se calculează o singură dată, iar maximul față de
+    selecție se actualizează incremental (un `np.maximum` pe rând), deci costul
+    per pas este O(n) vectorizat. Fără embeddings, ordinea este doar după relevanță.
+    """
+    n = len(scores)
+    k = min(k, n)
+    if k <= 0:
+        return []
+    rel = np.asarray(scores, dtype=np.float32)
+    if embeddings is None or len(embeddings) != n:
+        return [int(i) for i in np.argsort(-rel, kind="stable")[:k]]
+
+    x = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    x = x / np.maximum(norms, 1e-12)
+    sim = x @ x.T
+
+    div = np.zeros(n, dtype=np.float32)
+    picked = np.zeros(n, dtype=bool)
+    selected: List[int] = []
+    for step in range(k):
+        score = lam * rel - (1.0 - lam) * div
+        score[picked] = -np.inf
+        best = int(np.argmax(score))
+        selected.append(best)
+        picked[best] = True
+        div = sim[best].copy() if step == 0 else np.maximum(div, sim[best])
+    return selected
@@ -1,71 +1,194 @@
 from __future__ import annotations
-from typing import Any, Dict, Optional, List, Tuple
-import time
+from typing import Any, Dict, Iterator, Optional, List, Tuple
 from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+import os
+import threading
+import time
 
-import chromadb
-try:
-    from rank_bm25 import BM25Okapi  # optional
-except Exception:
-    BM25Okapi = None
+import numpy as np
 
+from app.core.cache import LRUCache
 from app.core.config import get_settings
 from app.core.openai_client import embed
+from app.rag import generation
+from app.rag.filters import book_where, combine, matches
+from app.rag.lang import detect_lang
+from app.rag.rerank import mmr as _mmr
+from app.rag.semantic_cache import SemanticCache
+from app.rag.sparse_index import INDEX_FILE, SparseIndex
+from app.rag.vector_store import VectorStore, get_store
 
 settings = get_settings()
-client = chromadb.PersistentClient(path=settings.CHROMA_DIR)
-collection = client.get_or_create_collection(name=settings.COLLECTION_NAME)
 
-# ------- tiny in-memory TTL cache -------
-_CACHE: dict[str, Tuple[float, dict]] = {}
-_TTL_SECONDS = 600  # 10 minutes
+
+# ------- store-uri (deschise la primul apel, nu la import) -------
+def _collection() -> VectorStore:
+    return get_store(settings.COLLECTION_NAME)
+
+
+def _books() -> VectorStore:
+    # fișele de carte (un vector per titlu + limbă), scrise de ingest lângă colecția de chunk-uri
+    return get_store(f"{settings.COLLECTION_NAME}_books")
+
+
+def __getattr__(name: str) -> Any:
+    # compatibilitate: `retriever.collection` / `retriever.books`
+    if name == "collection":
+        return _collection()
+    if name == "books":
+        return _books()
+    raise AttributeError(name)
+
+# ------- timpi pe etape (folosiți de benchmark-uri) -------
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("rag_timings", default=None)
+
+
+@contextmanager
+def record_timings() -> Iterator[Dict[str, float]]:
+    """
+    Colectează durata (secunde) a fiecărei etape de retrieval rulate în bloc:
+    embed, vector_query, bm25, mmr, rrf. Fără acest context, măsurarea nu costă nimic.
+    """
+    timings: Dict[str, float] = {}
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
 
 
-def _key(query: str, k: int, where: Optional[Dict[str, Any]]) -> str:
-    return f"{query.strip().lower()}|k={k}|where={where}"
+@contextmanager
+def _stage(name: str) -> Iterator[None]:
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - t0
+
+
+# ------- cache rezultate (LRU + TTL, thread-safe) -------
+_CACHE = LRUCache(
+    max_entries=settings.RAG_CACHE_MAX_ENTRIES,
+    max_bytes=settings.RAG_CACHE_MAX_BYTES,
+    ttl=settings.RAG_CACHE_TTL_SECONDS,
+    negative_ttl=settings.RAG_CACHE_NEGATIVE_TTL_SECONDS,
+)
+
+
+# ------- cache semantic (interogări aproape identice) -------
+_SEMANTIC = SemanticCache(
+    capacity=settings.RAG_SEMANTIC_CACHE_SIZE,
+    threshold=settings.RAG_SEMANTIC_CACHE_THRESHOLD,
+)
+
+
+def _partition(k: int, where: Optional[Dict[str, Any]], gen: int) -> str:
+    # generația colecției face parte din cheie: după un ingest, intrările vechi
+    # nu mai sunt găsite (și ies din cache prin LRU), fără să așteptăm TTL-ul
+    return f"k={k}|where={where}|gen={gen}"
+
+
+def _key(query: str, part: str) -> str:
+    return f"{query.strip().lower()}|{part}"
 
 
 def _get_cached(key: str):
-    v = _CACHE.get(key)
-    if not v:
-        return None
-    ts, data = v
-    if time.time() - ts > _TTL_SECONDS:
-        _CACHE.pop(key, None)
-        return None
-    return data
+    return _CACHE.get(key)
 
 
 def _set_cached(key: str, data: dict):
-    _CACHE[key] = (time.time(), data)
-
-
-# ------- MMR diversity (approx) -------
-def _mmr(texts: List[str], scores: List[float], k: int = 6, lam: float = 0.3) -> List[int]:
-    tokens = [set((t or "").lower().split()) for t in texts]
-    selected, rest = [], list(range(len(texts)))
-    while rest and len(selected) < min(k, len(texts)):
-        best, best_score = None, float("-inf")
-        for i in rest:
-            rel = scores[i]
-            div = 0.0 if not selected else max(
-                (len(tokens[i].intersection(tokens[j])) / (len(tokens[i]) + 1e-9)) for j in selected
-            )
-            score = lam * rel - (1 - lam) * div
-            if score > best_score:
-                best, best_score = i, score
-        selected.append(best)
-        rest.remove(best)
-    return selected
+    docs = (data.get("documents") or [[]])[0]
+    _CACHE.set(key, data, negative=not docs)
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Contoarele cache-urilor de rezultate: exact (LRU) și semantic."""
+    exact = _CACHE.stats()
+    semantic = _SEMANTIC.stats()
+    served = exact["hits"] + semantic["hits"]
+    return {
+        "exact": exact,
+        "semantic": semantic,
+        "semantic_share": round(semantic["hits"] / served, 4) if served else 0.0,
+    }
+
+
+def clear_cache() -> None:
+    _CACHE.clear()
+    _SEMANTIC.clear()
+
+
+# ------- BM25 pe tot corpusul (index construit la ingest) -------
+_sparse_lock = threading.Lock()
+_sparse_state: Tuple[Optional[Tuple[int, int]], Optional[SparseIndex]] = (None, None)
+
+
+def _sparse() -> Optional[SparseIndex]:
+    """Indexul BM25 persistat de ingest; reîncărcat doar când fișierul se schimbă."""
+    global _sparse_state
+    try:
+        st = os.stat(INDEX_FILE)
+    except FileNotFoundError:
+        return None
+    sig = (st.st_mtime_ns, st.st_size)
+    if _sparse_state[0] != sig:
+        with _sparse_lock:
+            if _sparse_state[0] != sig:
+                try:
+                    _sparse_state = (sig, SparseIndex.load(INDEX_FILE))
+                except Exception as e:
+                    print(f"[WARN] Nu am putut încărca indexul BM25: {e}")
+    return _sparse_state[1]
+
+
+def _lexical_candidates(query: str, n: int, where: Optional[Dict[str, Any]]) -> List[Tuple[str, float]]:
+    index = _sparse()
+    if index is None:
+        return []
+    return index.search(query, n, where=where)
+
+
+# ------- pre-filtrare automată pe limba interogării -------
+_langs_state: Tuple[Optional[Tuple[int, int]], frozenset] = (None, frozenset())
+
+
+def languages() -> frozenset:
+    """Valorile `lang` din corpus (din metadatele indexului BM25), recalculate când indexul se schimbă."""
+    global _langs_state
+    index = _sparse()
+    if index is None:
+        return frozenset()
+    tag = (id(index), index._version)
+    if _langs_state[0] != tag:
+        _langs_state = (tag, frozenset(m["lang"] for m in index.metas if m.get("lang")))
+    return _langs_state[1]
 
 
-def _bm25_ranks(query: str, texts: List[str]) -> Dict[int, int]:
-    if not BM25Okapi:
+def _mentions(where: Optional[Dict[str, Any]], field: str) -> bool:
+    if not where:
+        return False
+    return any(
+        key == field or (key in ("$and", "$or") and any(_mentions(c, field) for c in cond))
+        for key, cond in where.items()
+    )
+
+
+def _bm25_ranks(query: str, ids: List[str]) -> Dict[int, int]:
+    """
+    Rangurile BM25 (1 = cel mai bun) ale tuturor candidaților `ids`, calculate din
+    statisticile de termeni precalculate la ingest (textul nu mai este tokenizat).
+    """
+    index = _sparse()
+    if index is None:
         return {}
-    docs = [ (t or "").lower().split() for t in texts ]
-    bm25 = BM25Okapi(docs)
-    scores = bm25.get_scores((query or "").lower().split())
-    order = sorted(range(len(texts)), key=lambda i: scores[i], reverse=True)
+    scores = index.score(query, ids)
+    order = sorted((i for i in range(len(ids)) if scores[i] > 0), key=lambda i: scores[i], reverse=True)
     return {idx: rank for rank, idx in enumerate(order, start=1)}
 
 
@@ -79,50 +202,271 @@ def _rrf(sem_order: List[int], bm25_ranks: Dict[int, int], k: int) -> List[int]:
     return ordered[:k]
 
 
-def similar(query: str, k: int = 6, where: Optional[Dict[str, Any]] = None) -> dict:
-    cache_key = _key(query, k, where)
-    cached = _get_cached(cache_key)
-    if cached:
-        return cached
+def _empty() -> dict:
+    return {"documents": [[]], "metadatas": [[]], "ids": [[]], "distances": [[]]}
 
-    vecs = embed([query])
-    if not vecs or not vecs[0]:
-        empty = {"documents": [[]], "metadatas": [[]], "ids": [[]], "distances": [[]]}
-        _set_cached(cache_key, empty)
-        return empty
 
-    base_k = max(k * 2, 8)
-    args = dict(query_embeddings=vecs, n_results=base_k)
-    if where:
-        args["where"] = where
-    out = collection.query(**args)
+def _column(out: dict, field: str, i: int) -> list:
+    col = out.get(field)
+    if col is None or len(col) <= i or col[i] is None:
+        return []
+    return list(col[i])
+
 
-    docs = (out.get("documents") or [[]])[0]
-    metas = (out.get("metadatas") or [[]])[0]
-    ids = (out.get("ids") or [[]])[0]
-    dists = (out.get("distances") or [[]])[0] or [0.0] * len(docs)
+def _rerank(
+    query: str,
+    qvec: List[float],
+    out: dict,
+    i: int,
+    lexical: List[Tuple[str, float]],
+    fetched: Dict[str, Tuple[str, Dict[str, Any], Any]],
+    k: int,
+    base_k: int,
+) -> dict:
+    """MMR + BM25 + RRF pentru interogarea `i` dintr-un rezultat `collection.query`."""
+    docs = _column(out, "documents", i)
+    metas = _column(out, "metadatas", i)
+    ids = _column(out, "ids", i)
+    dists = _column(out, "distances", i) or [0.0] * len(docs)
+    embs = _column(out, "embeddings", i)
+
+    # candidații lexicali vin din tot corpusul; cei pe care căutarea densă
+    # nu i-a găsit sunt aduși din colecție, cu distanța calculată local
+    seen = set(ids)
+    qv = np.asarray(qvec, dtype=np.float32)
+    for doc_id, _ in lexical:
+        if doc_id in seen or doc_id not in fetched:
+            continue
+        d, m, e = fetched[doc_id]
+        ids.append(doc_id)
+        docs.append(d)
+        metas.append(m)
+        embs.append(e)
+        # aceeași metrică ca spațiul implicit Chroma ("l2" = distanța euclidiană la pătrat)
+        dists.append(float(np.sum((np.asarray(e, dtype=np.float32) - qv) ** 2)))
 
     if not docs:
-        _set_cached(cache_key, out)
-        return out
+        return _empty()
+
+    if settings.RAG_BOOK_LEVEL:
+        # un singur chunk (cel mai apropiat) per titlu: top-k rămâne unic pe carte
+        keep = _best_per_title(metas, dists)
+        docs, metas, ids, dists = [docs[j] for j in keep], [metas[j] for j in keep], \
+            [ids[j] for j in keep], [dists[j] for j in keep]
+        embs = [embs[j] for j in keep] if len(embs) > max(keep) else []
 
     rel = [ -float(d or 0.0) for d in dists ]  # Chroma distance -> relevance
 
-    mmr_idx = _mmr(docs, rel, k=min(base_k, len(docs)))
+    # MMR pe embeddings (diversitate semantică), vectorizat
+    emb_matrix = np.asarray(embs, dtype=np.float32) if len(embs) == len(docs) else None
+    with _stage("mmr"):
+        mmr_idx = _mmr(emb_matrix, rel, k=min(base_k, len(docs)))
     final_idx = mmr_idx
 
-    if BM25Okapi:
-        sem_order = sorted(mmr_idx, key=lambda i: rel[i], reverse=True)
-        bm25_r = _bm25_ranks(query, docs)
-        final_idx = _rrf(sem_order, bm25_r, k)
+    if lexical:
+        sem_order = sorted(mmr_idx, key=lambda j: rel[j], reverse=True)
+        bm25_r = _bm25_ranks(query, ids)
+        with _stage("rrf"):
+            final_idx = _rrf(sem_order, bm25_r, k)
 
     final_idx = final_idx[:k]
 
-    result = {
-        "documents": [[docs[i] for i in final_idx]],
-        "metadatas": [[metas[i] for i in final_idx]],
-        "ids":       [[ids[i]   for i in final_idx]],
-        "distances": [[dists[i] for i in final_idx]],
+    return {
+        "documents": [[docs[j] for j in final_idx]],
+        "metadatas": [[metas[j] for j in final_idx]],
+        "ids":       [[ids[j]   for j in final_idx]],
+        "distances": [[dists[j] for j in final_idx]],
+    }
+
+
+def _dense_rows(out: dict, n_queries: int) -> Dict[str, Tuple[str, Dict[str, Any], Any]]:
+    """id -> (document, metadate, embedding) din rezultatele căutării dense (toate interogările)."""
+    rows: Dict[str, Tuple[str, Dict[str, Any], Any]] = {}
+    for r in range(n_queries):
+        embs = _column(out, "embeddings", r)
+        if not embs:
+            continue
+        for doc_id, d, m, e in zip(_column(out, "ids", r), _column(out, "documents", r),
+                                   _column(out, "metadatas", r), embs):
+            rows.setdefault(doc_id, (d, m, e))
+    return rows
+
+
+def _fetch(ids: List[str]) -> Dict[str, Tuple[str, Dict[str, Any], Any]]:
+    """Documente + metadate + embeddings pentru id-urile date, într-un singur `get`."""
+    if not ids:
+        return {}
+    got = _collection().get(ids=ids, include=["documents", "metadatas", "embeddings"])
+    got_embs = got.get("embeddings")
+    if got_embs is None:
+        got_embs = []
+    return {
+        doc_id: (d, m, e)
+        for doc_id, d, m, e in zip(got.get("ids") or [], got.get("documents") or [],
+                                   got.get("metadatas") or [], got_embs)
     }
-    _set_cached(cache_key, result)
-    return result
+
+
+# ------- retrieval ierarhic: fișe de carte -> chunk-uri -------
+def _best_per_title(metas: List[Dict[str, Any]], dists: List[float]) -> List[int]:
+    best: Dict[str, int] = {}
+    for j, m in enumerate(metas):
+        title = (m or {}).get("title") or f"#{j}"
+        if title not in best or float(dists[j] or 0.0) < float(dists[best[title]] or 0.0):
+            best[title] = j
+    return sorted(best.values())
+
+
+def _book_level_query(vecs: List[List[float]], n: int, k: int, where: Optional[Dict[str, Any]]) -> Optional[dict]:
+    """
+    Prima etapă: top cărți după fișa lor (colecție mică: un vector per titlu).
+    A doua: doar chunk-urile acelor cărți, aduse după id (`slug::lang::j`) și
+    scorate local; primele `n` per interogare, în formatul lui `collection.query`.
+    Întoarce None când nu există fișe (colecție ingestată înainte de ele).
+    Fișele au doar câmpurile la nivel de carte: filtrul lor este `book_where(where)`,
+    iar `where` complet (ex. pe `chunk`) se aplică chunk-urilor candidate.
+    """
+    args = dict(
+        query_embeddings=vecs,
+        n_results=max(k, settings.RAG_BOOK_CANDIDATES),
+        include=["metadatas"],
+    )
+    card_where = book_where(where)
+    if card_where:
+        args["where"] = card_where
+    hits = _books().query(**args)
+    hit_ids = hits.get("ids") or []
+    if not any(hit_ids):
+        return None
+
+    per_query: List[List[str]] = []
+    for r in range(len(vecs)):
+        ids = _column(hits, "ids", r)
+        metas = _column(hits, "metadatas", r)
+        per_query.append([
+            f"{b}::{j}" for b, m in zip(ids, metas) for j in range(int((m or {}).get("chunks") or 0))
+        ])
+    fetched = _fetch(sorted({c for chunk_ids in per_query for c in chunk_ids}))
+
+    out: Dict[str, list] = {"documents": [], "metadatas": [], "ids": [], "distances": [], "embeddings": []}
+    for r, v in enumerate(vecs):
+        cand = [c for c in per_query[r] if c in fetched and (not where or matches(fetched[c][1], where))]
+        if cand:
+            emb = np.asarray([fetched[c][2] for c in cand], dtype=np.float32)
+            d = np.sum((emb - np.asarray(v, dtype=np.float32)) ** 2, axis=1)
+            top = np.argsort(d, kind="stable")[:n]
+        else:
+            emb, d, top = None, None, []
+        out["ids"].append([cand[j] for j in top])
+        out["documents"].append([fetched[cand[j]][0] for j in top])
+        out["metadatas"].append([fetched[cand[j]][1] for j in top])
+        out["distances"].append([float(d[j]) for j in top])
+        out["embeddings"].append([emb[j] for j in top])
+    return out
+
+
+def similar_many(
+    queries: List[str],
+    k: int = 6,
+    where: Optional[Dict[str, Any]] = None,
+    batch_size: int = 256,
+) -> List[dict]:
+    """
+    Varianta batch a lui `similar()` pentru job-uri offline / evaluări.
+
+    Interogările care nu sunt în cache sunt codate într-un singur apel `embed()`
+    și trimise ca `query_embeddings` multiple într-un singur `collection.query`
+    (pe loturi de `batch_size`); MMR / BM25 / RRF rulează apoi per interogare,
+    iar fiecare rezultat ajunge în cache. Cu RAG_BOOK_LEVEL, căutarea densă trece
+    întâi prin fișele de carte (`_book_level_query`) și rezultatele sunt unice pe titlu.
+    """
+    results: List[Optional[dict]] = [None] * len(queries)
+    # generația e citită o dată: toate cheile apelului (exact și semantic) sunt în aceeași
+    part = _partition(k, where, generation.current())
+    # cheie -> pozițiile interogărilor care o împart (duplicatele se calculează o dată)
+    pending: Dict[str, List[int]] = {}
+    for i, q in enumerate(queries):
+        key = _key(q, part)
+        cached = _get_cached(key)
+        if cached is not None:
+            results[i] = cached
+        else:
+            pending.setdefault(key, []).append(i)
+
+    base_k = max(k * 2, 8)
+    todo = list(pending.items())
+    for start in range(0, len(todo), batch_size):
+        batch = todo[start:start + batch_size]
+        texts = [queries[positions[0]] for _, positions in batch]
+        with _stage("embed"):
+            vecs = embed(texts)
+
+        # nivelul semantic: o interogare foarte apropiată de una deja rezolvată
+        # refolosește rezultatul, fără Chroma și fără rerank
+        live, resolved = [], {}
+        for j, v in enumerate(vecs):
+            if not len(v):
+                continue
+            hit = _SEMANTIC.get(part, v)
+            if hit is not None:
+                resolved[j] = hit
+            else:
+                live.append(j)
+
+        out: dict = {}
+        if live:
+            args = dict(
+                query_embeddings=[vecs[j] for j in live],
+                n_results=base_k,
+                include=["documents", "metadatas", "distances", "embeddings"],
+            )
+            if where:
+                args["where"] = where
+            with _stage("vector_query"):
+                book_out = _book_level_query(args["query_embeddings"], base_k, k, where) \
+                    if settings.RAG_BOOK_LEVEL else None
+                out = book_out if book_out is not None else _collection().query(**args)
+
+        with _stage("bm25"):
+            lexical = {j: _lexical_candidates(texts[j], base_k, where) for j in live}
+            # candidații lexicali deja întorși de căutarea densă (pentru oricare interogare
+            # din lot) sunt luați de acolo; din colecție vin doar cei lipsă
+            wanted = {doc_id for lx in lexical.values() for doc_id, _ in lx}
+            dense = _dense_rows(out, len(live)) if wanted else {}
+            fetched = {doc_id: dense[doc_id] for doc_id in wanted if doc_id in dense}
+            fetched.update(_fetch(sorted(wanted - fetched.keys())))
+
+        row = {j: r for r, j in enumerate(live)}
+        for j, (key, positions) in enumerate(batch):
+            if j in resolved:
+                result = resolved[j]
+            elif j in row:
+                result = _rerank(texts[j], vecs[j], out, row[j], lexical[j], fetched, k, base_k)
+                if result["ids"][0]:
+                    _SEMANTIC.set(part, vecs[j], result)
+            else:
+                result = _empty()
+            _set_cached(key, result)
+            for i in positions:
+                results[i] = result
+
+    return results
+
+
+def similar(query: str, k: int = 6, where: Optional[Dict[str, Any]] = None) -> dict:
+    return similar_many([query], k=k, where=where)[0]
+
+
+def similar_auto_lang(query: str, k: int = 6, where: Optional[Dict[str, Any]] = None) -> dict:
+    """
+    `similar()` restrâns la limba interogării (RAG_AUTO_LANG): doar dacă `where` nu
+    fixează deja `lang` și limba detectată există în corpus. Setul de candidați și
+    spațiul cheilor de cache se împart astfel pe limbă; dacă filtrul nu găsește
+    nimic, se revine la căutarea fără el.
+    """
+    lang = detect_lang(query) if settings.RAG_AUTO_LANG and not _mentions(where, "lang") else None
+    if lang and lang in languages():
+        result = similar(query, k=k, where=combine(where, {"lang": lang}))
+        if result["ids"][0]:
+            return result
+    return similar(query, k=k, where=where)
@@ -0,0 +1,92 @@
+# app/rag/semantic_cache.py
+"""
+Cache semantic pentru interogări aproape identice.
+
+Păstrăm embedding-urile (normalizate) ale ultimelor interogări într-o matrice
+mică; o interogare nouă cu similaritate cosinus >= prag față de una deja
+rezolvată, în aceeași partiție (k, where, generație), refolosește rezultatul ei.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Any, Dict, Hashable, List, Optional, Sequence
+
+import numpy as np
+
+
+class SemanticCache:
+    """Buffer circular de capacitate fixă; thread-safe."""
+
+    def __init__(self, capacity: int = 512, threshold: float = 0.95):
+        self.capacity = max(0, int(capacity))
+        self.threshold = float(threshold)
+        self._lock = threading.Lock()
+        self._matrix: Optional[np.ndarray] = None  # alocată la primul vector (dim necunoscut înainte)
+        self._parts: List[Optional[Hashable]] = [None] * self.capacity
+        self._values: List[Any] = [None] * self.capacity
+        self._next = 0
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    @staticmethod
+    def _unit(vec: Sequence[float]) -> np.ndarray:
+        v = np.asarray(vec, dtype=np.float32)
+        n = float(np.linalg.norm(v))
+        return v / n if n > 0 else v
+
+    def get(self, partition: Hashable, vec: Sequence[float]) -> Any:
+        if not self.enabled:
+            return None
+        q = self._unit(vec)
+        with self._lock:
+            if self._matrix is None or not self._size or self._matrix.shape[1] != q.shape[0]:
+                self._misses += 1
+                return None
+            sims = self._matrix[: self._size] @ q
+            close = np.flatnonzero(sims >= self.threshold)
+            for slot in close[np.argsort(-sims[close])]:
+                if self._parts[slot] == partition:
+                    self._hits += 1
+                    return self._values[slot]
+            self._misses += 1
+            return None
+
+    def set(self, partition: Hashable, vec: Sequence[float], value: Any) -> None:
+        if not self.enabled:
+            return
+        q = self._unit(vec)
+        with self._lock:
+            if self._matrix is None or self._matrix.shape[1] != q.shape[0]:
+                self._matrix = np.zeros((self.capacity, q.shape[0]), dtype=np.float32)
+                self._size = 0
+                self._next = 0
+            slot = self._next
+            self._matrix[slot] = q
+            self._parts[slot] = partition
+            self._values[slot] = value
+            self._next = (slot + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._size = 0
+            self._next = 0
+            self._parts = [None] * self.capacity
+            self._values = [None] * self.capacity
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": self._size,
+                "capacity": self.capacity,
+                "threshold": self.threshold,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+            }
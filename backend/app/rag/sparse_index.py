@@ -0,0 +1,299 @@
+# app/rag/sparse_index.py
+"""
+Index invers BM25 peste toate chunk-urile din colecție + statisticile de
+termeni per chunk.
+
+Statisticile (frecvențele termenilor, lungimea documentului, setul de termeni)
+sunt calculate o singură dată, la ingest (`term_stats()` din `_build_docs`), și
+păstrate compact per id de chunk: vocabular comun + `array('i')` cu id-uri de
+termeni / frecvențe. Listele de postări sunt tot `array`-uri, deci o interogare
+se scorează vectorizat cu NumPy, iar rerank-ul candidaților citește direct
+statisticile precalculate, fără să re-tokenizeze textul.
+
+Este construit și actualizat de `app.rag.ingest`, persistat lângă Chroma
+(CHROMA_DIR/bm25_index.npz) și încărcat de retriever. Fișierul nu conține obiecte
+Python (citit cu `allow_pickle=False`): statisticile și postările sunt array-uri
+int32 concatenate + offset-uri, iar vocabularul, id-urile și metadatele un antet JSON.
+"""
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.rag.filters import matches
+
+settings = get_settings()
+
+INDEX_FILE = Path(settings.CHROMA_DIR) / "bm25_index.npz"
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+def term_stats(text: Optional[str]) -> Dict[str, int]:
+    """Frecvența fiecărui termen din text (lungimea documentului = suma valorilor)."""
+    return dict(Counter(tokenize(text)))
+
+
+class SparseIndex:
+    """
+    Index BM25 (Okapi) cu actualizări incrementale: add / remove pe id de chunk.
+
+    Slot-urile șterse rămân ca "găuri" (postările lor sunt ignorate) până la
+    următoarea compactare, făcută automat la `save()`.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocab: Dict[str, int] = {}
+        self.ids: List[Optional[str]] = []              # slot -> id (None = șters)
+        self.slot: Dict[str, int] = {}                  # id -> slot
+        self.doc_len = array("i")
+        self.doc_terms: List[array] = []                # slot -> id-uri de termeni (setul de tokeni)
+        self.doc_tfs: List[array] = []                  # slot -> frecvențe, aliniate cu doc_terms
+        self.metas: List[Dict[str, Any]] = []
+        self.postings: Dict[int, Tuple[array, array]] = {}  # termen -> (sloturi, frecvențe)
+        self.df: Dict[int, int] = {}                    # documente vii per termen
+        self.total_len = 0
+        self._version = 0
+        self._cache: Tuple[int, Optional[np.ndarray], Optional[np.ndarray]] = (-1, None, None)
+
+    # ------- construcție -------
+    def __len__(self) -> int:
+        return len(self.slot)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self.slot
+
+    def add(self, doc_id: str, terms: Mapping[str, int], meta: Optional[Dict[str, Any]] = None) -> None:
+        """Adaugă (sau înlocuiește) un chunk pe baza statisticilor precalculate de `term_stats()`."""
+        if doc_id in self.slot:
+            self.remove(doc_id)
+        tids, tfs = array("i"), array("i")
+        for term, c in terms.items():
+            tid = self.vocab.get(term)
+            if tid is None:
+                tid = self.vocab[term] = len(self.vocab)
+            tids.append(tid)
+            tfs.append(int(c))
+        self._add_coded(doc_id, tids, tfs, dict(meta or {}))
+
+    def add_many(self, ids: Iterable[str], terms: Iterable[Mapping[str, int]], metas: Iterable[Dict[str, Any]]) -> None:
+        for i, t, m in zip(ids, terms, metas):
+            self.add(i, t, m)
+
+    def remove(self, doc_id: str) -> None:
+        s = self.slot.pop(doc_id, None)
+        if s is None:
+            return
+        for tid in self.doc_terms[s]:
+            left = self.df.get(tid, 0) - 1
+            if left > 0:
+                self.df[tid] = left
+            else:
+                self.df.pop(tid, None)
+        self.total_len -= self.doc_len[s]
+        self.ids[s] = None
+        self.doc_terms[s], self.doc_tfs[s], self.metas[s] = array("i"), array("i"), {}
+        self._version += 1
+
+    def compact(self) -> None:
+        """Renumerotează sloturile vii și reconstruiește postările (elimină găurile)."""
+        alive = [s for s, doc_id in enumerate(self.ids) if doc_id is not None]
+        fresh = SparseIndex(self.k1, self.b)
+        fresh.vocab = self.vocab
+        for s in alive:
+            fresh._add_coded(self.ids[s], self.doc_terms[s], self.doc_tfs[s], self.metas[s])
+        self.__dict__.update(fresh.__dict__)
+
+    def _add_coded(self, doc_id: str, tids: array, tfs: array, meta: Dict[str, Any]) -> None:
+        s = len(self.ids)
+        for tid, c in zip(tids, tfs):
+            plist = self.postings.get(tid)
+            if plist is None:
+                plist = self.postings[tid] = (array("i"), array("i"))
+            plist[0].append(s)
+            plist[1].append(c)
+            self.df[tid] = self.df.get(tid, 0) + 1
+        length = int(sum(tfs))
+        self.ids.append(doc_id)
+        self.doc_len.append(length)
+        self.doc_terms.append(tids)
+        self.doc_tfs.append(tfs)
+        self.metas.append(meta)
+        self.slot[doc_id] = s
+        self.total_len += length
+        self._version += 1
+
+    # ------- statistici per chunk -------
+    def token_set(self, doc_id: str) -> frozenset:
+        """Setul de termeni (id-uri din vocabular) al unui chunk; gol dacă nu e indexat."""
+        s = self.slot.get(doc_id)
+        return frozenset(self.doc_terms[s]) if s is not None else frozenset()
+
+    def _arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(normalizarea de lungime BM25 per slot, masca sloturilor vii), recalculate doar după modificări."""
+        version, norm, alive = self._cache
+        if version != self._version or norm is None:
+            n_docs = len(self.slot)
+            avgdl = (self.total_len / n_docs) if n_docs else 1.0
+            dl = np.frombuffer(self.doc_len, dtype=np.intc).astype(np.float32) if len(self.doc_len) else \
+                np.zeros(0, dtype=np.float32)
+            norm = self.k1 * (1.0 - self.b + self.b * dl / (avgdl or 1.0))
+            alive = np.fromiter((doc_id is not None for doc_id in self.ids), dtype=bool, count=len(self.ids))
+            self._cache = (self._version, norm, alive)
+        return norm, alive
+
+    def _idf(self, tid: int) -> float:
+        n_docs = len(self.slot)
+        df = self.df.get(tid, 0)
+        return math.log((n_docs - df + 0.5) / (df + 0.5) + 1.0)
+
+    # ------- interogare -------
+    def search(self, query: str, n: int = 10, where: Optional[Dict[str, Any]] = None) -> List[Tuple[str, float]]:
+        """Top-n (id, scor BM25) din tot corpusul, filtrat opțional cu `where`."""
+        if not self.slot or n <= 0:
+            return []
+        norm, alive = self._arrays()
+        scores: Optional[np.ndarray] = None
+        k1 = self.k1
+        for term in tokenize(query):
+            tid = self.vocab.get(term)
+            if tid is None or not self.df.get(tid):
+                continue
+            slots, tfs = self.postings[tid]
+            slots_np = np.frombuffer(slots, dtype=np.intc)
+            tf = np.frombuffer(tfs, dtype=np.intc).astype(np.float32)
+            if scores is None:
+                scores = np.zeros(len(self.ids), dtype=np.float32)
+            scores[slots_np] += self._idf(tid) * tf * (k1 + 1.0) / (tf + norm[slots_np])
+        if scores is None:
+            return []
+        scores[~alive] = 0.0
+
+        hits = np.flatnonzero(scores > 0)
+        if not len(hits):
+            return []
+        want = n if not where else n * 4
+        while True:
+            if len(hits) > want:
+                top = hits[np.argpartition(-scores[hits], want - 1)[:want]]
+            else:
+                top = hits
+            top = top[np.argsort(-scores[top], kind="stable")]
+            if where:
+                top = np.asarray([s for s in top if matches(self.metas[s], where)], dtype=np.int64)
+            if len(top) >= n or want >= len(hits):
+                break
+            want *= 4
+        return [(self.ids[s], float(scores[s])) for s in top[:n]]
+
+    def score(self, query: str, ids: Sequence[str]) -> List[float]:
+        """Scorul BM25 al fiecărui chunk din `ids`, din statisticile precalculate (0 pentru necunoscute)."""
+        if not self.slot:
+            return [0.0] * len(ids)
+        norm, _ = self._arrays()
+        q = Counter(tid for tid in (self.vocab.get(t) for t in tokenize(query)) if tid is not None)
+        idf = {tid: self._idf(tid) for tid in q}
+        k1 = self.k1
+        out = []
+        for doc_id in ids:
+            s = self.slot.get(doc_id)
+            total = 0.0
+            if s is not None and q:
+                for tid, tf in zip(self.doc_terms[s], self.doc_tfs[s]):
+                    qc = q.get(tid)
+                    if qc:
+                        total += qc * idf[tid] * tf * (k1 + 1.0) / (tf + norm[s])
+            out.append(float(total))
+        return out
+
+    # ------- persistență -------
+    def save(self, path: Path = INDEX_FILE) -> None:
+        if len(self.ids) - len(self.slot) > max(1024, len(self.slot) // 4):
+            self.compact()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        terms = [None] * len(self.vocab)
+        for term, tid in self.vocab.items():
+            terms[tid] = term
+        header = json.dumps({"k1": self.k1, "b": self.b, "total_len": self.total_len, "vocab": terms,
+                             "ids": self.ids, "metas": self.metas}, ensure_ascii=False)
+        post_terms = sorted(self.postings)
+        arrays = {
+            "header": np.frombuffer(header.encode("utf-8"), dtype=np.uint8),
+            "doc_len": np.frombuffer(self.doc_len, dtype=np.intc),
+            "doc_offsets": _offsets(self.doc_terms),
+            "doc_terms": _join(self.doc_terms),
+            "doc_tfs": _join(self.doc_tfs),
+            "post_terms": np.asarray(post_terms, dtype=np.intc),
+            "post_offsets": _offsets([self.postings[t][0] for t in post_terms]),
+            "post_slots": _join([self.postings[t][0] for t in post_terms]),
+            "post_tfs": _join([self.postings[t][1] for t in post_terms]),
+            "df_terms": np.fromiter(self.df.keys(), dtype=np.intc, count=len(self.df)),
+            "df_counts": np.fromiter(self.df.values(), dtype=np.intc, count=len(self.df)),
+        }
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as fh:
+            np.savez(fh, **arrays)
+        os.replace(tmp, path)
+        legacy = path.with_suffix(".pkl")  # formatul pickle de dinainte, nu mai este citit
+        if legacy.exists():
+            legacy.unlink()
+
+    @classmethod
+    def load(cls, path: Path = INDEX_FILE) -> Optional["SparseIndex"]:
+        if not path.exists():
+            return None
+        with open(path, "rb") as fh, np.load(fh, allow_pickle=False) as data:
+            arrays = {key: data[key] for key in data.files}
+        header = json.loads(arrays["header"].tobytes().decode("utf-8"))
+        idx = cls(header["k1"], header["b"])
+        idx.vocab = {term: tid for tid, term in enumerate(header["vocab"])}
+        idx.ids = header["ids"]
+        idx.slot = {doc_id: s for s, doc_id in enumerate(idx.ids) if doc_id is not None}
+        idx.metas = header["metas"]
+        idx.total_len = header["total_len"]
+        idx.doc_len = _to_array(arrays["doc_len"])
+        idx.doc_terms = _split(arrays["doc_terms"], arrays["doc_offsets"])
+        idx.doc_tfs = _split(arrays["doc_tfs"], arrays["doc_offsets"])
+        idx.postings = dict(zip(arrays["post_terms"].tolist(),
+                                zip(_split(arrays["post_slots"], arrays["post_offsets"]),
+                                    _split(arrays["post_tfs"], arrays["post_offsets"]))))
+        idx.df = dict(zip(arrays["df_terms"].tolist(), arrays["df_counts"].tolist()))
+        return idx
+
+
+def _offsets(parts: Sequence[array]) -> np.ndarray:
+    """Offset-urile (len(parts) + 1) ale bucăților în forma concatenată de `_join`."""
+    offsets = np.zeros(len(parts) + 1, dtype=np.int64)
+    if parts:
+        np.cumsum([len(p) for p in parts], out=offsets[1:])
+    return offsets
+
+
+def _join(parts: Sequence[array]) -> np.ndarray:
+    return np.frombuffer(b"".join(p.tobytes() for p in parts), dtype=np.intc)
+
+
+def _to_array(values: np.ndarray) -> array:
+    return array("i", np.ascontiguousarray(values, dtype=np.intc).tobytes())
+
+
+def _split(values: np.ndarray, offsets: np.ndarray) -> List[array]:
+    raw = np.ascontiguousarray(values, dtype=np.intc).tobytes()
+    width = np.dtype(np.intc).itemsize
+    bounds = (offsets * width).tolist()
+    return [array("i", raw[a:b]) for a, b in zip(bounds, bounds[1:])]
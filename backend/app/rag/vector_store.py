@@ -0,0 +1,1031 @@
+# app/rag/vector_store.py
+"""
+Abstracția de vector store folosită de `retriever` și `ingest`.
+
+Ambele backend-uri expun subsetul din API-ul unei colecții Chroma pe care îl
+folosim (`query`, `get`, `upsert`, `delete`, `count`), cu aceleași forme de
+rezultat, deci codul de retrieval nu depinde de backend:
+
+- "chroma": `chromadb.PersistentClient` (implicit);
+- "flat":   index plat în proces — embeddings float32 normalizate într-un `.npy`
+            deschis cu memory-map + un sidecar JSON cu id-uri, documente și metadate;
+            scrierile sunt adăugate într-un jurnal și compactate de `flush()`.
+            Top-k = un singur produs matrice-vector + `argpartition`; filtrele
+            `where` de egalitate folosesc indici precalculați la încărcare,
+            iar măștile compuse sunt memorate per filtru.
+            Opțional, scanarea se face pe o copie int8 a vectorilor (un sfert din memorie).
+
+Backend-ul se alege din `Settings.VECTOR_BACKEND`. Cu `Settings.RAG_SHARD_BY`
+("lang" / "genre"), colecția logică este împărțită în câte o colecție fizică per
+valoare (`ShardedStore`): interogările filtrate pe acel câmp merg direct în shard,
+celelalte sunt trimise în paralel la toate shard-urile și combinate după distanță.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.rag import generation
+from app.rag.filters import matches
+
+settings = get_settings()
+
+_DEFAULT_INCLUDE = ("documents", "metadatas", "distances")
+
+
+class VectorStore:
+    """Interfața comună (semnături compatibile cu `chromadb.Collection`)."""
+
+    name: str
+
+    def query(
+        self,
+        query_embeddings: Sequence[Sequence[float]],
+        n_results: int = 10,
+        where: Optional[Dict[str, Any]] = None,
+        include: Sequence[str] = _DEFAULT_INCLUDE,
+    ) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def get(
+        self,
+        ids: Optional[Sequence[str]] = None,
+        where: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        include: Sequence[str] = ("documents", "metadatas"),
+    ) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def upsert(
+        self,
+        ids: Sequence[str],
+        embeddings: Sequence[Sequence[float]],
+        documents: Sequence[str],
+        metadatas: Sequence[Dict[str, Any]],
+    ) -> None:
+        raise NotImplementedError
+
+    def delete(self, ids: Sequence[str]) -> None:
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        """Persistă scrierile ținute în jurnal (backend-ul "flat"); no-op în rest."""
+
+
+# ---------------- Chroma ----------------
+class _ChromaSystem:
+    """
+    Clientul Chroma (și `System`-ul lui) partajat de colecțiile unui director într-o
+    generație. La o generație nouă este retras: scos din cache-ul de sisteme al
+    chromadb (doar intrarea directorului lui, sau tot cache-ul prin
+    `clear_system_cache()` dacă API-ul privat lipsește), deci următorul `PersistentClient`
+    recitește indexul de pe disc, și oprit când se termină ultima operație în curs.
+    Câmpurile sunt modificate doar sub `_chroma_lock`.
+    """
+
+    def __init__(self, path: str):
+        import chromadb  # import întârziat: backend-ul "flat" nu plătește importul
+
+        self.client = chromadb.PersistentClient(path=path)
+        self.system = self.client._system
+        self.active = 0
+        self.retired = False
+        self.stopped = False
+
+    def retire(self) -> None:
+        # cache-ul de sisteme e privat în chromadb (versiunile fixate în requirements.txt);
+        # dacă dispare, `clear_system_cache()` (public) îl golește pentru toate directoarele
+        cls = type(self.client)
+        if hasattr(self.client, "_identifier") and hasattr(cls, "_identifier_to_system"):
+            ident = self.client._identifier
+            systems = cls._identifier_to_system
+            if systems.get(ident) is self.system:
+                del systems[ident]
+                if hasattr(cls, "_identifier_to_refcount"):
+                    cls._identifier_to_refcount.pop(ident, None)
+        else:
+            print("[WARN] chromadb fără cache de sisteme per director: folosesc clear_system_cache().")
+            self.client.clear_system_cache()
+        self.retired = True
+        self.stop_if_idle()
+
+    def stop_if_idle(self) -> None:
+        if self.retired and not self.active and not self.stopped:
+            self.stopped = True
+            self.system.stop()
+
+
+_chroma_lock = threading.Lock()
+_chroma_systems: Dict[str, _ChromaSystem] = {}  # director -> sistemul generației curente
+
+
+class ChromaStore(VectorStore):
+    """Adaptor subțire peste o colecție `chromadb` persistentă."""
+
+    def __init__(self, path: str, name: str):
+        self.path = path
+        self.name = name
+        with _chroma_lock:
+            self._attach()
+
+    def _attach(self) -> None:
+        system = _chroma_systems.get(self.path)
+        if system is None:
+            system = _chroma_systems[self.path] = _ChromaSystem(self.path)
+        self._system = system
+        self.client = system.client
+        self.collection = self.client.get_or_create_collection(name=self.name)
+
+    @contextmanager
+    def _use(self) -> Iterator[Any]:
+        """Colecția, cu sistemul ei ținut pornit cât durează operația."""
+        with _chroma_lock:
+            if self._system.stopped:
+                # store păstrat de apelant peste o schimbare de generație
+                self._attach()
+            system, collection = self._system, self.collection
+            system.active += 1
+        try:
+            yield collection
+        finally:
+            with _chroma_lock:
+                system.active -= 1
+                system.stop_if_idle()
+
+    def query(self, query_embeddings, n_results=10, where=None, include=_DEFAULT_INCLUDE):
+        args = dict(query_embeddings=list(query_embeddings), n_results=n_results, include=list(include))
+        if where:
+            args["where"] = where
+        with self._use() as collection:
+            return collection.query(**args)
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=("documents", "metadatas")):
+        with self._use() as collection:
+            return collection.get(ids=ids, where=where, limit=limit, offset=offset, include=list(include))
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        with self._use() as collection:
+            collection.upsert(ids=list(ids), embeddings=embeddings, documents=list(documents),
+                              metadatas=list(metadatas))
+
+    def delete(self, ids):
+        if ids:
+            with self._use() as collection:
+                collection.delete(ids=list(ids))
+
+    def count(self) -> int:
+        with self._use() as collection:
+            return collection.count()
+
+    @staticmethod
+    def forget_clients() -> None:
+        """
+        Retrage sistemele Chroma ale generației curente: următorul `ChromaStore`
+        deschide un client nou, care recitește indexul de pe disc. Cererile în curs
+        își termină operația pe sistemul vechi, oprit apoi (`_ChromaSystem`); cache-ul
+        de sisteme al chromadb rămâne neatins pentru alte directoare.
+        """
+        with _chroma_lock:
+            systems = list(_chroma_systems.values())
+            _chroma_systems.clear()
+            for system in systems:
+                system.retire()
+
+
+# ---------------- Flat (NumPy, memory-mapped) ----------------
+def _normalize_rows(x: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    return x / np.maximum(norms, 1e-12)
+
+
+_COMPACT_DTYPES = ("float32", "int8")
+_SCAN_BLOCK = 1024  # rânduri decomprimate odată la scanarea formei compacte (încap în cache)
+_COMPACT_MIN_ROWS = 4096  # sub atât, delta rămâne în jurnal până la `flush()`
+_META_BLOCK = 4096  # intrări serializate odată în sidecar-ul JSON
+
+
+def quantize(vectors: np.ndarray, dtype: str) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+    """
+    Forma compactă a vectorilor (normalizați):
+      - "int8":    un sfert din memorie, cu o scală float32 per vector (x ≈ q8 * scale);
+      - "float32": fără formă compactă (None, None).
+    float16 nu este oferit: NumPy nu are GEMM float16, iar conversia lui la float32
+    în `_scan` este de ~5x mai lentă decât cea int8, pentru memorie dublă.
+    """
+    if dtype == "int8":
+        x = np.asarray(vectors, dtype=np.float32)
+        scales = np.max(np.abs(x), axis=1) / 127.0 if len(x) else np.zeros(0, dtype=np.float32)
+        scales = np.maximum(scales, 1e-12).astype(np.float32)
+        q8 = np.clip(np.rint(x / scales[:, None]), -127, 127).astype(np.int8)
+        return q8, scales
+    if dtype == "float32":
+        return None, None
+    raise ValueError(f"FLAT_INDEX_DTYPE necunoscut: {dtype!r} ({' | '.join(_COMPACT_DTYPES)})")
+
+
+def _scan(q: np.ndarray, compact: np.ndarray, scales: Optional[np.ndarray], rows: Optional[np.ndarray]) -> np.ndarray:
+    """
+    Produsul scalar aproximativ q · x pe forma compactă, [Q, N].
+    NumPy nu are GEMM int8, deci decomprimăm pe blocuri de rânduri într-un singur
+    buffer float32 refolosit (memoria temporară rămâne O(bloc), fără alocări per bloc),
+    iar scala int8 se aplică o dată, la final. Scorarea directă a formei compacte
+    (`int8 @ int8` în int32) ocolește BLAS și este de câteva ori mai lentă.
+    """
+    n = len(rows) if rows is not None else len(compact)
+    sims = np.empty((n, len(q)), dtype=np.float32)
+    buf = np.empty((min(_SCAN_BLOCK, n), compact.shape[1]), dtype=np.float32)
+    qt = np.ascontiguousarray(q.T)
+    for start in range(0, n, _SCAN_BLOCK):
+        stop = min(start + _SCAN_BLOCK, n)
+        block = buf[:stop - start]
+        block[...] = compact[rows[start:stop]] if rows is not None else compact[start:stop]
+        np.dot(block, qt, out=sims[start:stop])
+    if scales is not None:
+        sims *= (scales[rows] if rows is not None else scales)[:, None]
+    return sims.T
+
+
+class _FlatState:
+    """Instantaneu imuabil al indexului; înlocuit atomic la reîncărcare."""
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        ids: List[str],
+        docs: List[str],
+        metas: List[Dict[str, Any]],
+        compact: Optional[np.ndarray] = None,
+        scales: Optional[np.ndarray] = None,
+    ):
+        self.vectors = vectors
+        self.compact = compact
+        self.scales = scales
+        self.ids, self.docs, self.metas = list(ids), list(docs), list(metas)
+        self.pos = {doc_id: i for i, doc_id in enumerate(self.ids)}
+        # rândurile fiecărei perechi (câmp, valoare) din metadate, precalculate la încărcare;
+        # păstrăm indici (O(N) în total), nu câte o mască de N per valoare (titlurile sunt unice)
+        rows: Dict[Tuple[str, Any], List[int]] = {}
+        for i, m in enumerate(self.metas):
+            for field, value in (m or {}).items():
+                if isinstance(value, (str, int, float, bool)):
+                    rows.setdefault((field, value), []).append(i)
+        self.eq_rows = {key: np.asarray(idx, dtype=np.int64) for key, idx in rows.items()}
+        self.where_masks: Dict[str, np.ndarray] = {}
+
+    # ------- filtre -------
+    def mask(self, where: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        if not where:
+            return None
+        key = json.dumps(where, sort_keys=True, default=str)
+        mask = self.where_masks.get(key)
+        if mask is None:
+            mask = self._compose(where)
+            if len(self.where_masks) > 256:
+                self.where_masks.clear()
+            self.where_masks[key] = mask
+        return mask
+
+    def _eq_mask(self, field: str, values: List[Any]) -> np.ndarray:
+        mask = np.zeros(len(self.ids), dtype=bool)
+        for v in values:
+            idx = self.eq_rows.get((field, v))
+            if idx is not None:
+                mask[idx] = True
+        return mask
+
+    def _compose(self, where: Dict[str, Any]) -> np.ndarray:
+        n = len(self.ids)
+        empty = np.zeros(n, dtype=bool)
+        out = np.ones(n, dtype=bool)
+        for field, cond in where.items():
+            if field == "$and":
+                for c in cond:
+                    out &= self._compose(c)
+            elif field == "$or":
+                any_of = empty.copy()
+                for c in cond:
+                    any_of |= self._compose(c)
+                out &= any_of
+            elif not isinstance(cond, dict):
+                out &= self._eq_mask(field, [cond])
+            elif set(cond) <= {"$eq", "$in"}:
+                for op, arg in cond.items():
+                    out &= self._eq_mask(field, [arg] if op == "$eq" else list(arg or []))
+            else:
+                # operatori de comparație: evaluare per rând (rezultatul e memorat în where_masks)
+                out &= np.fromiter((matches(m, {field: cond}) for m in self.metas), dtype=bool, count=n)
+        return out
+
+
+class FlatStore(VectorStore):
+    """
+    Index plat pe disc:
+        <dir>/vectors.npy         - float32 [N, D], rânduri normalizate (memory-mapped la citire)
+        <dir>/vectors.<dtype>.npy - forma compactă opțională (int8)
+        <dir>/scales.npy          - scala per vector pentru int8
+        <dir>/meta.json           - {"ids": [...], "documents": [...], "metadatas": [...], "journal": "<token>"}
+        <dir>/journal.<token>.f32   - vectorii scrierilor de după ultima compactare (rânduri float32)
+        <dir>/journal.<token>.jsonl - o linie per upsert / delete, în ordinea scrierilor
+
+    Cu `dtype` int8 scanarea se face pe forma compactă, iar doar
+    shortlist-ul (`n_results * rescore`) este rescorat exact în float32; paginile
+    float32 ale celorlalte rânduri nu sunt atinse deloc.
+
+    Distanța întoarsă este L2 la pătrat, ca în spațiul implicit Chroma:
+    pentru vectori normalizați, ||q - x||² = ||q||² + 1 - 2·q·x.
+
+    Scrierile sunt doar adăugate în jurnal (cost proporțional cu lotul, nu cu indexul)
+    și aplicate peste baza încărcată ca un "delta" în memorie; interogările combină
+    baza (fără rândurile suprascrise / șterse) cu delta. `flush()` (la finalul
+    ingest-ului, sau singur când delta depășește baza) rescrie atomic baza cu un
+    jurnal nou, gol. Cititorii din alte procese reîncarcă baza când se schimbă
+    sidecar-ul și citesc doar coada nouă a jurnalului.
+
+    Memorie: documentele și metadatele întregii colecții stau în proces (plus
+    paginile atinse din `vectors.npy`), deci RSS-ul crește liniar cu colecția, inclusiv
+    în ingest; FLAT_INDEX_DTYPE micșorează doar forma scanată a vectorilor. Pentru
+    colecții mari în procese cu memorie limitată rămâne backend-ul "chroma"
+    (măsurători în `benchmarks.bench_ingest`).
+    """
+
+    def __init__(self, path: str, name: str, dtype: str = "float32", rescore: int = 4):
+        if dtype not in _COMPACT_DTYPES:
+            raise ValueError(f"FLAT_INDEX_DTYPE necunoscut: {dtype!r} ({' | '.join(_COMPACT_DTYPES)})")
+        self.name = name
+        self.dtype = dtype
+        self.rescore = max(1, int(rescore))
+        self.dir = Path(path)
+        self.vectors_file = self.dir / "vectors.npy"
+        self.compact_file = self.dir / f"vectors.{dtype}.npy"
+        self.scales_file = self.dir / "scales.npy"
+        self.meta_file = self.dir / "meta.json"
+        self._lock = threading.RLock()
+        self._sig: Optional[Tuple[int, int]] = None
+        self._state = _FlatState(np.zeros((0, 0), dtype=np.float32), [], [], [])
+        self._token = "0"
+        self._reset_delta()
+
+    # ------- jurnal / delta -------
+    def _journal(self, suffix: str) -> Path:
+        return self.dir / f"journal.{self._token}.{suffix}"
+
+    def _reset_delta(self) -> None:
+        # id -> (rând în `_jvec`, document, metadate) sau None (șters din bază)
+        self._delta: Dict[str, Optional[Tuple[int, str, Dict[str, Any]]]] = {}
+        self._jvec: Optional[np.ndarray] = None  # buffer cu capacitate dublată la nevoie
+        self._jn = 0
+        self._jsize = 0  # octeți din jurnal deja aplicați
+        self._shadowed = 0  # rânduri din bază ascunse de delta
+        self._live = 0  # rânduri vii în delta
+        self._view: Optional[Tuple[Optional[_FlatState], Optional[np.ndarray]]] = None
+
+    def _push_vectors(self, vecs: np.ndarray) -> int:
+        dim = self._state.vectors.shape[1] if len(self._state.ids) else (
+            self._jvec.shape[1] if self._jvec is not None else vecs.shape[1])
+        if vecs.shape[1] != dim:
+            raise ValueError(f"Dimensiune diferită de a indexului '{self.name}': {vecs.shape[1]} != {dim}")
+        need = self._jn + len(vecs)
+        if self._jvec is None or need > len(self._jvec):
+            cap = max(need, 2 * (len(self._jvec) if self._jvec is not None else 0), 1024)
+            buf = np.empty((cap, dim), dtype=np.float32)
+            if self._jn:
+                buf[:self._jn] = self._jvec[:self._jn]
+            self._jvec = buf
+        start = self._jn
+        self._jvec[start:need] = vecs
+        self._jn = need
+        return start
+
+    def _set_delta(self, doc_id: str, entry: Optional[Tuple[int, str, Dict[str, Any]]]) -> None:
+        in_base = doc_id in self._state.pos
+        prev = self._delta.get(doc_id, False)
+        if prev is False and in_base:
+            self._shadowed += 1
+        if prev:
+            self._live -= 1
+        if entry is None and not in_base:
+            self._delta.pop(doc_id, None)
+        else:
+            self._delta[doc_id] = entry
+            if entry is not None:
+                self._live += 1
+        self._view = None
+
+    def _apply_upsert(self, ids: Sequence[str], vecs: np.ndarray, docs: Sequence[str],
+                      metas: Sequence[Dict[str, Any]]) -> None:
+        start = self._push_vectors(vecs)
+        for k, (doc_id, d, m) in enumerate(zip(ids, docs, metas)):
+            self._set_delta(doc_id, (start + k, d, m))
+
+    def _apply_delete(self, ids: Sequence[str]) -> None:
+        for doc_id in ids:
+            self._set_delta(doc_id, None)
+
+    def _append(self, op: Dict[str, Any], vecs: Optional[np.ndarray] = None) -> None:
+        """Adaugă o operație la jurnal: vectorii întâi, linia (care o face vizibilă) ultima."""
+        self.dir.mkdir(parents=True, exist_ok=True)
+        if vecs is not None:
+            vec_file = self._journal("f32")
+            row_bytes = 4 * vecs.shape[1]
+            size = vec_file.stat().st_size if vec_file.exists() else 0
+            with open(vec_file, "ab") as fh:
+                fh.write(np.ascontiguousarray(vecs, dtype=np.float32).tobytes())
+            op["row"], op["dim"] = size // row_bytes, int(vecs.shape[1])
+        with open(self._journal("jsonl"), "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(op, ensure_ascii=False) + "\n")
+        self._jsize = self._journal("jsonl").stat().st_size
+
+    def _replay(self, size: int) -> None:
+        """Aplică liniile complete din jurnal de la `_jsize` până la `size`."""
+        with open(self._journal("jsonl"), "rb") as fh:
+            fh.seek(self._jsize)
+            chunk = fh.read(size - self._jsize)
+        end = chunk.rfind(b"\n") + 1  # o linie încă în scriere rămâne pentru data viitoare
+        for line in chunk[:end].splitlines():
+            op = json.loads(line)
+            if op["op"] == "delete":
+                self._apply_delete(op["ids"])
+                continue
+            n, dim = len(op["ids"]), op["dim"]
+            vecs = np.fromfile(self._journal("f32"), dtype=np.float32, count=n * dim,
+                               offset=op["row"] * dim * 4).reshape(n, dim)
+            self._apply_upsert(op["ids"], vecs, op["documents"], op["metadatas"])
+        self._jsize += end
+
+    # ------- încărcare -------
+    def _signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.meta_file)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _journal_size(self) -> int:
+        try:
+            return os.stat(self._journal("jsonl")).st_size
+        except FileNotFoundError:
+            return 0
+
+    def _load(self) -> _FlatState:
+        """Baza curentă (și delta la zi cu jurnalul); întoarce starea bazei."""
+        sig = self._signature()
+        if sig == self._sig and self._journal_size() == self._jsize:
+            return self._state
+        with self._lock:
+            sig = self._signature()
+            if sig != self._sig:
+                token = "0"
+                if sig is None:
+                    state = _FlatState(np.zeros((0, 0), dtype=np.float32), [], [], [])
+                else:
+                    meta = json.loads(self.meta_file.read_text(encoding="utf-8"))
+                    vectors = np.load(self.vectors_file, mmap_mode="r")
+                    compact, scales = self._load_compact(vectors)
+                    state = _FlatState(vectors, meta["ids"], meta["documents"], meta["metadatas"],
+                                       compact=compact, scales=scales)
+                    token = meta.get("journal", "0")
+                self._state, self._sig, self._token = state, sig, token
+                self._reset_delta()
+            size = self._journal_size()
+            if size < self._jsize:
+                # jurnal trunchiat fără o bază nouă: reluăm de la capăt
+                self._reset_delta()
+            if size > self._jsize:
+                try:
+                    self._replay(size)
+                except OSError:
+                    # compactare în alt proces între citirea bazei și a jurnalului: baza nouă
+                    self._sig = None
+                    return self._load()
+            return self._state
+
+    def _load_compact(self, vectors: np.ndarray) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        if self.dtype == "float32":
+            return None, None
+        try:
+            compact = np.load(self.compact_file, mmap_mode="r")
+            scales = np.load(self.scales_file) if self.dtype == "int8" else None
+            if len(compact) == len(vectors) and (scales is None or len(scales) == len(vectors)):
+                return compact, scales
+        except FileNotFoundError:
+            pass
+        # index scris cu alt FLAT_INDEX_DTYPE: forma compactă se calculează în memorie
+        return quantize(np.asarray(vectors, dtype=np.float32), self.dtype)
+
+    def _snapshot(self) -> Tuple[_FlatState, Optional[_FlatState], Optional[np.ndarray]]:
+        """(baza, delta ca stare imuabilă sau None, masca rândurilor ascunse din bază sau None)."""
+        self._load()
+        with self._lock:
+            base = self._state
+            if self._view is None:
+                live = [(doc_id, e) for doc_id, e in self._delta.items() if e is not None]
+                view = None
+                if live:
+                    vectors = self._jvec[np.fromiter((e[0] for _, e in live), dtype=np.int64, count=len(live))]
+                    compact, scales = quantize(vectors, self.dtype)
+                    view = _FlatState(vectors, [i for i, _ in live], [e[1] for _, e in live],
+                                      [e[2] for _, e in live], compact=compact, scales=scales)
+                hidden = [base.pos[i] for i in self._delta if i in base.pos]
+                shadow = None
+                if hidden:
+                    shadow = np.zeros(len(base.ids), dtype=bool)
+                    shadow[hidden] = True
+                self._view = (view, shadow)
+            return (base, *self._view)
+
+    def _search(self, st: _FlatState, q: np.ndarray, rows: Optional[np.ndarray], n: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """(indici în `rows`/corpus, similarități exacte) pentru fiecare interogare, sortate descrescător."""
+        total = len(rows) if rows is not None else len(st.vectors)
+        if st.compact is None:
+            vectors = st.vectors[rows] if rows is not None else st.vectors
+            sims = q @ vectors.T  # [Q, N]: un singur produs matrice-vector per interogare
+            res = []
+            for r in range(len(q)):
+                part = np.argpartition(-sims[r], n - 1)[:n]
+                top = part[np.argsort(-sims[r][part], kind="stable")]
+                res.append((top, sims[r][top]))
+            return res
+
+        approx = _scan(q, st.compact, st.scales, rows)
+        m = min(total, n * self.rescore)
+        res = []
+        for r in range(len(q)):
+            short = np.argpartition(-approx[r], m - 1)[:m]
+            short_rows = rows[short] if rows is not None else short
+            # rescorare exactă în float32, doar pe shortlist
+            order = np.argsort(short_rows)
+            exact = np.asarray(st.vectors[short_rows[order]], dtype=np.float32) @ q[r]
+            exact_sims = np.empty(m, dtype=np.float32)
+            exact_sims[order] = exact
+            best = np.argsort(-exact_sims, kind="stable")[:n]
+            res.append((short[best], exact_sims[best]))
+        return res
+
+    # ------- API -------
+    def query(self, query_embeddings, n_results=10, where=None, include=_DEFAULT_INCLUDE):
+        base, view, shadow = self._snapshot()
+        q = np.asarray(query_embeddings, dtype=np.float32)
+        if q.ndim == 1:
+            q = q[None, :]
+        out: Dict[str, Any] = {"ids": []}
+        for field in include:
+            out[field] = []
+
+        # (similaritate, stare, rând) per interogare, din bază și din delta
+        hits: List[List[Tuple[float, _FlatState, int]]] = [[] for _ in range(len(q))]
+        for st, hidden in ((base, shadow), (view, None)):
+            if st is None:
+                continue
+            mask = st.mask(where)
+            if hidden is not None:
+                mask = ~hidden if mask is None else mask & ~hidden
+            rows = np.flatnonzero(mask) if mask is not None else None
+            n = min(int(n_results), len(rows) if rows is not None else len(st.ids))
+            if n <= 0:
+                continue
+            for r, (top, top_sims) in enumerate(self._search(st, q, rows, n)):
+                idx = rows[top] if rows is not None else top
+                hits[r].extend(zip(top_sims.tolist(), [st] * len(idx), idx.tolist()))
+
+        q_sq = np.einsum("ij,ij->i", q, q)
+        for r in range(len(q)):
+            best = sorted(hits[r], key=lambda h: -h[0])[:int(n_results)]
+            out["ids"].append([st.ids[i] for _, st, i in best])
+            if "documents" in include:
+                out["documents"].append([st.docs[i] for _, st, i in best])
+            if "metadatas" in include:
+                out["metadatas"].append([st.metas[i] for _, st, i in best])
+            if "distances" in include:
+                out["distances"].append([float(q_sq[r] + 1.0 - 2.0 * v) for v, _, _ in best])
+            if "embeddings" in include:
+                out["embeddings"].append(np.asarray([st.vectors[i] for _, st, i in best], dtype=np.float32))
+        return out
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=("documents", "metadatas")):
+        # (id, document, metadate, vector) — vectorul doar dacă este cerut
+        want_vec = "embeddings" in include
+        rows: List[Tuple[str, str, Dict[str, Any], Any]] = []
+        if ids is not None:
+            base = self._load()
+            with self._lock:
+                for doc_id in ids:
+                    entry = self._delta.get(doc_id, False)
+                    if entry is False:
+                        i = base.pos.get(doc_id)
+                        if i is not None:
+                            rows.append((doc_id, base.docs[i], base.metas[i], base.vectors[i] if want_vec else None))
+                    elif entry is not None:
+                        rows.append((doc_id, entry[1], entry[2], self._jvec[entry[0]] if want_vec else None))
+            if where:
+                rows = [r for r in rows if matches(r[2], where)]
+        else:
+            base, view, shadow = self._snapshot()
+            for st, hidden in ((base, shadow), (view, None)):
+                if st is None:
+                    continue
+                mask = st.mask(where)
+                if hidden is not None:
+                    mask = ~hidden if mask is None else mask & ~hidden
+                idx = np.flatnonzero(mask) if mask is not None else range(len(st.ids))
+                rows.extend((st.ids[i], st.docs[i], st.metas[i], st.vectors[i] if want_vec else None) for i in idx)
+        start = int(offset or 0)
+        rows = rows[start:start + limit] if limit is not None else rows[start:]
+
+        out: Dict[str, Any] = {"ids": [r[0] for r in rows]}
+        if "documents" in include:
+            out["documents"] = [r[1] for r in rows]
+        if "metadatas" in include:
+            out["metadatas"] = [r[2] for r in rows]
+        if want_vec:
+            out["embeddings"] = np.asarray([r[3] for r in rows], dtype=np.float32) if rows else \
+                np.zeros((0, 0), dtype=np.float32)
+        return out
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        ids = list(ids)
+        if not ids:
+            return
+        new = _normalize_rows(np.asarray(embeddings, dtype=np.float32))
+        with self._lock:
+            self._load()
+            docs, metas = list(documents), list(metadatas)
+            self._apply_upsert(ids, new, docs, metas)
+            if self._compact_due():
+                self.flush()
+            else:
+                self._append({"op": "upsert", "ids": ids, "documents": docs, "metadatas": metas}, new)
+
+    def delete(self, ids):
+        if not ids:
+            return
+        with self._lock:
+            base = self._load()
+            present = [i for i in ids if (self._delta.get(i) if i in self._delta else i in base.pos)]
+            if not present:
+                return
+            self._apply_delete(present)
+            if self._compact_due():
+                self.flush()
+            else:
+                self._append({"op": "delete", "ids": present})
+
+    def count(self) -> int:
+        base = self._load()
+        with self._lock:
+            return len(base.ids) - self._shadowed + self._live
+
+    def _compact_due(self) -> bool:
+        # delta mai mare decât baza: rescrierea bazei costă amortizat O(1) per rând scris
+        return len(self._delta) > max(_COMPACT_MIN_ROWS, len(self._state.ids))
+
+    def flush(self) -> None:
+        """Compactează: baza + delta -> bază nouă (scriere atomică), jurnal nou gol."""
+        with self._lock:
+            base = self._load()
+            if not self._delta:
+                return
+            keep = [i for i in range(len(base.ids)) if base.ids[i] not in self._delta]
+            live = [(doc_id, e) for doc_id, e in self._delta.items() if e is not None]
+            parts = [np.asarray(base.vectors[keep], dtype=np.float32)] if keep else []
+            if live:
+                parts.append(self._jvec[[e[0] for _, e in live]])
+            dim = parts[0].shape[1] if parts else 0
+            vectors = np.vstack(parts) if parts else np.zeros((0, dim), dtype=np.float32)
+            self._write(
+                vectors,
+                [base.ids[i] for i in keep] + [i for i, _ in live],
+                [base.docs[i] for i in keep] + [e[1] for _, e in live],
+                [base.metas[i] for i in keep] + [e[2] for _, e in live],
+            )
+
+    def _write(self, vectors: np.ndarray, ids: List[str], docs: List[str], metas: List[Dict[str, Any]]) -> None:
+        """
+        Scrie atomic o bază nouă și o adoptă ca stare curentă. Sidecar-ul este
+        serializat pe blocuri, iar starea nouă refolosește listele primite (vectorii
+        redeschiși cu memory-map): compactarea nu ține în memorie un șir JSON cât
+        indexul și nici o a doua copie, recitită, a documentelor și metadatelor.
+        """
+        self.dir.mkdir(parents=True, exist_ok=True)
+        pid = os.getpid()
+        token = f"{time.time_ns():x}"
+        tmp_meta = self.dir / f"meta.{pid}.tmp.json"
+        pending = [(self.dir / f"vectors.{pid}.tmp.npy", self.vectors_file, vectors)]
+        compact, scales = quantize(vectors, self.dtype)
+        if compact is not None:
+            pending.append((self.dir / f"vectors.{self.dtype}.{pid}.tmp.npy", self.compact_file, compact))
+        if scales is not None:
+            pending.append((self.dir / f"scales.{pid}.tmp.npy", self.scales_file, scales))
+        for tmp, _, arr in pending:
+            np.save(tmp, arr)
+        with open(tmp_meta, "w", encoding="utf-8") as fh:
+            fh.write(f'{{"journal": {json.dumps(token)}')
+            for key, values in (("ids", ids), ("documents", docs), ("metadatas", metas)):
+                fh.write(f', "{key}": [')
+                for start in range(0, len(values), _META_BLOCK):
+                    if start:
+                        fh.write(", ")
+                    fh.write(json.dumps(values[start:start + _META_BLOCK], ensure_ascii=False)[1:-1])
+                fh.write("]")
+            fh.write("}")
+        # vectorii întâi: sidecar-ul nou (care declanșează reîncărcarea) apare ultimul
+        for tmp, final, _ in pending:
+            os.replace(tmp, final)
+        os.replace(tmp_meta, self.meta_file)
+        # jurnalele vechi: baza nouă le conține deja (și indică alt token)
+        for old in self.dir.glob("journal.*"):
+            if not old.name.startswith(f"journal.{token}."):
+                try:
+                    old.unlink()
+                except OSError:
+                    pass
+        mapped = np.load(self.vectors_file, mmap_mode="r")
+        if compact is not None:
+            compact = np.load(self.compact_file, mmap_mode="r")
+        self._state = _FlatState(mapped, ids, docs, metas, compact=compact, scales=scales)
+        self._sig, self._token = self._signature(), token
+        self._reset_delta()
+
+
+# ---------------- Sharding (lang / genre) ----------------
+def shard_key(value: Any) -> str:
+    """Numele shard-ului pentru o valoare din metadate ("science fiction" -> "science-fiction")."""
+    return re.sub(r"[^a-z0-9]+", "-", str(value or "").strip().lower()).strip("-") or "none"
+
+
+_shard_pool: Optional[ThreadPoolExecutor] = None
+_shard_pool_lock = threading.Lock()
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _shard_pool
+    if _shard_pool is None:
+        with _shard_pool_lock:
+            if _shard_pool is None:
+                _shard_pool = ThreadPoolExecutor(max_workers=max(1, settings.RAG_SHARD_WORKERS),
+                                                 thread_name_prefix="rag-shard")
+    return _shard_pool
+
+
+class ShardedStore(VectorStore):
+    """
+    O colecție logică = câte o colecție fizică `<name>__<valoare>` per valoare a
+    câmpului `field` din metadate. Lista shard-urilor este ținută într-un registru
+    JSON lângă store (CHROMA_DIR/shards/<name>.<field>.json), recitit când se schimbă.
+
+    - query: un `where` care fixează câmpul (valoare, $eq, $in, eventual în $and)
+      atinge doar shard-urile respective; altfel toate, în paralel, iar rezultatele
+      sunt combinate după distanță;
+    - get / delete: trimise la shard-urile vizate (id-urile lipsă sunt ignorate);
+    - upsert: grupat pe shard după metadate.
+    """
+
+    def __init__(self, name: str, field: str, open_shard: Callable[[str], VectorStore], registry: Path):
+        self.name = name
+        self.field = field
+        self._open_shard = open_shard
+        self.registry = registry
+        self._lock = threading.Lock()
+        self._sig: Optional[Tuple[int, int]] = None
+        self._keys: List[str] = []
+
+    # ------- registru -------
+    def _shard_keys(self) -> List[str]:
+        try:
+            st = os.stat(self.registry)
+            sig = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            return []
+        if sig != self._sig:
+            with self._lock:
+                if sig != self._sig:
+                    self._keys = sorted(json.loads(self.registry.read_text(encoding="utf-8"))["shards"])
+                    self._sig = sig
+        return self._keys
+
+    def _register(self, keys: Sequence[str]) -> None:
+        with self._lock:
+            known = set(self._keys)
+            if self.registry.exists():
+                known.update(json.loads(self.registry.read_text(encoding="utf-8"))["shards"])
+            if known.issuperset(keys):
+                return
+            self.registry.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.registry.with_name(f"{self.registry.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps({"field": self.field, "shards": sorted(known.union(keys))}), encoding="utf-8")
+            os.replace(tmp, self.registry)
+            self._sig = None
+
+    def shard(self, key: str) -> VectorStore:
+        return self._open_shard(f"{self.name}__{key}")
+
+    # ------- rutare -------
+    def route(self, where: Optional[Dict[str, Any]]) -> Optional[List[str]]:
+        """Shard-urile fixate de `where` sau None (toate)."""
+        if not where:
+            return None
+        for clause in where.get("$and") or []:
+            keys = self.route(clause)
+            if keys is not None:
+                return keys
+        cond = where.get(self.field)
+        if cond is None:
+            return None
+        if isinstance(cond, dict):
+            if "$eq" in cond:
+                values = [cond["$eq"]]
+            elif "$in" in cond:
+                values = list(cond["$in"])
+            else:
+                return None
+        else:
+            values = [cond]
+        return sorted({shard_key(v) for v in values})
+
+    def _targets(self, where: Optional[Dict[str, Any]]) -> List[VectorStore]:
+        existing = self._shard_keys()
+        keys = self.route(where)
+        if keys is not None:
+            known = set(existing)
+            existing = [k for k in keys if k in known]
+        return [self.shard(k) for k in existing]
+
+    @staticmethod
+    def _fan_out(fn: Callable[[VectorStore], Any], stores: List[VectorStore]) -> List[Any]:
+        if len(stores) <= 1:
+            return [fn(st) for st in stores]
+        return list(_pool().map(fn, stores))
+
+    # ------- API -------
+    def query(self, query_embeddings, n_results=10, where=None, include=_DEFAULT_INCLUDE):
+        q = list(query_embeddings)
+        fields = list(dict.fromkeys(list(include) + ["distances"]))
+        parts = self._fan_out(lambda st: st.query(q, n_results=n_results, where=where, include=fields),
+                              self._targets(where))
+
+        out: Dict[str, Any] = {"ids": []}
+        for field in include:
+            out[field] = []
+        for r in range(len(q)):
+            merged = []
+            for part in parts:
+                row_ids = (part.get("ids") or [[]] * len(q))[r] or []
+                row_dists = (part.get("distances") or [[]] * len(q))[r]
+                for j, doc_id in enumerate(row_ids):
+                    merged.append((float(row_dists[j]), doc_id, part, j))
+            merged.sort(key=lambda t: t[0])
+            merged = merged[:n_results]
+            out["ids"].append([doc_id for _, doc_id, _, _ in merged])
+            for field in include:
+                row = [part[field][r][j] for _, _, part, j in merged]
+                out[field].append(np.asarray(row) if field == "embeddings" else row)
+        return out
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=("documents", "metadatas")):
+        targets = self._targets(where)
+        fields = list(include)
+        out: Dict[str, Any] = {"ids": []}
+        for field in fields:
+            out[field] = []
+
+        if ids is None and not where and (limit is not None or offset):
+            # paginare fără filtru: sărim shard-urile întregi după count()
+            skip, left = int(offset or 0), limit
+            for st in targets:
+                if left is not None and left <= 0:
+                    break
+                n = st.count()
+                if skip >= n:
+                    skip -= n
+                    continue
+                self._extend(out, st.get(limit=left, offset=skip, include=fields), fields)
+                left = None if left is None else limit - len(out["ids"])
+                skip = 0
+            return self._finish(out, fields)
+
+        ids_list = list(ids) if ids is not None else None
+        parts = self._fan_out(lambda st: st.get(ids=ids_list, where=where, include=fields), targets)
+        for part in parts:
+            self._extend(out, part, fields)
+        start = int(offset or 0)
+        if start or limit is not None:
+            stop = start + limit if limit is not None else None
+            for key in out:
+                out[key] = out[key][start:stop]
+        return self._finish(out, fields)
+
+    @staticmethod
+    def _extend(out: Dict[str, Any], part: Dict[str, Any], fields: Sequence[str]) -> None:
+        out["ids"].extend(part.get("ids") or [])
+        for field in fields:
+            values = part.get(field)
+            out[field].extend(list(values) if values is not None else [])
+
+    @staticmethod
+    def _finish(out: Dict[str, Any], fields: Sequence[str]) -> Dict[str, Any]:
+        if "embeddings" in fields:
+            out["embeddings"] = np.asarray(out["embeddings"], dtype=np.float32) if out["embeddings"] else \
+                np.zeros((0, 0), dtype=np.float32)
+        return out
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        groups: Dict[str, List[int]] = {}
+        for i, meta in enumerate(metadatas):
+            groups.setdefault(shard_key((meta or {}).get(self.field)), []).append(i)
+        self._register(list(groups))
+        for key, rows in groups.items():
+            self.shard(key).upsert(
+                ids=[ids[i] for i in rows],
+                embeddings=[embeddings[i] for i in rows],
+                documents=[documents[i] for i in rows],
+                metadatas=[metadatas[i] for i in rows],
+            )
+
+    def delete(self, ids):
+        if ids:
+            ids = list(ids)
+            self._fan_out(lambda st: st.delete(ids), self._targets(None))
+
+    def count(self) -> int:
+        return sum(self._fan_out(lambda st: st.count(), self._targets(None)))
+
+    def flush(self) -> None:
+        self._fan_out(lambda st: st.flush(), self._targets(None))
+
+
+# ---------------- factory ----------------
+_stores: Dict[Tuple[str, str, str], VectorStore] = {}
+_stores_lock = threading.Lock()
+# generația la care au fost deschise store-urile Chroma din `_stores`
+_stores_gen: Optional[int] = None
+
+
+def _reopen_stale(gen: int) -> None:
+    """
+    Un client Chroma ține indexul HNSW în memorie și nu vede ce a scris alt proces.
+    Când liderul de ingest (`app.core.leader`) publică o generație nouă, worker-ii
+    redeschid colecțiile Chroma; store-ul "flat" se reîncarcă singur după fișiere.
+    """
+    global _stores_gen
+    with _stores_lock:
+        if _stores_gen == gen:
+            return
+        stale = [key for key in _stores if key[0] == "chroma"]
+        if _stores_gen is not None and stale:
+            for key in stale:
+                del _stores[key]
+            ChromaStore.forget_clients()
+            print(f"[INFO] Generație nouă ({gen}): colecțiile Chroma sunt redeschise.")
+        _stores_gen = gen
+
+
+def _open(name: str, backend: str) -> VectorStore:
+    if backend == "chroma":
+        return ChromaStore(settings.CHROMA_DIR, name)
+    if backend == "flat":
+        base = settings.FLAT_INDEX_DIR or os.path.join(settings.CHROMA_DIR, "flat")
+        return FlatStore(os.path.join(base, name), name,
+                         dtype=settings.FLAT_INDEX_DTYPE, rescore=settings.FLAT_RESCORE_FACTOR)
+    raise ValueError(f"VECTOR_BACKEND necunoscut: {backend!r} (chroma | flat)")
+
+
+def get_store(name: Optional[str] = None, backend: Optional[str] = None, sharded: bool = True) -> VectorStore:
+    """
+    Store-ul (memorat per proces) pentru colecția `name`, după `Settings.VECTOR_BACKEND`;
+    împărțit pe shard-uri dacă `Settings.RAG_SHARD_BY` este setat (și `sharded`).
+    """
+    name = name or settings.COLLECTION_NAME
+    backend = (backend or settings.VECTOR_BACKEND).lower()
+    shard_by = settings.RAG_SHARD_BY.strip().lower() if sharded else ""
+    if shard_by and shard_by not in ("lang", "genre"):
+        raise ValueError(f"RAG_SHARD_BY necunoscut: {shard_by!r} (lang | genre)")
+    key = (backend, name, shard_by)
+    gen = generation.current()
+    if gen != _stores_gen:
+        _reopen_stale(gen)
+    store = _stores.get(key)
+    if store is not None:
+        return store
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            if shard_by:
+                registry = Path(settings.CHROMA_DIR) / "shards" / f"{name}.{shard_by}.json"
+                store = ShardedStore(name, shard_by, lambda n: get_store(n, backend, sharded=False), registry)
+            else:
+                store = _open(name, backend)
+            _stores[key] = store
+    return store
@@ -0,0 +1,311 @@
+# app/rag/watcher.py
+"""
+Auto-ingest declanșat de modificările din data/ (în locul buclei de polling la 600s).
+
+- thread-ul "ingest-watch" urmărește directorul sursei (și data/): inotify prin `watchfiles`
+  (instalat cu uvicorn[standard]) sau, ca fallback, stat() la `INGEST_POLL_SECONDS`.
+  Urmărim directorul, nu fișierul: o înlocuire atomică (scriere în `x.json.tmp` +
+  `rename`) apare ca fișier nou, iar fișierele temporare / ascunse sunt ignorate;
+- o rafală de scrieri produce o singură rulare: ingest-ul pornește după
+  `INGEST_DEBOUNCE_MS` fără evenimente și doar când fișierul sursă există și are
+  aceeași mărime / mtime / inode timp de `INGEST_SETTLE_SECONDS`;
+- thread-ul "ingest-run" rulează `ingest()` sub `leader.run_lock()` (nicio rulare în
+  paralel cu un `python -m app.rag.ingest` manual); modificările sosite în timpul
+  unei rulări produc exact încă o rulare;
+- doar liderul de ingest (`app.core.leader`) urmărește sursa; ceilalți worker-i
+  reîncearcă la `INGEST_LEADER_RETRY_SECONDS`. Starea rulărilor este scrisă în
+  `CHROMA_DIR/.ingest.status`, deci /health/ingest răspunde la fel din orice worker.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core import leader
+from app.core.config import get_settings
+
+settings = get_settings()
+
+STATUS_FILE = Path(settings.CHROMA_DIR) / ".ingest.status"
+_SOURCE_SUFFIXES = (".json", ".jsonl", ".ndjson")
+# cât așteptăm ca sursa să reapară (rename neterminat) înainte să renunțăm la rulare
+_MISSING_TIMEOUT = 60.0
+
+_lock = threading.Lock()
+_wake = threading.Event()  # o modificare așteaptă ingest
+_stop = threading.Event()
+_threads: List[threading.Thread] = []
+_last_event = 0.0
+_state: Dict[str, Any] = {
+    "role": "stopped",
+    "backend": None,
+    "watching": None,
+    "running": False,
+    "pending": False,
+    "runs": 0,
+    "last_event": None,
+    "last_run": None,
+    "last_success": None,
+}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _set(**values: Any) -> None:
+    with _lock:
+        _state.update(values)
+
+
+def _is_source(path: str) -> bool:
+    name = os.path.basename(path)
+    return not name.startswith(".") and name.lower().endswith(_SOURCE_SUFFIXES)
+
+
+def _notify(reason: str, path: str) -> None:
+    """Înregistrează un eveniment; rularea pornește după fereastra de debounce."""
+    global _last_event
+    with _lock:
+        _last_event = time.monotonic()
+        _state["pending"] = True
+        _state["last_event"] = {"reason": reason, "path": path, "at": _now()}
+        _wake.set()
+
+
+# ------- starea partajată între worker-i -------
+def _write_status() -> None:
+    with _lock:
+        shared = {k: _state[k] for k in ("running", "pending", "runs", "last_event", "last_run", "last_success")}
+    shared["pid"] = os.getpid()
+    try:
+        STATUS_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp = STATUS_FILE.with_name(f"{STATUS_FILE.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(shared, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, STATUS_FILE)
+    except OSError as e:
+        print(f"[WARN] Nu pot scrie starea ingest-ului în {STATUS_FILE}: {e}")
+
+
+def _read_status() -> Dict[str, Any]:
+    try:
+        return json.loads(STATUS_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def status() -> Dict[str, Any]:
+    """Rolul acestui worker + ultima rulare (a liderului, din fișierul de stare, pe non-lideri)."""
+    with _lock:
+        out = dict(_state)
+    if not leader.is_leader():
+        shared = _read_status()
+        for key in ("running", "pending", "runs", "last_event", "last_run", "last_success"):
+            if key in shared:
+                out[key] = shared[key]
+    out["leader_pid"] = leader.leader_pid()
+    return out
+
+
+# ------- rularea ingest-ului -------
+def run_once(trigger: str = "manual") -> Dict[str, Any]:
+    """Un ingest complet sub lock-ul inter-proces; întoarce înregistrarea rulării."""
+    from app.rag.ingest import ingest
+
+    run: Dict[str, Any] = {"trigger": trigger, "started_at": _now(), "pid": os.getpid(), "ok": False}
+    _set(running=True)
+    _write_status()
+    t0 = time.perf_counter()
+    try:
+        with leader.run_lock():
+            run["lock_wait_s"] = round(time.perf_counter() - t0, 3)
+            run["report"] = ingest()
+            run["ok"] = True
+    except Exception as e:
+        run["error"] = str(e)
+        print(f"[ERROR] Auto-ingest failed: {e}")
+    finally:
+        run["duration_s"] = round(time.perf_counter() - t0, 3)
+        run["finished_at"] = _now()
+        with _lock:
+            _state["running"] = False
+            _state["runs"] += 1
+            _state["last_run"] = run
+            if run["ok"]:
+                _state["last_success"] = run
+        _write_status()
+    return run
+
+
+def _settled_source() -> Optional[Path]:
+    """
+    Fișierul sursă, după ce (cale, inode, mărime, mtime) nu s-au schimbat timp de
+    `INGEST_SETTLE_SECONDS`. None dacă sursa lipsește (rename neterminat / ștearsă)
+    mai mult de `_MISSING_TIMEOUT` sau la oprire.
+    """
+    from app.rag.ingest import _source_file
+
+    settle = max(0.05, settings.INGEST_SETTLE_SECONDS)
+    deadline = time.monotonic() + _MISSING_TIMEOUT
+    prev: Optional[Tuple[str, int, int, int]] = None
+    while not _stop.is_set():
+        try:
+            path = _source_file()
+            st = path.stat()
+            cur: Optional[Tuple[str, int, int, int]] = (str(path), st.st_ino, st.st_size, st.st_mtime_ns)
+        except OSError:
+            cur = None
+        if cur is not None and cur == prev:
+            return path
+        if cur is None and time.monotonic() >= deadline:
+            return None
+        prev = cur
+        _stop.wait(settle)
+    return None
+
+
+def _run_loop() -> None:
+    debounce = max(0.0, settings.INGEST_DEBOUNCE_MS / 1000.0)
+    while not _stop.is_set():
+        _wake.wait()
+        if _stop.is_set():
+            return
+        # debounce: așteptăm liniștea de după ultimul eveniment din rafală
+        while not _stop.is_set():
+            with _lock:
+                quiet = time.monotonic() - _last_event
+            if quiet >= debounce:
+                break
+            _stop.wait(debounce - quiet)
+        with _lock:
+            # în aceeași secțiune cu `_notify`: un eveniment de după snapshot își păstrează wake-up-ul
+            seen = _last_event
+            trigger = (_state["last_event"] or {}).get("reason", "change")
+            _wake.clear()
+        source = _settled_source()
+        if _stop.is_set():
+            return
+        if source is None:
+            print("[WARN] Data file not found after change. Skipping ingest.")
+            _set(pending=_wake.is_set())
+            continue
+        with _lock:
+            newer = _last_event != seen
+        if newer:
+            _wake.set()  # altă scriere în timpul așteptării: reluăm debounce-ul
+            continue
+        _set(pending=False)
+        print(f"[INFO] Detected change in {source.name} ({trigger}), updating Vector Store...")
+        run_once(trigger)
+
+
+# ------- urmărirea directorului -------
+def _watched_dirs() -> List[Path]:
+    """
+    Directorul fișierului sursă (`SUMMARY_FILE` poate fi o cale absolută, în afara
+    data/) și data/, unde `_source_file()` caută fallback-ul când acesta lipsește.
+    """
+    from app.rag.ingest import DATA_DIR, DATA_JSON
+
+    dirs = [Path(DATA_JSON).parent.resolve(), Path(DATA_DIR).resolve()]
+    return list(dict.fromkeys(dirs))
+
+
+def _snapshot(directories: List[Path]) -> Dict[str, Tuple[int, int, int]]:
+    out: Dict[str, Tuple[int, int, int]] = {}
+    for directory in directories:
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        for entry in entries:
+            if not _is_source(entry.name):
+                continue
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            out[entry.path] = (st.st_ino, st.st_size, st.st_mtime_ns)
+    return out
+
+
+def _watch_polling(directories: List[Path]) -> None:
+    _set(backend="polling", watching=[str(d) for d in directories])
+    prev = _snapshot(directories)
+    while not _stop.wait(settings.INGEST_POLL_SECONDS):
+        cur = _snapshot(directories)
+        if cur != prev:
+            changed = sorted(p for p in cur.keys() | prev.keys() if cur.get(p) != prev.get(p))
+            _notify("poll", changed[0])
+            prev = cur
+
+
+def _watch_events(directories: List[Path]) -> None:
+    from watchfiles import watch
+
+    _set(backend="inotify" if sys.platform.startswith("linux") else "native",
+         watching=[str(d) for d in directories])
+    for changes in watch(
+        *directories,
+        watch_filter=lambda _change, path: _is_source(path),
+        debounce=max(1, settings.INGEST_DEBOUNCE_MS),
+        step=50,
+        stop_event=_stop,
+        recursive=False,
+        raise_interrupt=False,
+    ):
+        change, path = sorted(changes, key=lambda c: c[1])[-1]
+        _notify(change.name, path)
+
+
+def _watch_loop() -> None:
+    while not _stop.is_set() and not leader.try_acquire():
+        _set(role="follower")
+        _stop.wait(settings.INGEST_LEADER_RETRY_SECONDS)
+    if _stop.is_set():
+        return
+    _set(role="leader")
+    directories = _watched_dirs()
+    for directory in directories:
+        directory.mkdir(parents=True, exist_ok=True)
+    # sursa poate fi schimbată cât serverul era oprit (verificarea e O(1) dacă nu)
+    _notify("startup", str(directories[0]))
+
+    backend = settings.INGEST_WATCH_BACKEND.lower()
+    if backend != "polling":
+        try:
+            _watch_events(directories)
+            return
+        except ImportError:
+            print("[WARN] watchfiles nu este instalat: auto-ingest prin polling.")
+        except Exception as e:  # ex. limita inotify (max_user_watches) atinsă
+            print(f"[WARN] Watcher inotify indisponibil ({e}): auto-ingest prin polling.")
+    _watch_polling(directories)
+
+
+def start() -> None:
+    """Pornește thread-urile de urmărire și de rulare (idempotent)."""
+    if _threads:
+        return
+    _stop.clear()
+    _set(role="starting")
+    for target, name in ((_watch_loop, "ingest-watch"), (_run_loop, "ingest-run")):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        _threads.append(thread)
+
+
+def stop(timeout: float = 5.0) -> None:
+    """Oprește urmărirea; o rulare în curs este lăsată să se termine (thread daemon)."""
+    _stop.set()
+    _wake.set()
+    for thread in _threads:
+        thread.join(timeout)
+    _threads.clear()
+    _set(role="stopped")
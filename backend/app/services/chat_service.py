@@ -3,6 +3,8 @@ from app.repository import chat_repository as repo
 from app.core.openai_client import chat_complete
 from app.services.subscription_service import SubscriptionService
 from app.rag import retriever
+from app.rag.context import build_context
+from app.rag.filters import combine
 from app.models import schema as s
 
 SYSTEM_PROMPT = (
@@ -27,8 +29,14 @@ class ChatService:
             conv = repo.create_conversation(self.db, str(user.id), title=req.message[:50])
 
         # 3️⃣ Recuperare context RAG (ChromaDB)
-        rag_result = retriever.similar(req.message, k=5)
-        context = "\n---\n".join(rag_result["documents"][0]) if rag_result["documents"] else "Fără context suplimentar."
+        # filtrele din request (validate în ChatRequest) + limba detectată a întrebării
+        rag_result = retriever.similar_auto_lang(req.message, k=5, where=combine(req.where, req.metadata))
+        # chunk-uri lipite / deduplicate și împachetate în bugetul de tokeni
+        context, ctx = build_context(rag_result)
+        print(
+            f"[INFO] RAG context: {ctx['chunks']} chunk-uri -> {ctx['passages']} pasaje, "
+            f"{ctx['tokens']}/{ctx['budget']} tokeni (economisiți {ctx['tokens_saved']} din {ctx['tokens_raw']})"
+        )
 
         # 4️⃣ Construire istoric mesaje pentru OpenAI
         history = repo.get_history(self.db, conv.id)
@@ -0,0 +1,137 @@
+# benchmarks/bench_embed_backends.py
+"""
+Backend-urile `embed()` comparate: sentence-transformers (PyTorch) vs ONNX Runtime
+fp32 vs ONNX Runtime int8 (cuantizare dinamică).
+
+Fiecare backend rulează într-un subproces separat (RSS-ul include importurile:
+PyTorch nu apare deloc în procesele ONNX). Raportează:
+  - timpul de încărcare și RSS-ul după încărcare / maxim;
+  - latența p50 / p95 a unei interogări (batch de 1) și throughput-ul la ingest
+    (batch de 32, rezumatele din data/summaries.json);
+  - echivalența: cosinusul min / mediu față de vectorii backend-ului torch.
+
+Exportul ONNX trebuie făcut înainte: `python -m app.core.onnx_embedder --out DIR`.
+
+    python -m benchmarks.bench_embed_backends --onnx-dir ./models/all-MiniLM-L6-v2-onnx
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict
+
+import numpy as np
+
+BACKENDS = {
+    "torch": {"EMBED_BACKEND": "torch"},
+    "onnx-fp32": {"EMBED_BACKEND": "onnx", "EMBED_ONNX_QUANTIZED": "0"},
+    "onnx-int8": {"EMBED_BACKEND": "onnx", "EMBED_ONNX_QUANTIZED": "1"},
+}
+
+
+def _rss_mb() -> float:
+    # VmRSS curent (Linux); ru_maxrss ca fallback
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return _peak_rss_mb()
+
+
+def _peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2**20 if sys.platform == "darwin" else 2**10)
+
+
+def run_one(queries: int, out_file: str) -> Dict[str, Any]:
+    from app.core.onnx_embedder import sample_texts
+
+    base_rss = _rss_mb()
+    t0 = time.perf_counter()
+    from app.core import openai_client
+
+    model = openai_client.get_embed_model()
+    load_s = time.perf_counter() - t0
+    loaded_rss = _rss_mb()
+
+    docs = sample_texts()
+    model.encode(docs[:2])  # încălzire
+
+    lat = []
+    for i in range(queries):
+        t = time.perf_counter()
+        model.encode([f"o carte despre prietenie și curaj {i}"])
+        lat.append(time.perf_counter() - t)
+    lat_ms = np.asarray(lat) * 1000.0
+
+    t = time.perf_counter()
+    vecs = np.asarray(model.encode(docs, batch_size=32), dtype=np.float32)
+    ingest_s = time.perf_counter() - t
+    np.save(out_file, vecs)
+
+    return {
+        "load_s": round(load_s, 3),
+        "rss_base_mb": round(base_rss, 1),
+        "rss_loaded_mb": round(loaded_rss, 1),
+        "rss_peak_mb": round(_peak_rss_mb(), 1),
+        "query_p50_ms": round(float(np.percentile(lat_ms, 50)), 3),
+        "query_p95_ms": round(float(np.percentile(lat_ms, 95)), 3),
+        "ingest_texts_per_s": round(len(docs) / ingest_s, 1) if ingest_s else None,
+        "torch_imported": "torch" in sys.modules,
+    }
+
+
+def run(onnx_dir: str, queries: int) -> None:
+    from app.core.onnx_embedder import cosine_agreement
+
+    results: Dict[str, Dict[str, Any]] = {}
+    with tempfile.TemporaryDirectory(prefix="bench_embed_") as tmp:
+        for name, env_over in BACKENDS.items():
+            env = dict(os.environ, EMBED_ONNX_DIR=onnx_dir, EMBED_CACHE_PATH="", **env_over)
+            out_file = os.path.join(tmp, f"{name}.npy")
+            cmd = [sys.executable, "-m", "benchmarks.bench_embed_backends", "--run-one", out_file,
+                   "--queries", str(queries)]
+            print(f"[INFO] {name}…", file=sys.stderr)
+            proc = subprocess.run(cmd, env=env, capture_output=True, text=True)
+            if proc.returncode != 0:
+                print(proc.stderr, file=sys.stderr)
+                results[name] = {"error": (proc.stderr.strip().splitlines() or ["?"])[-1]}
+                continue
+            results[name] = json.loads(proc.stdout.strip().splitlines()[-1])
+            results[name]["vectors"] = out_file
+
+        ref = np.load(results["torch"]["vectors"]) if "vectors" in results.get("torch", {}) else None
+        for r in results.values():
+            if ref is not None and "vectors" in r:
+                r["cos_min"], r["cos_mean"] = (round(v, 5) for v in cosine_agreement(ref, np.load(r["vectors"])))
+
+    print(f"\n{'backend':>10} | {'load s':>6} | {'RSS MB':>7} | {'peak MB':>7} | {'q p50':>7} | {'q p95':>7} | "
+          f"{'ingest/s':>8} | {'cos min':>7} | {'cos avg':>7}")
+    print("-" * 96)
+    for name, r in results.items():
+        if "error" in r:
+            print(f"{name:>10} | EROARE: {r['error']}")
+            continue
+        print(f"{name:>10} | {r['load_s']:>6.2f} | {r['rss_loaded_mb']:>7.1f} | {r['rss_peak_mb']:>7.1f} | "
+              f"{r['query_p50_ms']:>7.2f} | {r['query_p95_ms']:>7.2f} | {r['ingest_texts_per_s']:>8.1f} | "
+              f"{r.get('cos_min', float('nan')):>7.4f} | {r.get('cos_mean', float('nan')):>7.4f}")
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Benchmark backend-uri embed(): torch vs ONNX fp32 / int8")
+    p.add_argument("--onnx-dir", default="./models/all-MiniLM-L6-v2-onnx")
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--run-one", default=None, help=argparse.SUPPRESS)
+    args = p.parse_args()
+    if args.run_one:
+        print(json.dumps(run_one(args.queries, args.run_one)))
+        sys.exit(0)
+    run(args.onnx_dir, args.queries)
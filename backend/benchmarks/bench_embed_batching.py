@@ -0,0 +1,72 @@
+# benchmarks/bench_embed_batching.py
+"""
+`embed()` sub concurență: un `encode` per cerere (fiecare thread al threadpool-ului
+rulează propriul forward batch-of-one) vs micro-batching (`_EmbedBatcher`: un
+singur thread deține modelul și codează cererile adunate într-un batch).
+
+Raportează throughput-ul (interogări/s) și latența p50 / p95 / p99 per apel,
+pentru mai multe niveluri de concurență. Cache-ul de embeddings nu intervine
+(modelul este apelat direct, cu texte unice).
+
+    python -m benchmarks.bench_embed_batching --threads 1 8 32 --requests 512
+    python -m benchmarks.bench_embed_batching --max-batch 32 --max-wait-ms 2
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+import numpy as np
+
+
+def _measure(call: Callable[[str], object], texts: List[str], threads: int) -> Dict[str, float]:
+    def timed(text: str) -> float:
+        t = time.perf_counter()
+        call(text)
+        return time.perf_counter() - t
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as ex:
+        lat = np.asarray(list(ex.map(timed, texts))) * 1000.0
+    wall = time.perf_counter() - t0
+    return {
+        "qps": len(texts) / wall,
+        "p50": float(np.percentile(lat, 50)),
+        "p95": float(np.percentile(lat, 95)),
+        "p99": float(np.percentile(lat, 99)),
+    }
+
+
+def run(threads: List[int], n_requests: int, max_batch: int, max_wait_ms: float, torch_threads: int) -> None:
+    from app.core import openai_client
+
+    model = openai_client.get_embed_model()
+    batcher = openai_client._EmbedBatcher(max_batch, max_wait_ms / 1000.0, torch_threads)
+    modes = {
+        "direct": lambda text: model.encode([text]),
+        "batched": lambda text: batcher.encode([text]),
+    }
+
+    model.encode(["încălzire"])
+    print(f"requests={n_requests}, max_batch={max_batch}, max_wait={max_wait_ms}ms")
+    print(f"{'mod':>8} | {'threads':>7} | {'qps':>8} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8}")
+    print("-" * 62)
+    for mode, call in modes.items():
+        for n_threads in threads:
+            texts = [f"{mode} {n_threads} o carte despre prietenie și curaj numărul {i}" for i in range(n_requests)]
+            r = _measure(call, texts, n_threads)
+            print(f"{mode:>8} | {n_threads:>7} | {r['qps']:>8.1f} | {r['p50']:>8.2f} | {r['p95']:>8.2f} | {r['p99']:>8.2f}")
+    print(f"\nbatcher: {batcher.stats()}")
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Benchmark micro-batching embeddings (throughput, latență)")
+    p.add_argument("--threads", nargs="*", type=int, default=[1, 4, 16, 40])
+    p.add_argument("--requests", type=int, default=512)
+    p.add_argument("--max-batch", type=int, default=64)
+    p.add_argument("--max-wait-ms", type=float, default=3.0)
+    p.add_argument("--torch-threads", type=int, default=0, help="0 = auto (min(4, nuclee/2))")
+    args = p.parse_args()
+    run(args.threads, args.requests, args.max_batch, args.max_wait_ms, args.torch_threads)
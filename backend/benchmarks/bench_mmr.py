@@ -0,0 +1,77 @@
+# benchmarks/bench_mmr.py
+"""
+Latența etapei MMR pe măsură ce crește numărul de candidați.
+
+Compară varianta veche (seturi de tokeni + buclă dublă în Python) cu
+`app.rag.rerank.mmr` (matrice de similaritate cosinus + maxim incremental).
+
+    python -m benchmarks.bench_mmr --sizes 16 64 256 512 1024 --k 12
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from typing import Callable, List
+
+import numpy as np
+
+from app.rag.rerank import mmr
+
+
+def mmr_token_sets(texts: List[str], scores: List[float], k: int = 6, lam: float = 0.3) -> List[int]:
+    """Implementarea anterioară din retriever, păstrată doar ca referință."""
+    tokens = [set((t or "").lower().split()) for t in texts]
+    selected, rest = [], list(range(len(texts)))
+    while rest and len(selected) < min(k, len(texts)):
+        best, best_score = None, float("-inf")
+        for i in rest:
+            rel = scores[i]
+            div = 0.0 if not selected else max(
+                (len(tokens[i].intersection(tokens[j])) / (len(tokens[i]) + 1e-9)) for j in selected
+            )
+            score = lam * rel - (1 - lam) * div
+            if score > best_score:
+                best, best_score = i, score
+        selected.append(best)
+        rest.remove(best)
+    return selected
+
+
+def _timeit(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000.0
+
+
+def run(sizes: List[int], k: int, dim: int, words: int, repeat: int, seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    random.seed(seed)
+    vocab = [f"w{i}" for i in range(5000)]
+
+    print(f"{'n':>6} | {'token-set (ms)':>15} | {'numpy (ms)':>11} | {'speedup':>8}")
+    print("-" * 50)
+    for n in sizes:
+        texts = [" ".join(random.choices(vocab, k=words)) for _ in range(n)]
+        embs = rng.standard_normal((n, dim)).astype(np.float32)
+        scores = (-rng.random(n) * 2.0).tolist()
+        kk = min(k, n)
+
+        t_old = _timeit(lambda: mmr_token_sets(texts, scores, k=kk), repeat)
+        t_new = _timeit(lambda: mmr(embs, scores, k=kk), repeat)
+        print(f"{n:>6} | {t_old:>15.3f} | {t_new:>11.3f} | {t_old / t_new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Benchmark MMR: token-set vs NumPy")
+    p.add_argument("--sizes", nargs="*", type=int, default=[16, 64, 128, 256, 512, 1024])
+    p.add_argument("--k", type=int, default=12, help="Câți candidați selectează MMR")
+    p.add_argument("--dim", type=int, default=384, help="Dimensiunea embedding-urilor (MiniLM = 384)")
+    p.add_argument("--words", type=int, default=180, help="Cuvinte per chunk sintetic (~1200 caractere)")
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--seed", type=int, default=0)
+    args = p.parse_args()
+    run(args.sizes, args.k, args.dim, args.words, args.repeat, args.seed)
@@ -0,0 +1,79 @@
+# benchmarks/bench_quantization.py
+"""
+Indexul "flat" în float32 vs int8 (cu rescorare float32 pe shortlist).
+
+float16 nu mai este oferit (FLAT_INDEX_DTYPE): NumPy nu are GEMM float16, iar la
+100k x 384 scanarea lui măsura 110 ms/interogare (float32 19 ms). int8 se decomprimă
+pe blocuri mici într-un buffer refolosit: 16 ms față de 18 ms float32, cu un sfert
+din memoria scanată și același recall după rescorare.
+
+Raportează, pe un corpus sintetic cu clustere (similar ca structură cu
+embeddings MiniLM): memoria scanată per worker, latența per interogare și
+recall@k față de căutarea exactă în float32.
+
+    python -m benchmarks.bench_quantization --n 100000 --queries 200 --k 10
+"""
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from typing import List
+
+import numpy as np
+
+from app.rag.vector_store import FlatStore
+
+
+def synthetic(n: int, dim: int, clusters: int, rng: np.random.Generator) -> np.ndarray:
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=n)
+    x = centers[labels] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def run(n: int, dim: int, clusters: int, n_queries: int, k: int, rescore: int, seed: int) -> None:
+    rng = np.random.default_rng(seed)
+    corpus = synthetic(n, dim, clusters, rng)
+    queries = synthetic(n_queries, dim, clusters, rng)
+    ids = [f"doc::{i}" for i in range(n)]
+
+    # adevărul de referință: căutare exhaustivă float32
+    truth: List[set] = []
+    for q in queries:
+        sims = corpus @ q
+        truth.append(set(np.argpartition(-sims, k - 1)[:k].tolist()))
+
+    print(f"corpus={n} x {dim}, queries={n_queries}, k={k}, rescore={rescore}x")
+    print(f"{'dtype':>8} | {'scan MB':>8} | {'ms/query':>9} | {'recall@k':>8}")
+    print("-" * 44)
+    with tempfile.TemporaryDirectory() as tmp:
+        for dtype in ("float32", "int8"):
+            store = FlatStore(f"{tmp}/{dtype}", "bench", dtype=dtype, rescore=rescore)
+            store.upsert(ids, corpus, [""] * n, [{}] * n)
+            st = store._load()
+            scanned = st.compact if st.compact is not None else st.vectors
+            mb = (scanned.nbytes + (st.scales.nbytes if st.scales is not None else 0)) / 2**20
+
+            store.query(queries[:1], n_results=k, include=())  # încălzire (page cache)
+            t0 = time.perf_counter()
+            hits = 0
+            for i, q in enumerate(queries):
+                got = store.query([q], n_results=k, include=())["ids"][0]
+                hits += len(truth[i] & {int(g.split("::")[1]) for g in got})
+            ms = (time.perf_counter() - t0) * 1000.0 / n_queries
+            print(f"{dtype:>8} | {mb:>8.1f} | {ms:>9.3f} | {hits / (k * n_queries):>8.4f}")
+    print("float16: nu este oferit (fără GEMM float16 în NumPy: strict mai lent și mai mare decât int8)")
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Benchmark cuantizare index flat (memorie, latență, recall@k)")
+    p.add_argument("--n", type=int, default=100_000, help="Numărul de vectori din corpus")
+    p.add_argument("--dim", type=int, default=384)
+    p.add_argument("--clusters", type=int, default=200)
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--k", type=int, default=10)
+    p.add_argument("--rescore", type=int, default=4, help="Shortlist = k * rescore")
+    p.add_argument("--seed", type=int, default=0)
+    args = p.parse_args()
+    run(args.n, args.dim, args.clusters, args.queries, args.k, args.rescore, args.seed)
@@ -0,0 +1,305 @@
+# benchmarks/bench_retrieval.py
+"""
+Suită de benchmark pentru `retriever.similar`.
+
+Pentru fiecare dimensiune de corpus generează cărți sintetice cu forma din
+`data/summaries.json`, le scrie într-un SUMMARY_FILE temporar, rulează
+`app.rag.ingest.ingest()` într-un CHROMA_DIR temporar și apoi o încărcare de
+interogări. Cărțile nu sunt tăiate: corpusul poate avea ceva mai multe chunk-uri
+decât dimensiunea cerută. Raportează:
+  - latența p50 / p95 / p99 pe etape (embed, vector_query, bm25, mmr, rrf) și total;
+  - recall@k față de căutarea exhaustivă (brute force) pe embeddings, atât pentru
+    interogarea vectorială brută cât și pentru rezultatul final (după MMR + RRF),
+    plus recall-ul pe titluri (primele k cărți distincte), relevant pentru modul
+    ierarhic (RAG_BOOK_LEVEL), care întoarce un singur chunk per carte;
+  - timpul de ingest, RSS-ul maxim la finalul ingest-ului și al întregului proces.
+
+Fiecare dimensiune rulează într-un subproces separat (setările și căile sunt
+citite la import, iar RSS-ul maxim trebuie măsurat per corpus). Rezultatul se
+poate salva ca JSON pentru comparații între rulări.
+
+    python -m benchmarks.bench_retrieval --sizes 1000 10000 --queries 200 --out bench.json
+    python -m benchmarks.bench_retrieval --sizes 100000 1000000 --embedder hash --backend flat
+    python -m benchmarks.bench_retrieval --sizes 10000 --embedder hash --chunk-level
+    python -m benchmarks.bench_retrieval --sizes 100000 --embedder hash --backend flat --shard-by genre
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+STAGES = ("embed", "vector_query", "bm25", "mmr", "rrf")
+
+_GENRES = ["dystopian", "fantasy", "science fiction", "literary fiction", "mystery", "thriller",
+           "romance", "historical", "self-help", "technology", "memoir", "horror", "philosophy"]
+_THEMES = ["freedom", "friendship", "love", "war", "identity", "power", "family", "survival",
+           "truth", "memory", "justice", "ambition", "loss", "faith", "technology"]
+
+
+# ---------------- corpus sintetic ----------------
+def _vocabulary(rng: random.Random, size: int = 20000) -> List[str]:
+    letters = "abcdefghijklmnopqrstuvwxyzăâîșț"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(3, 10))) for _ in range(size)]
+
+
+def synthetic_items(n_chunks: int, seed: int) -> List[Dict[str, Any]]:
+    """Cărți în formatul summaries.json; majoritatea au un singur chunk, ~15% au 2-3."""
+    rng = random.Random(seed)
+    vocab = _vocabulary(rng)
+    items: List[Dict[str, Any]] = []
+    chunks = 0
+    while chunks < n_chunks:
+        long_summary = rng.random() < 0.15
+        n_chars = rng.randint(1300, 3000) if long_summary else rng.randint(200, 1100)
+        words: List[str] = []
+        while sum(len(w) + 1 for w in words) < n_chars:
+            words.append(rng.choice(vocab))
+        summary = " ".join(words)
+        items.append({
+            "title": f"Carte sintetică {len(items)}",
+            "author": f"Autor {rng.randint(1, 5000)}",
+            "year": rng.randint(1800, 2024),
+            "genre": rng.choice(_GENRES),
+            "themes": rng.sample(_THEMES, 3),
+            "audience": "adult",
+            "lang": rng.choice(["ro", "en"]),
+            "summary": summary,
+        })
+        chunks += 1 if len(summary) <= 1200 else 1 + (len(summary) - 1200 + 1079) // 1080
+    return items
+
+
+class HashEmbedder:
+    """
+    Înlocuitor rapid pentru SentenceTransformer (opțiunea --embedder hash):
+    bag-of-words proiectat aleator, normalizat. Măsoară retrieval-ul, nu modelul.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def encode(self, texts: List[str], **_: Any) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, t in enumerate(texts):
+            for w in t.lower().split():
+                h = int.from_bytes(hashlib.blake2b(w.encode("utf-8"), digest_size=8).digest(), "little")
+                out[i, h % self.dim] += 1.0 if (h >> 32) & 1 else -1.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.maximum(norms, 1e-12)
+
+
+def _percentiles(values_s: List[float]) -> Dict[str, float]:
+    if not values_s:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "mean": 0.0}
+    ms = np.asarray(values_s) * 1000.0
+    return {
+        "p50": round(float(np.percentile(ms, 50)), 3),
+        "p95": round(float(np.percentile(ms, 95)), 3),
+        "p99": round(float(np.percentile(ms, 99)), 3),
+        "mean": round(float(ms.mean()), 3),
+    }
+
+
+# ---------------- o rulare (în subproces) ----------------
+def run_one(n_chunks: int, n_queries: int, k: int, embedder: str, batch: int, seed: int) -> Dict[str, Any]:
+    from app.core import openai_client
+    from app.core.openai_client import embed
+    from app.rag import ingest, retriever
+
+    factory = HashEmbedder if embedder == "hash" else None
+    if factory is not None:
+        openai_client._embed_model = factory()
+
+    # catalogul sintetic trece prin ingest-ul real (parser în flux, manifest, loturi,
+    # fișe de carte); cărțile sunt păstrate întregi, deci pot rezulta ceva mai multe chunk-uri
+    items = synthetic_items(n_chunks, seed)
+    with open(ingest.DATA_JSON, "w", encoding="utf-8") as fh:
+        json.dump(items, fh, ensure_ascii=False)
+    t0 = time.perf_counter()
+    ingest.ingest(model_factory=factory)
+    ingest_s = time.perf_counter() - t0
+    ingest_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # vectorii și metadatele așa cum au ajuns în store, pentru căutarea exhaustivă
+    store = retriever._collection()
+    ids: List[str] = []
+    metas: List[Dict[str, Any]] = []
+    parts = []
+    for offset in range(0, store.count(), batch):
+        got = store.get(limit=batch, offset=offset, include=["metadatas", "embeddings"])
+        ids.extend(got["ids"])
+        metas.extend(got["metadatas"])
+        parts.append(np.asarray(got["embeddings"], dtype=np.float32))
+    matrix = np.vstack(parts)
+    matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+    # ---- interogări: fragmente de 4-8 cuvinte din chunk-uri aleatoare ----
+    rng = random.Random(seed + 1)
+    queries = []
+    for _ in range(n_queries):
+        words = items[rng.randrange(len(items))]["summary"].split()
+        n_words = rng.randint(4, 8)
+        start = rng.randrange(max(1, len(words) - n_words))
+        queries.append(" ".join(words[start:start + n_words]))
+
+    # încălzire: încărcarea indexului BM25 / a store-ului nu intră în percentile
+    retriever.similar(queries[0], k=k)
+
+    stage_times: Dict[str, List[float]] = {s: [] for s in STAGES}
+    totals: List[float] = []
+    dense_hits = final_hits = title_hits = 0
+    titles = [m["title"] for m in metas]
+    for q in queries:
+        retriever.clear_cache()
+        with retriever.record_timings() as timings:
+            t = time.perf_counter()
+            res = retriever.similar(q, k=k)
+            totals.append(time.perf_counter() - t)
+        for s in STAGES:
+            if s in timings:
+                stage_times[s].append(timings[s])
+
+        qv = np.asarray(embed([q])[0], dtype=np.float32)
+        qv /= max(float(np.linalg.norm(qv)), 1e-12)
+        sims = matrix @ qv
+        truth = {ids[i] for i in np.argpartition(-sims, k - 1)[:k]}
+        # primele k titluri distincte în ordinea exhaustivă
+        top = np.argpartition(-sims, min(len(sims), 8 * k) - 1)[:8 * k]
+        truth_titles: List[str] = []
+        for i in top[np.argsort(-sims[top])]:
+            if titles[i] not in truth_titles:
+                truth_titles.append(titles[i])
+        truth_titles = truth_titles[:k]
+        dense = store.query(query_embeddings=[qv.tolist()], n_results=k, include=[])["ids"][0]
+        dense_hits += len(truth & set(dense))
+        final_hits += len(truth & set(res["ids"][0]))
+        title_hits += len(set(truth_titles) & {m["title"] for m in res["metadatas"][0]})
+
+    return {
+        "n_chunks": len(ids),
+        "n_books": len(items),
+        "queries": n_queries,
+        "k": k,
+        "ingest_s": round(ingest_s, 3),
+        "ingest_chunks_per_s": round(len(ids) / ingest_s, 1) if ingest_s else None,
+        "latency_ms": {
+            "total": _percentiles(totals),
+            **{s: _percentiles(v) for s, v in stage_times.items()},
+        },
+        "recall_at_k": {
+            "vector_query": round(dense_hits / (k * n_queries), 4),
+            "final": round(final_hits / (k * n_queries), 4),
+            "titles": round(title_hits / (k * n_queries), 4),
+        },
+        # ru_maxrss este în KB pe Linux, în bytes pe macOS
+        "ingest_peak_rss_mb": round(ingest_rss / (2**20 if sys.platform == "darwin" else 2**10), 1),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                             / (2**20 if sys.platform == "darwin" else 2**10), 1),
+    }
+
+
+# ---------------- orchestrare ----------------
+def run(sizes: List[int], n_queries: int, k: int, backend: str, embedder: str, batch: int, seed: int,
+        book_level: bool = True, shard_by: str = "") -> Dict[str, Any]:
+    runs = []
+    with tempfile.TemporaryDirectory(prefix="bench_rag_") as tmp:
+        for n in sizes:
+            env = dict(os.environ)
+            env.update({
+                "CHROMA_DIR": os.path.join(tmp, str(n)),
+                # catalogul sintetic e citit de `ingest()` din SUMMARY_FILE (cale absolută)
+                "SUMMARY_FILE": os.path.join(tmp, f"summaries_{n}.json"),
+                "INGEST_BATCH_SIZE": str(batch),
+                "INGEST_EMBED_STORE": "",
+                "VECTOR_BACKEND": backend,
+                "RAG_SEMANTIC_CACHE_SIZE": "0",
+                "EMBED_CACHE_MAX_ENTRIES": "4096",
+                "RAG_BOOK_LEVEL": "1" if book_level else "0",
+                "RAG_SHARD_BY": shard_by,
+            })
+            env.pop("EMBED_CACHE_PATH", None)
+            cmd = [sys.executable, "-m", "benchmarks.bench_retrieval", "--run-one", str(n),
+                   "--queries", str(n_queries), "--k", str(k), "--embedder", embedder,
+                   "--batch", str(batch), "--seed", str(seed)]
+            print(f"[INFO] corpus {n} chunk-uri ({backend}, embedder={embedder})…", file=sys.stderr)
+            proc = subprocess.run(cmd, env=env, capture_output=True, text=True)
+            if proc.returncode != 0:
+                print(proc.stderr, file=sys.stderr)
+                runs.append({"n_chunks": n, "error": proc.stderr.strip().splitlines()[-1:]})
+                continue
+            runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "backend": backend,
+            "embedder": embedder,
+            "book_level": book_level,
+            "shard_by": shard_by,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "seed": seed,
+        },
+        "runs": runs,
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    for r in report["runs"]:
+        if "error" in r:
+            print(f"\n{r['n_chunks']} chunk-uri: EROARE {r['error']}")
+            continue
+        print(f"\n{r['n_chunks']} chunk-uri | ingest {r['ingest_s']}s | RSS max ingest "
+              f"{r['ingest_peak_rss_mb']} MB / total {r['peak_rss_mb']} MB | "
+              f"recall@{r['k']} vector={r['recall_at_k']['vector_query']} final={r['recall_at_k']['final']} "
+              f"titluri={r['recall_at_k']['titles']}")
+        print(f"  {'etapă':<13} {'p50':>9} {'p95':>9} {'p99':>9}  (ms)")
+        for stage in ("total",) + STAGES:
+            p = r["latency_ms"][stage]
+            print(f"  {stage:<13} {p['p50']:>9.3f} {p['p95']:>9.3f} {p['p99']:>9.3f}")
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Benchmark retriever: latență pe etape, recall@k, RSS")
+    p.add_argument("--sizes", nargs="*", type=int, default=[1_000, 10_000, 100_000, 1_000_000])
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--k", type=int, default=6)
+    p.add_argument("--backend", choices=["chroma", "flat"], default=None,
+                   help="Backend vector store (implicit VECTOR_BACKEND din setări)")
+    p.add_argument("--embedder", choices=["model", "hash"], default="model",
+                   help="'model' = SentenceTransformer real; 'hash' = embeddings sintetice rapide")
+    p.add_argument("--batch", type=int, default=2048, help="Dimensiunea loturilor la ingest (INGEST_BATCH_SIZE)")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--chunk-level", action="store_true",
+                   help="Dezactivează retrieval-ul ierarhic (RAG_BOOK_LEVEL=0), pentru comparație")
+    p.add_argument("--shard-by", choices=["", "lang", "genre"], default="",
+                   help="Colecții separate per limbă / gen (RAG_SHARD_BY)")
+    p.add_argument("--out", type=str, default=None, help="Fișier JSON pentru rezultate")
+    p.add_argument("--run-one", type=int, default=None, help=argparse.SUPPRESS)
+    args = p.parse_args()
+
+    if args.run_one is not None:
+        print(json.dumps(run_one(args.run_one, args.queries, args.k, args.embedder, args.batch, args.seed)))
+        sys.exit(0)
+
+    from app.core.config import get_settings
+    backend = args.backend or get_settings().VECTOR_BACKEND
+    report = run(args.sizes, args.queries, args.k, backend, args.embedder, args.batch, args.seed,
+                 book_level=not args.chunk_level, shard_by=args.shard_by)
+    print_report(report)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2, ensure_ascii=False)
+        print(f"\n[INFO] Rezultate salvate în {args.out}")
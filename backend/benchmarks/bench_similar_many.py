@@ -0,0 +1,135 @@
+# benchmarks/bench_similar_many.py
+"""
+`retriever.similar_many` (un `embed` + un `collection.query` per lot) față de o
+buclă `similar()` per interogare, pe același corpus sintetic.
+
+Raportează timpul total și per interogare, plus câte id-uri ajung în `_fetch`
+(candidații BM25 lipsă din rezultatele dense; cei deja întorși de căutarea
+densă nu se mai cer din colecție). Cache-urile sunt golite înainte de fiecare
+variantă, iar cache-ul semantic este dezactivat.
+
+    python -m benchmarks.bench_similar_many --chunks 10000 --queries 1000 --embedder hash
+    python -m benchmarks.bench_similar_many --chunks 10000 --queries 1000 --embedder hash --backend flat
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from typing import Callable
+
+import numpy as np
+
+from benchmarks.bench_retrieval import HashEmbedder, synthetic_items
+
+
+def _timeit(fn: Callable[[], object], repeat: int, before: Callable[[], None]) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        before()
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000.0
+
+
+def run(n_chunks: int, n_queries: int, k: int, embedder: str, batch_size: int, repeat: int, seed: int) -> None:
+    from app.core import openai_client
+    from app.core.config import get_settings
+    from app.core.openai_client import embed
+    from app.rag import generation, retriever
+    from app.rag.ingest import _build_docs, _sync_book_cards
+    from app.rag.sparse_index import SparseIndex
+
+    if embedder == "hash":
+        openai_client._embed_model = HashEmbedder()
+
+    items = synthetic_items(n_chunks, seed)
+    docs, metas, ids, terms = _build_docs(items)
+    docs, metas, ids, terms = docs[:n_chunks], metas[:n_chunks], ids[:n_chunks], terms[:n_chunks]
+
+    store = retriever._collection()
+    index = SparseIndex()
+    vectors = {}
+    for start in range(0, len(docs), 2048):
+        sl = slice(start, start + 2048)
+        vecs = np.asarray(embed(docs[sl]), dtype=np.float32)
+        store.upsert(ids=ids[sl], embeddings=vecs, documents=docs[sl], metadatas=metas[sl])
+        index.add_many(ids[sl], terms[sl], metas[sl])
+        vectors.update(zip(ids[sl], vecs))
+    index.save()
+    if get_settings().RAG_BOOK_LEVEL:
+        _sync_book_cards(store, ids, metas, vectors)
+    store.flush()
+    retriever._books().flush()
+    generation.bump()
+
+    rng = random.Random(seed + 1)
+    queries = []
+    for _ in range(n_queries):
+        words = docs[rng.randrange(len(docs))].split("\n\n", 1)[-1].split()
+        n_words = rng.randint(4, 8)
+        start = rng.randrange(max(1, len(words) - n_words))
+        queries.append(" ".join(words[start:start + n_words]))
+
+    # încălzire: indexul BM25 / store-ul se încarcă o singură dată
+    retriever.similar(queries[0], k=k)
+    # embeddings-urile interogărilor rămân în cache: comparăm retrieval-ul, nu modelul
+    embed(queries)
+
+    fetched_ids = [0]
+    original_fetch = retriever._fetch
+
+    def counting_fetch(chunk_ids):
+        fetched_ids[0] += len(chunk_ids)
+        return original_fetch(chunk_ids)
+
+    retriever._fetch = counting_fetch
+
+    def reset() -> None:
+        retriever.clear_cache()
+        fetched_ids[0] = 0
+
+    t_loop = _timeit(lambda: [retriever.similar(q, k=k) for q in queries], repeat, reset)
+    loop_fetched = fetched_ids[0]
+    t_many = _timeit(lambda: retriever.similar_many(queries, k=k, batch_size=batch_size), repeat, reset)
+    many_fetched = fetched_ids[0]
+    retriever._fetch = original_fetch
+
+    print(f"corpus {len(docs)} chunk-uri, {n_queries} interogări, k={k}, lot={batch_size}, "
+          f"backend={get_settings().VECTOR_BACKEND}, book_level={get_settings().RAG_BOOK_LEVEL}")
+    print(f"{'variantă':<14} | {'total (ms)':>11} | {'ms / interogare':>15} | {'id-uri _fetch':>13}")
+    print("-" * 63)
+    print(f"{'buclă similar':<14} | {t_loop:>11.1f} | {t_loop / n_queries:>15.3f} | {loop_fetched:>13}")
+    print(f"{'similar_many':<14} | {t_many:>11.1f} | {t_many / n_queries:>15.3f} | {many_fetched:>13}")
+    print(f"speedup {t_loop / t_many:.2f}x")
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Benchmark similar_many vs buclă similar()")
+    p.add_argument("--chunks", type=int, default=10_000)
+    p.add_argument("--queries", type=int, default=1_000)
+    p.add_argument("--k", type=int, default=6)
+    p.add_argument("--batch-size", type=int, default=256, help="Interogări per `collection.query`")
+    p.add_argument("--backend", choices=["chroma", "flat"], default=None,
+                   help="Backend vector store (implicit VECTOR_BACKEND din setări)")
+    p.add_argument("--embedder", choices=["model", "hash"], default="model",
+                   help="'model' = SentenceTransformer real; 'hash' = embeddings sintetice rapide")
+    p.add_argument("--chunk-level", action="store_true", help="RAG_BOOK_LEVEL=0")
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--seed", type=int, default=0)
+    args = p.parse_args()
+
+    # setările și căile sunt citite la import: mediul se fixează înainte de `app.*`
+    tmp = tempfile.TemporaryDirectory(prefix="bench_many_")
+    os.environ["CHROMA_DIR"] = tmp.name
+    os.environ["RAG_SEMANTIC_CACHE_SIZE"] = "0"
+    os.environ["EMBED_CACHE_MAX_ENTRIES"] = str(max(4096, 2 * args.queries))
+    os.environ["RAG_BOOK_LEVEL"] = "0" if args.chunk_level else "1"
+    os.environ.pop("EMBED_CACHE_PATH", None)
+    if args.backend:
+        os.environ["VECTOR_BACKEND"] = args.backend
+    with tmp:
+        run(args.chunks, args.queries, args.k, args.embedder, args.batch_size, args.repeat, args.seed)
@@ -0,0 +1,89 @@
+# benchmarks/check_import_time.py
+"""
+Bugetul de timp la import (`python -X importtime`) pentru modulele de intrare.
+
+Importul lui `main`, `app.rag.retriever` sau `app.core.openai_client` nu trebuie
+să încarce modelul de embeddings, Chroma sau langdetect (vezi `app.core.readiness`).
+Pentru fiecare modul, într-un interpretor nou:
+  - timpul cumulat de import față de buget;
+  - pachetele grele care nu au voie să apară în `sys.modules`;
+  - cele mai scumpe importuri directe, pentru diagnostic.
+Codul de ieșire este 1 dacă un buget este depășit, ca să poată rula în CI.
+
+    python -m benchmarks.check_import_time
+    python -m benchmarks.check_import_time --modules main --budget-ms 1500
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+HEAVY = ("torch", "sentence_transformers", "transformers", "chromadb", "onnxruntime", "langdetect")
+DEFAULT_MODULES = ("main", "app.rag.retriever", "app.core.openai_client", "app.rag.ingest")
+
+
+def _parse(stderr: str) -> List[Tuple[int, int, str]]:
+    """Liniile `import time: self [us] | cumulative | imported package` -> (self, cumul, nume indentat)."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumul_us, name = line[len("import time:"):].split("|", 2)
+            rows.append((int(self_us), int(cumul_us), name.rstrip()))
+        except ValueError:
+            continue
+    return rows
+
+
+def measure(module: str) -> Dict[str, object]:
+    code = (
+        f"import sys, json; import {module}; "
+        f"print(json.dumps(sorted(m for m in {HEAVY!r} if m in sys.modules)))"
+    )
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          capture_output=True, text=True, env=dict(os.environ))
+    if proc.returncode != 0:
+        errors = [l for l in proc.stderr.strip().splitlines() if not l.startswith("import time:")]
+        return {"module": module, "error": (errors or ["?"])[-1]}
+    rows = _parse(proc.stderr)
+    total_us = next((c for _, c, n in reversed(rows) if n.strip() == module), sum(s for s, _, _ in rows))
+    # importurile directe ale modulului (indentare minimă sub el) cu cel mai mare cost cumulat
+    top = sorted(((c, n.strip()) for _, c, n in rows if len(n) - len(n.lstrip()) <= 3), reverse=True)[:8]
+    return {
+        "module": module,
+        "ms": round(total_us / 1000.0, 1),
+        "heavy": json.loads(proc.stdout.strip().splitlines()[-1]),
+        "top": [(name, round(c / 1000.0, 1)) for c, name in top],
+    }
+
+
+def main(modules: List[str], budget_ms: float) -> int:
+    failed = False
+    for module in modules:
+        r = measure(module)
+        if "error" in r:
+            print(f"{module}: EROARE la import: {r['error']}")
+            failed = True
+            continue
+        over = r["ms"] > budget_ms
+        status = "OK" if not over and not r["heavy"] else "EȘUAT"
+        print(f"{module:<24} {r['ms']:>8.1f} ms (buget {budget_ms:.0f} ms)  {status}")
+        if r["heavy"]:
+            print(f"  importuri grele la import: {', '.join(r['heavy'])}")
+        for name, ms in r["top"]:
+            print(f"    {name:<40} {ms:>8.1f} ms")
+        failed = failed or over or bool(r["heavy"])
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Verifică bugetul de timp la import (python -X importtime)")
+    p.add_argument("--modules", nargs="*", default=list(DEFAULT_MODULES))
+    p.add_argument("--budget-ms", type=float, default=2000.0, help="Timpul cumulat maxim per modul")
+    args = p.parse_args()
+    sys.exit(main(args.modules, args.budget_ms))
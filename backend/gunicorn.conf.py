@@ -0,0 +1,41 @@
+# gunicorn.conf.py
+"""
+Modul de producție: gunicorn (pre-fork) cu worker-i uvicorn.
+
+    gunicorn -c gunicorn.conf.py main:app
+
+- `preload_app`: `main` este importat o singură dată, în master (import ieftin,
+  vezi `app.core.readiness`), iar greutățile modelului de embeddings sunt încărcate
+  înainte de fork și partajate copy-on-write între worker-i;
+- Chroma, warm-up-ul și watcher-ul de auto-ingest (`app.rag.watcher`) pornesc în
+  fiecare worker, din lifespan-ul FastAPI; doar liderul ales prin `app.core.leader`
+  urmărește sursa și rulează ingest-ul,
+  ceilalți văd generația nouă și își redeschid colecțiile.
+"""
+import gc
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+bind = "0.0.0.0:8000"
+workers = settings.SERVER_WORKERS
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = 120
+graceful_timeout = 30
+
+
+def on_starting(server):
+    if not settings.SERVER_PRELOAD_MODEL:
+        return
+    from app.core import openai_client
+
+    if openai_client.preload_for_fork():
+        server.log.info("Modelul de embeddings a fost încărcat înainte de fork.")
+
+
+def pre_fork(server, worker):
+    # obiectele existente (modul, greutăți) trec în generația permanentă: GC-ul din
+    # worker nu le mai atinge contoarele de referință, deci paginile rămân partajate
+    gc.freeze()
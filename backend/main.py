@@ -1,15 +1,14 @@
 # main.py
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pathlib import Path
-import threading
-import time
-import langdetect
 import uvicorn
 
 from app.core.config import get_settings
 from app.core.db import engine, Base
-from app.rag.ingest import ingest
+from app.core import leader, readiness
+from app.core.openai_client import embed_batch_stats
+from app.rag import retriever, watcher
 
 # === Importul Routerelor (Presentation Layer) ===
 # Am inclus toate cele 12 module refactorizate pentru a asigura functionalitatea completa
@@ -33,22 +32,31 @@ from app.routers import (
 
 # === Configurare Aplicatie ===
 settings = get_settings()
-app = FastAPI(
-    title="Smart Librarian API",
-    description="Sistem expert de recomandări cărți bazat pe RAG și OpenAI",
-    version="2.1"
-)
 
-# === Eveniment de Startup: Creare Tabele ===
-# Aceasta linie asigura ca tabelele sunt create automat in MySQL la pornirea serverului
-@app.on_event("startup")
-def on_startup():
+
+# === Lifespan: Creare Tabele + Warm-up RAG + Auto-ingest ===
+# Nimic greu nu mai rulează la import (modelul, Chroma, langdetect, watcher-ul de ingest):
+# importul lui `main` rămâne ieftin pentru CLI-uri / teste, iar serverul pornește imediat,
+# cu /health/ready = 503 până la finalul warm-up-ului.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Aceasta linie asigura ca tabelele sunt create automat in MySQL la pornirea serverului
     print("[INFO] Initializing database tables in MySQL...")
     Base.metadata.create_all(bind=engine)
+    readiness.start_warm_up()
+    # Ruleaza în paralel cu API-ul pentru a nu bloca cererile utilizatorilor
+    if settings.INGEST_WATCH:
+        watcher.start()
+    yield
+    watcher.stop()
 
-# === Preîncărcare profile LangDetect ===
-_ = langdetect.detect("Aceasta este o propoziție de test.")
-print("[INFO] LangDetect profiles preloaded successfully.")
+
+app = FastAPI(
+    title="Smart Librarian API",
+    description="Sistem expert de recomandări cărți bazat pe RAG și OpenAI",
+    version="2.1",
+    lifespan=lifespan,
+)
 
 # === Configurare CORS ===
 # Permite comunicarea securizata intre Frontend (ex: React) si Backend
@@ -86,33 +94,27 @@ def health_check():
     """Verifică dacă API-ul este activ și conectat la MySQL."""
     return {"status": "active", "database": "connected", "version": "2.1"}
 
-# === Funcție de auto-ingest RAG (Background Task) ===
-def auto_ingest(interval: int = 600):
-    """
-    Monitorizează modificările din summaries.json și rulează procesul de ingest
-    pentru a actualiza cunoștințele bibliotecarului în ChromaDB.
-    """
-    last_mtime = None
-    # Calea este relativa la structura de foldere a proiectului tau
-    data_path = Path(__file__).parent / "data" / "summaries.json"
+@app.get("/health/ready", tags=["System"])
+def readiness_check(response: Response):
+    """Readiness: 200 după warm-up (model, vector store, BM25, langdetect), 503 până atunci."""
+    state = readiness.status()
+    if not state["ready"]:
+        response.status_code = 503
+    return state
 
-    while True:
-        try:
-            if data_path.exists():
-                mtime = data_path.stat().st_mtime
-                if last_mtime is None or mtime != last_mtime:
-                    print("[INFO] Detected change in summaries.json, updating Vector Store...")
-                    ingest()
-                    last_mtime = mtime
-            else:
-                print("[WARN] Data file 'summaries.json' not found. Skipping ingest check.")
-        except Exception as e:
-            print(f"[ERROR] Auto-ingest failed: {e}")
-        time.sleep(interval)
+@app.get("/health/rag", tags=["System"])
+def rag_health():
+    """Statistici pentru cache-ul retriever-ului și batching-ul embeddings (pentru dimensionare)."""
+    return {
+        "cache": retriever.cache_stats(),
+        "embed_batching": embed_batch_stats(),
+        "ingest_leader": {"this_worker": leader.is_leader(), "pid": leader.leader_pid()},
+    }
 
-# === Pornire thread background pentru ingest ===
-# Ruleaza în paralel cu API-ul pentru a nu bloca cererile utilizatorilor
-threading.Thread(target=auto_ingest, daemon=True).start()
+@app.get("/health/ingest", tags=["System"])
+def ingest_health():
+    """Auto-ingest: backend-ul watcher-ului, rularea în curs și ultima rulare (durată, raport, eroare)."""
+    return watcher.status()
 
 if __name__ == "__main__":
     print("🚀 Smart Librarian API is starting on http://localhost:8000")